@@ -1,38 +1,46 @@
-import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from routes.predict import router as predict_router
 from routes.camera import router as camera_router
+from routes.calibration import router as calibration_router
+from routes.tracking import router as tracking_router
+from routes.stream import router as stream_router
+from routes.events import router as events_router
+from routes.metrics import router as metrics_router
+from routes.profiling import router as profiling_router
+
+from services.camera_service import CameraService
+from services.event_broadcaster import EventBroadcaster
+from services.inference_scheduler import InferenceScheduler
+from services.model_registry import ModelRegistry
+from services.prediction_service import IMG_SIZE
+from services.stream_ingest import StreamIngestService
 
 # Use PyTorch model
 MODEL_PATH = "model/best.pt"  # Model included in source code
-yolo_model = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Load the ML model
-    global yolo_model
-    try:
-        # Get absolute path for more reliable loading
-        abs_model_path = os.path.abspath(MODEL_PATH)
-
-        if os.path.exists(abs_model_path):
-                # We'll import and load the model on-demand in the prediction service
-            # This avoids dependency issues at startup
-            pass
-        else:
-            # Model not found
-            pass
-    except Exception:
-        # Failed to configure model
-        pass
+    # Startup: Load and warm up the ML model once for the whole process
+    ModelRegistry.load(MODEL_PATH, warmup_size=IMG_SIZE)
+    InferenceScheduler.start()
+    # Before stream ingestion, so its first detections reach the event channel
+    EventBroadcaster.start()
+    if StreamIngestService.get_stream_config()["enabled"]:
+        try:
+            StreamIngestService.start()
+        except ValueError as e:
+            print(f"Stream ingestion not started: {str(e)}")
 
     yield
 
-    # Shutdown: Clean up resources
-    # No specific cleanup needed
+    # Shutdown: Stop reading the stream and the inference thread pool, log out of the camera and release the model
+    StreamIngestService.stop()
+    await CameraService.close_clients()
+    InferenceScheduler.shutdown()
+    ModelRegistry.unload()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -43,6 +51,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
 
 # Root endpoint
@@ -53,6 +62,12 @@ def hello_world():
 # Include routers from other files
 app.include_router(predict_router)
 app.include_router(camera_router)
+app.include_router(calibration_router)
+app.include_router(tracking_router)
+app.include_router(stream_router)
+app.include_router(events_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
 
 if __name__ == '__main__':
     import uvicorn
@@ -0,0 +1,75 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BoardCalibration(BaseModel):
+    """Dartboard position in the camera frame and scoring adjustments.
+
+    Defaults match DARTBOARD_CONFIG and MANUAL_ADJUSTMENTS in the frontend's dartboardScoring.ts.
+    """
+    center_x: float = Field(1132, description="X coordinate of the board centre in frame pixels")
+    center_y: float = Field(782, description="Y coordinate of the board centre in frame pixels")
+    radius: float = Field(298, gt=0, description="Radius to the outer edge of the double ring in frame pixels")
+    inner_bull_ratio: float = Field(0.035, description="Inner bull radius as a proportion of the board radius")
+    outer_bull_ratio: float = Field(0.0764, description="Outer bull radius as a proportion of the board radius")
+    triple_inner_ratio: float = Field(0.59, description="Inner edge of the triple ring as a proportion of the board radius")
+    triple_outer_ratio: float = Field(0.65, description="Outer edge of the triple ring as a proportion of the board radius")
+    double_inner_ratio: float = Field(0.93, description="Inner edge of the double ring as a proportion of the board radius")
+    double_outer_ratio: float = Field(1.0, description="Outer edge of the double ring as a proportion of the board radius")
+    rotation_adjustment: float = Field(15, description="Rotation of the segment layout in degrees (positive = clockwise)")
+    ring_scale_factor: float = Field(1.0, gt=0, description="Scale factor applied to the rings (> 1 makes them bigger)")
+    detection_offset_x: float = Field(24.5, description="Offset from the detected X to the actual X of the dart")
+    detection_offset_y: float = Field(115.0, description="Offset from the detected Y to the actual Y of the dart")
+
+
+class ReferencePoint(BaseModel):
+    """A point seen in the camera frame together with its position on the board.
+
+    The board position is either a named keypoint or explicit board coordinates in millimetres
+    relative to the bull, with x to the right and y down when the 20 is at the top.
+    """
+    x: float = Field(description="X coordinate in frame pixels")
+    y: float = Field(description="Y coordinate in frame pixels")
+    keypoint: Optional[str] = Field(None, description="Named board keypoint: 'bull', or 'A/B' for the outer corner of the double ring between segments A and B, e.g. '20/1'")
+    board_x: Optional[float] = Field(None, description="X coordinate on the board in millimetres, used when no keypoint is given")
+    board_y: Optional[float] = Field(None, description="Y coordinate on the board in millimetres, used when no keypoint is given")
+
+
+class HomographyRequest(BaseModel):
+    """Reference points used to solve the camera-to-board homography"""
+    points: List[ReferencePoint] = Field(min_length=4, description="At least four reference points, not all on one line")
+
+
+class BoardHomography(BaseModel):
+    """Perspective mapping from camera frame pixels to board millimetres"""
+    matrix: List[List[float]] = Field(description="3x3 homography matrix mapping frame pixels to board millimetres")
+    points: List[ReferencePoint] = Field(description="Reference points the homography was solved from")
+    reprojection_error_mm: float = Field(description="Mean distance between the mapped reference points and their board positions")
+    solved_at: float = Field(description="Unix time at which the homography was solved")
+    shift_x: float = Field(0.0, description="Camera movement along X in frame pixels compensated since solving")
+    shift_y: float = Field(0.0, description="Camera movement along Y in frame pixels compensated since solving")
+
+
+class HomographyStatus(BaseModel):
+    """State of the homography calibration and its per-frame validation"""
+    active: bool = Field(description="Whether scoring uses the homography instead of the circular calibration")
+    homography: Optional[BoardHomography] = Field(None, description="Current homography, if any")
+    checks: int = Field(description="Number of frames validated against the reference frame")
+    inconclusive: int = Field(description="Validations skipped because the frames did not correlate, e.g. when the board was occluded")
+    moves: int = Field(description="Number of camera movements detected and compensated")
+    last_shift: Optional[List[float]] = Field(None, description="Shift (x, y) in frame pixels measured on the last validated frame")
+    last_correlation: Optional[float] = Field(None, description="Phase correlation peak of the last validated frame (0-1)")
+
+
+class BoardLocation(BaseModel):
+    """Dartboard position found automatically in a camera frame"""
+    center_x: float = Field(description="X coordinate of the board centre in frame pixels")
+    center_y: float = Field(description="Y coordinate of the board centre in frame pixels")
+    radius: float = Field(description="Radius to the outer edge of the double ring in frame pixels")
+    rotation_adjustment: float = Field(description="Rotation of the segment layout in degrees, as in BoardCalibration")
+    axis_ratio: float = Field(description="Minor to major axis ratio of the fitted double ring ellipse (1 = seen front-on)")
+    ring_pixels: int = Field(description="Number of red and green ring pixels the fit is based on")
+    fingerprint: str = Field(description="Hash of the downsampled board region the location was computed from")
+    located_at: float = Field(description="Unix time of the localization")
+    applied: bool = Field(False, description="Whether the location was written to the calibration")
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
 
@@ -15,3 +15,9 @@ class DeleteImagesResponse(BaseModel):
     success: bool = Field(description="Whether the operation was successful")
     message: str = Field(description="Message describing the result of the operation")
     count: Optional[int] = Field(None, description="Number of images deleted")
+
+class CameraStatsResponse(BaseModel):
+    """Response model for camera capture statistics"""
+    cameras: Dict[str, Dict[str, Any]] = Field(description="Capture statistics per camera IP, including the remembered protocol and port, latency and failure rate")
+    frame_buffer: Dict[str, Any] = Field(description="Frames held in memory and in the feed directory, with retention limits and eviction counters")
+    previews: Dict[str, Any] = Field(description="Preview cache usage, hit rate and evictions, with the default preview width and quality")
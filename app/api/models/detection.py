@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -15,6 +15,13 @@ class BoundingBox(BaseModel):
     x2: float = Field(description="Right coordinate")
     y2: float = Field(description="Bottom coordinate")
 
+class DartScore(BaseModel):
+    """Score of a dart, computed from its estimated tip position"""
+    segment: int = Field(description="Segment number (1-20), 25 for the bull or 0 for a miss")
+    ring: str = Field(description="Ring hit: 'single', 'double', 'triple', 'outer-bull', 'inner-bull' or 'miss'")
+    points: int = Field(description="Points scored")
+    tip: Point = Field(description="Estimated tip position in frame coordinates")
+
 class DartDetection(BaseModel):
     """A detected dart with location and confidence score"""
     x_center: float = Field(description="X coordinate of center")
@@ -27,6 +34,14 @@ class DartDetection(BaseModel):
     detection_index: int = Field(description="Index of the detection")
     corners: List[List[float]] = Field(description="Coordinates of the rotated bounding box corners")
     bbox: BoundingBox = Field(description="Axis-aligned bounding box")
+    score: Optional[DartScore] = Field(None, description="Score of the dart based on the board calibration")
+    dart_id: Optional[int] = Field(None, description="Stable ID of the dart across frames, assigned by the tracker")
+
+class TrackEvent(BaseModel):
+    """A dart that appeared on or was removed from the board"""
+    type: str = Field(description="'new' or 'removed'")
+    dart_id: int = Field(description="Stable ID of the dart")
+    detection: DartDetection = Field(description="Latest detection of the dart")
 
 class ModelInfo(BaseModel):
     """Information about the model used for detection"""
@@ -39,7 +54,48 @@ class DetectionResponse(BaseModel):
     detections: List[DartDetection] = Field(description="List of detected darts")
     model_info: ModelInfo = Field(description="Information about the model used")
     darts_count: int = Field(description="Number of darts detected")
+    inference_skipped: bool = Field(False, description="Whether the response was reused without running the model")
+    skip_reason: Optional[str] = Field(None, description="Why inference was skipped, e.g. 'unchanged' or 'cache_hit'")
+    inference_tier: Optional[str] = Field(None, description="Inference tier that produced the detections: 'fast', 'high_res', 'tta' or 'region'")
+    events: List[TrackEvent] = Field(default_factory=list, description="Darts that appeared or were removed since the previous frame")
+
+class StageTimings(BaseModel):
+    """Duration of each stage of a capture and detection"""
+    capture_ms: float = Field(description="Time taken to get the snapshot from the camera and buffer it in memory")
+    inference_ms: float = Field(description="Time taken by detection, including waiting in the inference queue")
+    total_ms: float = Field(description="Time taken by the whole request")
+
+class CaptureDetectionResponse(DetectionResponse):
+    """Response from the capture and detection endpoint"""
+    filename: str = Field(description="Name of the captured frame in the feed, written in the background")
+    timings: StageTimings = Field(description="Duration of each stage")
+
+class TrackedDartsResponse(BaseModel):
+    """Darts currently tracked on the board"""
+    darts: List[DartDetection] = Field(description="Latest detection of each tracked dart, ordered by ID")
+    frames: int = Field(description="Number of frames processed by the tracker since the last reset")
 
 class DetectionError(BaseModel):
     """Error response from the detection endpoint"""
     error: str = Field(description="Error message")
+
+class ModelStatusResponse(BaseModel):
+    """State of the model loaded at startup"""
+    loaded: bool = Field(description="Whether the model is loaded and ready")
+    engine: Optional[str] = Field(None, description="Inference engine used to run the model")
+    model_path: Optional[str] = Field(None, description="Path to the model weights")
+    model_version: Optional[str] = Field(None, description="Identifier of the loaded model file")
+    load_time_ms: Optional[float] = Field(None, description="Time taken to load the model in milliseconds")
+    warmup_time_ms: Optional[float] = Field(None, description="Time taken by the warm-up inference in milliseconds")
+    error: Optional[str] = Field(None, description="Error message if the model failed to load")
+
+class PredictionStatsResponse(BaseModel):
+    """Statistics of the inference pipeline"""
+    scheduler: Dict[str, Any] = Field(description="Inference queue statistics")
+    batching: Dict[str, Any] = Field(description="Micro-batching statistics")
+    change_detection: Dict[str, Any] = Field(description="Change detection statistics")
+    result_cache: Dict[str, Any] = Field(description="Result cache statistics")
+    inference_tiers: Dict[str, Any] = Field(description="Inference tier policy statistics")
+    scoring: Dict[str, Any] = Field(description="Scoring raster statistics")
+    board_locator: Dict[str, Any] = Field(description="Board localization and drift check statistics")
+    tracking: Dict[str, Any] = Field(description="Dart tracking statistics")
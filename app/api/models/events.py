@@ -0,0 +1,27 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from models.detection import DetectionResponse
+
+
+class FrameEvent(BaseModel):
+    """Detections of a new camera frame, broadcast to all subscribers"""
+    source: str = Field(description="What captured the frame: 'camera' for snapshots, 'stream' for stream ingestion")
+    filename: str = Field(description="Name of the frame in the feed")
+    image_url: str = Field(description="Path of the full resolution frame image, relative to the API root")
+    preview_url: str = Field(description="Path of a preview of the frame at the default preview width, relative to the API root")
+    captured_at: float = Field(description="Unix time at which the frame was captured")
+    detection: DetectionResponse = Field(description="Detections and scores of the frame")
+
+class EventStatsResponse(BaseModel):
+    """Statistics of the event channel"""
+    queue_size: int = Field(description="Events queued per subscriber before it is dropped to the latest event")
+    subscribers: int = Field(description="Currently connected subscribers")
+    peak_subscribers: int = Field(description="Most subscribers connected at the same time")
+    connections: int = Field(description="Subscriptions since the server started")
+    published: int = Field(description="Events published")
+    delivered: int = Field(description="Events queued for subscribers, i.e. the total fan-out")
+    dropped: int = Field(description="Queued events skipped because a subscriber was too slow")
+    lagging_subscribers: int = Field(description="Connected subscribers that have had events dropped")
+    last_fanout_ms: Optional[float] = Field(None, description="Time taken to queue the last event for all subscribers")
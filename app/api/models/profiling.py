@@ -0,0 +1,19 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class ProfileInfo(BaseModel):
+    """A stored profile of a single request"""
+    id: str = Field(description="Profile ID, returned in the X-Profile-Id header of the profiled request")
+    mode: str = Field(description="What was recorded: 'cprofile', 'torch' or 'all'")
+    endpoint: str = Field(description="Path of the profiled request")
+    created_at: float = Field(description="Unix time at which the profile was recorded")
+    duration_ms: float = Field(description="Time spent in the profiled detection, including profiling overhead")
+    files: List[str] = Field(description="Download formats available for the profile: 'prof', 'txt' and/or 'torch'")
+
+class ProfileListResponse(BaseModel):
+    """Stored profiles"""
+    enabled: bool = Field(description="Whether requests may be profiled (PROFILING_ENABLED)")
+    torch_available: bool = Field(description="Whether the torch profiler can be used")
+    profiles: List[ProfileInfo] = Field(description="Stored profiles, newest first")
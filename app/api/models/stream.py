@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class StreamStatusResponse(BaseModel):
+    """State and statistics of the camera stream ingestion"""
+    running: bool = Field(description="Whether the stream is being read")
+    state: str = Field(description="Motion gate state: 'motion', 'settling' or 'still'")
+    frames_read: int = Field(description="Frames decoded since the server started")
+    frame_number: int = Field(description="Number of the latest frame")
+    fps: Optional[float] = Field(None, description="Smoothed rate of decoded frames per second")
+    motion_events: int = Field(description="Times motion started after the board was still")
+    detections: int = Field(description="Settled frames that went through detection")
+    dropped: int = Field(description="Settled frames replaced by a newer one before detection")
+    reconnects: int = Field(description="Times the stream was reopened")
+    last_frame_at: Optional[float] = Field(None, description="Unix time of the latest frame")
+    last_detection_at: Optional[float] = Field(None, description="Unix time of the latest detection")
+    last_detection_frame: Optional[int] = Field(None, description="Frame number of the latest detection")
+    last_latency_ms: Optional[float] = Field(None, description="Time from the board settling to its detection")
+    error: Optional[str] = Field(None, description="Last stream or detection error")
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY, HTTP_500_INTERNAL_SERVER_ERROR
+
+from models.calibration import BoardCalibration, BoardHomography, BoardLocation, HomographyRequest, HomographyStatus
+from services.board_locator import BoardLocator
+from services.calibration_service import CalibrationService
+from services.homography_service import HomographyService
+
+router = APIRouter()
+
+@router.get("/calibration", response_model=BoardCalibration)
+async def get_calibration() -> BoardCalibration:
+    """
+    Returns the current dartboard calibration.
+    """
+    return CalibrationService.get_calibration()
+
+@router.put("/calibration", response_model=BoardCalibration)
+async def update_calibration(calibration: BoardCalibration) -> BoardCalibration:
+    """
+    Replaces the dartboard calibration and saves it to the calibration file.
+    """
+    try:
+        return await run_in_threadpool(CalibrationService.update_calibration, calibration)
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save calibration: {type(e).__name__} - {str(e)}"
+        )
+
+@router.get("/calibration/homography", response_model=HomographyStatus)
+async def get_homography() -> HomographyStatus:
+    """
+    Returns the camera-to-board homography and the camera movement checks.
+    """
+    return await run_in_threadpool(HomographyService.get_status)
+
+@router.put("/calibration/homography", response_model=BoardHomography)
+async def update_homography(request: HomographyRequest) -> BoardHomography:
+    """
+    Solves the camera-to-board homography from reference points and saves it.
+
+    Scoring uses the homography instead of the circular calibration from then on.
+    """
+    try:
+        return await run_in_threadpool(HomographyService.update, request.points)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save homography: {type(e).__name__} - {str(e)}"
+        )
+
+@router.delete("/calibration/homography", response_model=HomographyStatus)
+async def delete_homography() -> HomographyStatus:
+    """
+    Removes the homography so scoring falls back to the circular calibration.
+    """
+    try:
+        await run_in_threadpool(HomographyService.clear)
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to remove homography: {type(e).__name__} - {str(e)}"
+        )
+    return await run_in_threadpool(HomographyService.get_status)
+
+@router.post("/calibration/locate", response_model=BoardLocation)
+async def locate_board(
+    file: UploadFile = File(...),
+    apply: bool = Query(True, description="Write the found centre, radius and rotation to the calibration")
+) -> BoardLocation:
+    """
+    Finds the dartboard in an uploaded frame from the red and green ring colours.
+
+    The location becomes the reference for the drift checks run on later frames.
+    """
+    contents = await file.read()
+    try:
+        return await run_in_threadpool(BoardLocator.relocate, contents, apply)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to locate board: {type(e).__name__} - {str(e)}"
+        )
@@ -1,14 +1,22 @@
+import asyncio
 import os
+from typing import Dict, Hashable, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from starlette.status import HTTP_404_NOT_FOUND
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_304_NOT_MODIFIED, HTTP_404_NOT_FOUND
 
-from models.camera import CameraImageResponse, DeleteImagesResponse
+from models.camera import CameraImageResponse, CameraStatsResponse, DeleteImagesResponse
 from services.camera_service import CameraService
+from services.frame_buffer import BufferedFrame, FrameBuffer
+from services.preview_service import Preview, PreviewService
 
 router = APIRouter()
 
+# Previews being generated, shared by concurrent requests for the same variant
+_pending_previews: Dict[Hashable, asyncio.Future] = {}
+
 @router.post("/camera/images", response_model=CameraImageResponse)
 async def take_picture() -> CameraImageResponse:
     """
@@ -19,7 +27,7 @@ async def take_picture() -> CameraImageResponse:
         JSON with the status and file path if successful
     """
     try:
-        file_path = CameraService.take_picture()
+        file_path = await CameraService.take_picture()
 
         if file_path:
             # Extract just the filename for the response
@@ -54,6 +62,17 @@ async def take_picture() -> CameraImageResponse:
             filename=None
         )
 
+@router.get("/camera/stats", response_model=CameraStatsResponse)
+async def get_camera_stats() -> CameraStatsResponse:
+    """
+    Returns capture latency and failure statistics of the cameras and the frame buffer.
+    """
+    return CameraStatsResponse(
+        cameras=CameraService.get_stats(),
+        frame_buffer=await run_in_threadpool(FrameBuffer.get_stats),
+        previews=PreviewService.get_stats()
+    )
+
 @router.delete("/camera/images", response_model=DeleteImagesResponse)
 async def delete_pictures() -> DeleteImagesResponse:
     """
@@ -63,7 +82,8 @@ async def delete_pictures() -> DeleteImagesResponse:
         JSON with status and count of deleted files
     """
     try:
-        count = CameraService.delete_all_pictures()
+        count = await run_in_threadpool(CameraService.delete_all_pictures)
+        PreviewService.clear()
         return DeleteImagesResponse(
             success=True,
             message=f"Deleted {count} images",
@@ -77,29 +97,139 @@ async def delete_pictures() -> DeleteImagesResponse:
         )
 
 @router.get("/camera/images/latest")
-async def get_latest_picture():
+async def get_latest_picture() -> Response:
     """
-    Returns the latest picture from the feed directory.
+    Returns the latest picture, served from the in-memory frame buffer.
 
     Returns:
         The image file if available, or a 404 error if no images exist
     """
     try:
-        file_path = CameraService.get_latest_picture()
-
-        if file_path and os.path.exists(file_path):
-            return FileResponse(
-                file_path,
-                media_type="image/jpeg",
-                filename=os.path.basename(file_path)
-            )
-        else:
-            raise HTTPException(
-                status_code=HTTP_404_NOT_FOUND,
-                detail="No images available"
-            )
+        frame = await run_in_threadpool(CameraService.get_latest_picture)
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
             detail=f"Error retrieving image: {str(e)}"
         )
+
+    if frame is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail="No images available"
+        )
+    return Response(
+        content=frame.data,
+        media_type="image/jpeg",
+        headers={"Content-Disposition": f'attachment; filename="{frame.record.filename}"'}
+    )
+
+@router.get("/camera/images/latest/preview")
+async def get_latest_preview(
+    width: Optional[int] = Query(None, ge=16, le=4096, description="Width of the preview in pixels, PREVIEW_DEFAULT_WIDTH if not set"),
+    roi: bool = Query(False, description="Crop the preview to the calibrated board"),
+    format: Literal["jpeg", "webp"] = Query("jpeg", description="Image format of the preview"),
+    quality: Optional[int] = Query(None, ge=1, le=95, description="Encoder quality, PREVIEW_QUALITY if not set"),
+    if_none_match: Optional[str] = Header(None)
+) -> Response:
+    """
+    Returns a resized preview of the latest picture.
+
+    The response has a strong ETag, so polling with If-None-Match returns 304 Not Modified
+    until a new picture is taken.
+
+    Returns:
+        The preview image, 304 if the client has it already, or a 404 error if no images exist
+    """
+    frame = await run_in_threadpool(CameraService.get_latest_picture)
+    if frame is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail="No images available"
+        )
+    return await _preview_response(frame, width, roi, format, quality, if_none_match)
+
+@router.get("/camera/images/{filename}/preview")
+async def get_preview(
+    filename: str,
+    width: Optional[int] = Query(None, ge=16, le=4096, description="Width of the preview in pixels, PREVIEW_DEFAULT_WIDTH if not set"),
+    roi: bool = Query(False, description="Crop the preview to the calibrated board"),
+    format: Literal["jpeg", "webp"] = Query("jpeg", description="Image format of the preview"),
+    quality: Optional[int] = Query(None, ge=1, le=95, description="Encoder quality, PREVIEW_QUALITY if not set"),
+    if_none_match: Optional[str] = Header(None)
+) -> Response:
+    """
+    Returns a resized preview of a picture of the feed by its file name.
+
+    Returns:
+        The preview image, 304 if the client has it already, or a 404 error if it is not in the feed
+    """
+    frame = await run_in_threadpool(CameraService.get_picture, filename)
+    if frame is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+    return await _preview_response(frame, width, roi, format, quality, if_none_match)
+
+async def _preview_response(
+    frame: BufferedFrame,
+    width: Optional[int],
+    roi: bool,
+    image_format: str,
+    quality: Optional[int],
+    if_none_match: Optional[str]
+) -> Response:
+    """Answer a preview request from the client's copy, the preview cache or a newly generated preview."""
+    config = PreviewService.get_preview_config()
+    width = width or config["default_width"]
+    quality = quality or config["quality"]
+
+    key = PreviewService.make_key(frame.record, width, roi, image_format, quality)
+    etag = PreviewService.make_etag(key)
+    # Clients must revalidate, since the latest picture changes under the same URL
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+
+    pending = _pending_previews.get(key)
+    if pending is not None:
+        preview: Preview = await asyncio.shield(pending)
+    else:
+        pending = _pending_previews[key] = asyncio.get_running_loop().create_future()
+        pending.add_done_callback(lambda future: future.cancelled() or future.exception())
+        try:
+            preview = await run_in_threadpool(
+                PreviewService.get_preview, frame.record, frame.data, key, width, roi, image_format, quality
+            )
+            pending.set_result(preview)
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            if not pending.done():
+                pending.cancel()
+            del _pending_previews[key]
+
+    return Response(content=preview.data, media_type=preview.media_type, headers=headers)
+
+@router.get("/camera/images/{filename}")
+async def get_picture(filename: str) -> Response:
+    """
+    Returns a picture of the feed by its file name, from memory when it is recent.
+
+    Returns:
+        The image file, or a 404 error if it is not in the feed
+    """
+    frame = await run_in_threadpool(CameraService.get_picture, filename)
+    if frame is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+    return Response(
+        content=frame.data,
+        media_type="image/jpeg",
+        headers={"Content-Disposition": f'attachment; filename="{frame.record.filename}"'}
+    )
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from models.events import EventStatsResponse
+from services.event_broadcaster import EventBroadcaster
+
+router = APIRouter()
+
+@router.get("/events")
+async def subscribe_events() -> StreamingResponse:
+    """
+    Streams the detections of every new camera frame as Server-Sent Events.
+
+    Each `detection` event carries a FrameEvent with the detections, scores and image URL
+    of the frame. The latest event is sent on connect, and clients that fall behind skip
+    to the latest event.
+    """
+    return StreamingResponse(
+        EventBroadcaster.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/events/stats", response_model=EventStatsResponse)
+async def get_event_stats() -> EventStatsResponse:
+    """
+    Returns subscriber and fan-out statistics of the event channel.
+    """
+    return EventStatsResponse(**EventBroadcaster.get_stats())
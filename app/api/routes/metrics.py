@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.metrics import Metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Returns per-stage latency histograms and pipeline counters in the Prometheus text format.
+    """
+    return PlainTextResponse(Metrics.render(), media_type="text/plain; version=0.0.4")
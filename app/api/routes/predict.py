@@ -1,22 +1,211 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
-import os
+import asyncio
+import time
 
+from fastapi import APIRouter, UploadFile, File, Depends, Header, HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel
+from starlette.status import (
+    HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR, HTTP_502_BAD_GATEWAY,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+from typing import Any, Dict, Hashable, Literal, Optional, Tuple
+
+from services.board_locator import BoardLocator
+from services.camera_client import CameraError
+from services.camera_service import CameraService
+from services.change_detector import ChangeDetector
+from services.dart_tracker import DartTracker
+from services.event_broadcaster import EventBroadcaster
+from services.inference_policy import InferencePolicy
+from services.inference_scheduler import InferenceScheduler, SchedulerBusyError
+from services.metrics import Metrics
+from services.micro_batcher import MicroBatcher
+from services.model_registry import ModelRegistry
 from services.prediction_service import PredictionService
-from models.detection import DetectionResponse, DetectionError
+from services.request_profiler import ProfilerBusyError, RequestProfiler
+from services.result_cache import ResultCache
+from services.scoring_service import ScoringService
+from models.events import FrameEvent
+from models.detection import (
+    CaptureDetectionResponse, DetectionResponse, DetectionError, ModelStatusResponse, PredictionStatsResponse, StageTimings,
+)
 
 router = APIRouter()
 
-def get_model_path():
-    # This function will be called by FastAPI to get the model path
-    from app import MODEL_PATH
-    return os.path.abspath(MODEL_PATH)
+# Detections in progress by result cache key, only touched from the event loop
+_pending_detections: Dict[Hashable, asyncio.Future] = {}
+
+ProfileMode = Literal["cprofile", "torch", "all"]
+PROFILE_DESCRIPTION = (
+    "Profile this request: 'cprofile' for a Python call profile, 'torch' for a torch profiler trace or 'all' "
+    "for both. Requires PROFILING_ENABLED. The profile ID is returned in the X-Profile-Id header."
+)
+
+def get_model() -> Any:
+    """
+    Dependency providing the model loaded at startup by the model registry.
+
+    Raises:
+        HTTPException: 503 if the model is not loaded
+    """
+    model = ModelRegistry.get_model()
+    if model is None:
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model is not loaded"
+        )
+    return model
+
+@router.get("/model", response_model=ModelStatusResponse)
+async def get_model_status() -> ModelStatusResponse:
+    """
+    Returns the state of the model registry, including load and warm-up time.
+    """
+    return ModelStatusResponse(**ModelRegistry.get_status())
+
+@router.get("/predict/stats", response_model=PredictionStatsResponse)
+async def get_prediction_stats() -> PredictionStatsResponse:
+    """
+    Returns statistics of the inference pipeline.
+    """
+    return PredictionStatsResponse(
+        scheduler=InferenceScheduler.get_stats(),
+        batching=MicroBatcher.get_stats(),
+        change_detection=ChangeDetector.get_stats(),
+        result_cache=ResultCache.get_stats(),
+        inference_tiers=InferencePolicy.get_stats(),
+        scoring=ScoringService.get_stats(),
+        board_locator=BoardLocator.get_stats(),
+        tracking=DartTracker.get_stats()
+    )
+
+async def _run_detection(model: Any, contents: bytes, budget_ms: Optional[float]) -> DetectionResponse:
+    """
+    Detect darts in an image through the result cache and the inference thread pool.
+
+    Raises:
+        HTTPException: 503 if the inference queue is full, 500 if detection fails
+    """
+    # Return the stored response when the same image was submitted before
+    budget_ms = InferencePolicy.resolve_budget(budget_ms)
+    cache_key = ResultCache.make_key(
+        contents, ModelRegistry.get_model_version(), (PredictionService.get_settings_key(), budget_ms)
+    )
+    cached = ResultCache.get(cache_key)
+    if cached is not None:
+        Metrics.count("cache_hits", "result")
+        return cached
+
+    # Identical images submitted while one is being detected, e.g. requests that shared a
+    # camera snapshot, wait for that detection instead of running the model again
+    pending = _pending_detections.get(cache_key)
+    if pending is not None:
+        Metrics.count("cache_hits", "coalesced")
+        result = await asyncio.shield(pending)
+        return result.model_copy(update={"inference_skipped": True, "skip_reason": "cache_hit", "events": []})
+
+    pending = _pending_detections[cache_key] = asyncio.get_running_loop().create_future()
+    # Failures are raised to the request that ran the detection, waiting requests are optional
+    pending.add_done_callback(lambda future: future.cancelled() or future.exception())
+    try:
+        result = await _detect(model, contents, budget_ms)
+        ResultCache.put(cache_key, result)
+        pending.set_result(result)
+        return result
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        if not pending.done():
+            pending.cancel()
+        del _pending_detections[cache_key]
+
+async def _detect(model: Any, contents: bytes, budget_ms: float) -> DetectionResponse:
+    """Run the prediction service, raising HTTP errors for a full queue or a failed detection."""
+    # Run the prediction service on the inference thread pool, batched with
+    # concurrent requests when micro-batching is enabled
+    try:
+        if MicroBatcher.is_enabled():
+            result = await MicroBatcher.submit(model, contents, budget_ms)
+        else:
+            result = await InferenceScheduler.run(PredictionService.detect_darts, model, contents, budget_ms)
+    except SchedulerBusyError as e:
+        raise _scheduler_busy(e)
+    return _check_result(result)
+
+async def _profile_detection(
+    model: Any,
+    contents: bytes,
+    budget_ms: Optional[float],
+    mode: str,
+    endpoint: str
+) -> Tuple[DetectionResponse, Optional[str]]:
+    """
+    Detect darts in an image while recording a profile of the detection.
+
+    The detection always runs: the result cache, coalescing and micro-batching are
+    bypassed so the profile shows the work of this request alone.
+
+    Returns:
+        Tuple of (response, profile ID or None if the profile could not be stored)
+
+    Raises:
+        HTTPException: 403 if profiling is disabled, 400 for an unavailable mode, 409 while
+            another request is profiled, 503 if the inference queue is full, 500 if detection fails
+    """
+    if not RequestProfiler.is_enabled():
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Profiling is disabled, set PROFILING_ENABLED")
+    try:
+        result, profile = await InferenceScheduler.run(
+            RequestProfiler.run, mode, endpoint,
+            PredictionService.detect_darts, model, contents, InferencePolicy.resolve_budget(budget_ms)
+        )
+    except SchedulerBusyError as e:
+        raise _scheduler_busy(e)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    return _check_result(result), profile["id"] if profile["files"] else None
+
+def _scheduler_busy(e: SchedulerBusyError) -> HTTPException:
+    """503 error for a full inference queue"""
+    Metrics.count("errors", "scheduler")
+    return HTTPException(
+        status_code=HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Inference queue is full, retry later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _check_result(result: Any) -> DetectionResponse:
+    """Raise a 500 error if the prediction service returned an error."""
+    if isinstance(result, dict) and "error" in result:
+        raise HTTPException(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result["error"]
+        )
+    return result
+
+def _json_response(response: BaseModel, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serialize a response model to JSON, timed as the serialize stage.
+
+    The model was built by the service, so it is not validated again as FastAPI
+    would do for a returned model.
+    """
+    start = time.perf_counter()
+    content = response.model_dump_json()
+    Metrics.observe_since("serialize", start)
+    return Response(content=content, media_type="application/json", headers=headers)
 
 @router.post("/predict", response_model=DetectionResponse, responses={500: {"model": DetectionError}})
 async def predict(
     file: UploadFile = File(...),
-    model_path: str = Depends(get_model_path)
-) -> DetectionResponse:
+    budget_ms: Optional[float] = Query(None, ge=0, description="Latency budget in milliseconds for escalating to more expensive inference tiers when nothing is detected"),
+    profile: Optional[ProfileMode] = Query(None, description=PROFILE_DESCRIPTION),
+    x_profile: Optional[ProfileMode] = Header(None, description=PROFILE_DESCRIPTION),
+    model: Any = Depends(get_model)
+) -> Response:
     """
     Process an uploaded image and return dart detections
     
@@ -25,19 +214,15 @@ async def predict(
     """
     try:
         # Read image
+        start = time.perf_counter()
         contents = await file.read()
-        
-        # Call prediction service
-        result = PredictionService.detect_darts_pt(model_path, contents)
-        
-        # Check if there's an error in the result
-        if isinstance(result, dict) and "error" in result:
-            raise HTTPException(
-                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=result["error"]
-            )
-        
-        return result
+        Metrics.observe_since("upload_read", start)
+
+        profile = profile or x_profile
+        if profile is not None:
+            response, profile_id = await _profile_detection(model, contents, budget_ms, profile, "/predict")
+            return _json_response(response, {"X-Profile-Id": profile_id} if profile_id else None)
+        return _json_response(await _run_detection(model, contents, budget_ms))
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -48,3 +233,64 @@ async def predict(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process image: {type(e).__name__} - {str(e)}"
         )
+
+@router.post("/camera/predict", response_model=CaptureDetectionResponse, responses={500: {"model": DetectionError}})
+async def capture_and_predict(
+    budget_ms: Optional[float] = Query(None, ge=0, description="Latency budget in milliseconds for escalating to more expensive inference tiers when nothing is detected"),
+    profile: Optional[ProfileMode] = Query(None, description=PROFILE_DESCRIPTION),
+    x_profile: Optional[ProfileMode] = Header(None, description=PROFILE_DESCRIPTION),
+    model: Any = Depends(get_model)
+) -> Response:
+    """
+    Take a photo from the camera and return its dart detections in one request
+
+    The snapshot is passed to the model in memory. It is added to the frame buffer
+    and written to the feed directory in the background, so it can still be fetched
+    from /camera/images/latest.
+    """
+    start = time.perf_counter()
+    try:
+        snapshot, record, _ = await CameraService.capture_frame()
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except CameraError as e:
+        raise HTTPException(status_code=HTTP_502_BAD_GATEWAY, detail=str(e))
+    captured = time.perf_counter()
+
+    headers = None
+    try:
+        profile = profile or x_profile
+        if profile is not None:
+            response, profile_id = await _profile_detection(model, snapshot, budget_ms, profile, "/camera/predict")
+            headers = {"X-Profile-Id": profile_id} if profile_id else None
+        else:
+            response = await _run_detection(model, snapshot, budget_ms)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process image: {type(e).__name__} - {str(e)}"
+        )
+    detected = time.perf_counter()
+
+    # Every subscriber gets the result of this capture, so other clients need not capture themselves.
+    # Requests that shared the snapshot publish it only once.
+    EventBroadcaster.publish("detection", FrameEvent(
+        source="camera",
+        filename=record.filename,
+        image_url=f"/camera/images/{record.filename}",
+        preview_url=f"/camera/images/{record.filename}/preview",
+        captured_at=record.captured_at,
+        detection=response
+    ).model_dump(mode="json"), key=record.filename)
+
+    return _json_response(CaptureDetectionResponse(
+        **dict(response),
+        filename=record.filename,
+        timings=StageTimings(
+            capture_ms=(captured - start) * 1000,
+            inference_ms=(detected - captured) * 1000,
+            total_ms=(time.perf_counter() - start) * 1000
+        )
+    ), headers)
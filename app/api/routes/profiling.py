@@ -0,0 +1,52 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_404_NOT_FOUND
+
+from models.profiling import ProfileInfo, ProfileListResponse
+from services.request_profiler import RequestProfiler
+
+router = APIRouter()
+
+# Media types of the profile download formats
+PROFILE_MEDIA_TYPES = {
+    "prof": "application/octet-stream",
+    "txt": "text/plain",
+    "torch": "application/json",
+}
+
+@router.get("/profiles", response_model=ProfileListResponse)
+async def list_profiles() -> ProfileListResponse:
+    """
+    Returns the stored request profiles.
+
+    A /predict or /camera/predict request is profiled when PROFILING_ENABLED is set and
+    it has a `profile` query parameter or an X-Profile header.
+    """
+    profiles = await run_in_threadpool(RequestProfiler.list_profiles)
+    return ProfileListResponse(
+        enabled=RequestProfiler.is_enabled(),
+        torch_available=RequestProfiler.is_torch_available(),
+        profiles=[ProfileInfo(**profile) for profile in profiles]
+    )
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: Literal["prof", "txt", "torch"] = Query("prof", description="'prof' for cProfile data, 'txt' for a summary, 'torch' for the torch trace")
+) -> FileResponse:
+    """
+    Downloads a stored profile.
+
+    Returns:
+        The profile file, or a 404 error if the profile or the format does not exist
+    """
+    path = RequestProfiler.get_profile_path(profile_id, format)
+    if path is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, media_type=PROFILE_MEDIA_TYPES[format], filename=path.rsplit("/", 1)[-1])
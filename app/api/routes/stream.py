@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_422_UNPROCESSABLE_ENTITY
+
+from models.detection import DetectionResponse
+from models.stream import StreamStatusResponse
+from services.stream_ingest import FRAME_JPEG_QUALITY, StreamIngestService
+
+router = APIRouter()
+
+@router.get("/stream", response_model=StreamStatusResponse)
+async def get_stream_status() -> StreamStatusResponse:
+    """
+    Returns the state of the camera stream ingestion.
+    """
+    return StreamStatusResponse(**StreamIngestService.get_status())
+
+@router.post("/stream/start", response_model=StreamStatusResponse)
+async def start_stream() -> StreamStatusResponse:
+    """
+    Starts reading the configured camera stream, detecting darts whenever the board settles.
+    """
+    try:
+        StreamIngestService.start()
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return StreamStatusResponse(**StreamIngestService.get_status())
+
+@router.post("/stream/stop", response_model=StreamStatusResponse)
+async def stop_stream() -> StreamStatusResponse:
+    """
+    Stops reading the camera stream.
+    """
+    await run_in_threadpool(StreamIngestService.stop)
+    return StreamStatusResponse(**StreamIngestService.get_status())
+
+@router.get("/stream/detections/latest", response_model=DetectionResponse)
+async def get_latest_stream_detection() -> DetectionResponse:
+    """
+    Returns the detections of the last frame in which the board settled.
+    """
+    response = StreamIngestService.get_latest_detection()
+    if response is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No stream frame has been detected yet")
+    return response
+
+@router.get("/stream/frame")
+async def get_latest_stream_frame() -> Response:
+    """
+    Returns the latest stream frame as a JPEG image.
+    """
+    frame = StreamIngestService.get_latest_frame()
+    if frame is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No stream frame available")
+
+    def encode() -> bytes:
+        import cv2
+        return cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, FRAME_JPEG_QUALITY])[1].tobytes()
+
+    return Response(content=await run_in_threadpool(encode), media_type="image/jpeg")
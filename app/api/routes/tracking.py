@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from models.detection import TrackedDartsResponse
+from services.dart_tracker import DartTracker
+
+router = APIRouter()
+
+@router.get("/tracker", response_model=TrackedDartsResponse)
+async def get_tracked_darts() -> TrackedDartsResponse:
+    """
+    Returns the darts currently tracked on the board, with their stable IDs.
+    """
+    return DartTracker.get_darts()
+
+@router.post("/tracker/reset", response_model=TrackedDartsResponse)
+async def reset_tracker() -> TrackedDartsResponse:
+    """
+    Forgets the tracked darts, e.g. when the darts are pulled at the end of a turn.
+    """
+    DartTracker.reset()
+    return DartTracker.get_darts()
@@ -0,0 +1,362 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from models.calibration import BoardLocation
+from services.calibration_service import CalibrationService
+from services.homography_service import phase_correlation
+from services.image_decoder import ImageDecoder, ImageSource
+
+# HSV thresholds (PIL scale 0-255) of the red and green ring segments
+RED_HUE_MARGIN = 12
+GREEN_HUE_RANGE = (60, 120)
+MIN_SATURATION = 90
+MIN_VALUE = 50
+# Minimum share of ring pixels in the downsampled frame for a board to be considered found
+MIN_RING_FRACTION = 0.0005
+# Margin around the board used for the drift fingerprint, as a proportion of the board radius
+FINGERPRINT_MARGIN = 0.25
+# Longest wait in seconds between automatic localization attempts after repeated failures
+MAX_RETRY_DELAY = 300.0
+
+
+def fit_ellipse(points: np.ndarray) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Fit an ellipse to points by algebraic least squares.
+
+    Args:
+        points: Array of shape (N, 2), N >= 5
+
+    Returns:
+        Tuple of (center_x, center_y, semi_major, semi_minor), or None if the best
+        fitting conic is not an ellipse
+    """
+    mean = points.mean(axis=0)
+    scale = np.abs(points - mean).max() or 1.0
+    x, y = ((points - mean) / scale).T
+    design = np.stack([x * x, x * y, y * y, x, y, np.ones_like(x)], axis=1)
+    a, b, c, d, e, f = np.linalg.svd(design, full_matrices=False)[2][-1]
+
+    if b * b - 4 * a * c >= 0:
+        return None
+
+    # Centre where the gradient of the conic vanishes
+    cx, cy = np.linalg.solve([[2 * a, b], [b, 2 * c]], [-d, -e])
+    constant = a * cx * cx + b * cx * cy + c * cy * cy + d * cx + e * cy + f
+    eigenvalues = np.linalg.eigvalsh([[a, b / 2], [b / 2, c]])
+    axes_squared = -constant / eigenvalues
+    if np.any(axes_squared <= 0):
+        return None
+
+    semi_major, semi_minor = np.sqrt(np.sort(axes_squared)[::-1]) * scale
+    return float(cx * scale + mean[0]), float(cy * scale + mean[1]), float(semi_major), float(semi_minor)
+
+
+class BoardLocator:
+    """
+    Finds the dartboard in camera frames and keeps the calibration in sync with it.
+
+    A full localization segments the red and green ring segments in a downsampled
+    frame, fits an ellipse to the double ring for the centre and radius and reads the
+    rotation from the alternating colours along that ring. The result is cached with a
+    fingerprint of the board region. Later frames only get a drift check on a small
+    thumbnail, and the board is re-located when it has moved past the tolerance.
+
+    Automatic checks run on the inference thread, so they stay cheap: after a failed
+    localization, checks are skipped for a delay that doubles with each consecutive
+    failure, and locations are written to the calibration on a background thread
+    rather than in the middle of the request.
+    """
+
+    _lock = threading.Lock()
+    _location: Optional[BoardLocation] = None
+    _fingerprint: Optional[np.ndarray] = None
+    _fingerprint_box: Optional[Tuple[int, int, int, int]] = None
+    _consecutive_failures: int = 0
+    _retry_at: float = 0.0
+
+    # Metrics
+    _checks: int = 0
+    _inconclusive: int = 0
+    _relocalizations: int = 0
+    _failures: int = 0
+    _last_drift: Optional[float] = None
+
+    @staticmethod
+    def get_locator_config() -> Dict[str, Any]:
+        """
+        Get board localization configuration from environment variables.
+
+        Returns:
+            Dict with whether frames are checked during prediction, the long side of the frame used
+            for localization, the fingerprint size, the drift tolerance in frame pixels, the minimum
+            correlation of a conclusive drift check, whether locations update the calibration and
+            the delay in seconds before the first retry after a failed localization
+        """
+        return {
+            "enabled": os.environ.get("BOARD_LOCATOR_ENABLED", "false").lower() in ("1", "true", "yes"),
+            "size": max(240, int(os.environ.get("BOARD_LOCATOR_SIZE", "960"))),
+            "fingerprint_size": max(32, int(os.environ.get("BOARD_FINGERPRINT_SIZE", "128"))),
+            "drift_tolerance": float(os.environ.get("BOARD_DRIFT_TOLERANCE", "6")),
+            "min_correlation": float(os.environ.get("BOARD_DRIFT_MIN_CORRELATION", "0.3")),
+            "apply": os.environ.get("BOARD_LOCATOR_APPLY", "true").lower() in ("1", "true", "yes"),
+            "retry_delay": max(0.0, float(os.environ.get("BOARD_LOCATOR_RETRY_DELAY", "5"))),
+        }
+
+    @staticmethod
+    def locate(image: ImageSource, size: int, rotation_hint: float = 0.0) -> BoardLocation:
+        """
+        Find the board in a frame.
+
+        Args:
+            image: JPEG bytes of the camera frame, or the decoded frame
+            size: Long side of the downsampled frame used for the search
+            rotation_hint: Expected rotation adjustment. The colours only determine the rotation
+                up to multiples of 36 degrees, so the candidate closest to the hint is used.
+
+        Returns:
+            BoardLocation in frame coordinates (not yet applied)
+
+        Raises:
+            ValueError: If no board is found
+        """
+        img = ImageDecoder.open(image)
+        img, (scale_x, scale_y, _, _) = ImageDecoder.decode(img, size / max(img.size))
+        if max(img.size) > size:
+            factor = size / max(img.size)
+            img = img.resize((round(img.width * factor), round(img.height * factor)), Image.BILINEAR)
+            scale_x, scale_y = scale_x / factor, scale_y / factor
+
+        hsv = np.asarray(img.convert("HSV"), dtype=np.int16)
+        hue, saturation, value = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+        colored = (saturation >= MIN_SATURATION) & (value >= MIN_VALUE)
+        red = colored & ((hue <= RED_HUE_MARGIN) | (hue >= 255 - RED_HUE_MARGIN))
+        green = colored & (hue >= GREEN_HUE_RANGE[0]) & (hue <= GREEN_HUE_RANGE[1])
+
+        rows, cols = np.nonzero(red | green)
+        if len(rows) < MIN_RING_FRACTION * red.size:
+            raise ValueError("No dartboard found: too few red and green ring pixels")
+        points = np.stack([cols + 0.5, rows + 0.5], axis=1)
+        is_red = red[rows, cols]
+
+        # Robust first guess: the rings are symmetric around the centre
+        center = np.median(points, axis=0)
+        distances = np.hypot(*(points - center).T)
+        outer = np.percentile(distances, 97)
+
+        # Fit the double ring, which is the outermost band of colour, then refine once
+        band = points[(distances > 0.8 * outer) & (distances < 1.1 * outer)]
+        ellipse = None
+        for _ in range(2):
+            if len(band) < 5:
+                break
+            ellipse = fit_ellipse(band)
+            if ellipse is None:
+                break
+            cx, cy, semi_major, semi_minor = ellipse
+            mean_radius = (semi_major + semi_minor) / 2
+            normalized = np.hypot(points[:, 0] - cx, points[:, 1] - cy) / mean_radius
+            band = points[(normalized > 0.9) & (normalized < 1.1)]
+        if ellipse is None:
+            raise ValueError("No dartboard found: the ring pixels do not form an ellipse")
+
+        cx, cy, semi_major, semi_minor = ellipse
+        calibration = CalibrationService.get_calibration()
+        band_ratio = (calibration.double_inner_ratio + calibration.double_outer_ratio) / 2
+        radius = (semi_major + semi_minor) / 2 / band_ratio
+
+        # Red and green alternate every 18 degrees along the double ring, so the colour
+        # signal has a period of 36 degrees and its phase locates the red segments
+        in_band = np.abs(np.hypot(points[:, 0] - cx, points[:, 1] - cy) / (radius * band_ratio) - 1) < 0.1
+        theta = np.arctan2(points[in_band, 0] - cx, -(points[in_band, 1] - cy))
+        signal = np.where(is_red[in_band], 1.0, -1.0)
+        red_center = -math.degrees(np.angle(np.sum(signal * np.exp(-10j * theta)))) / 10
+
+        # Segment 20 is red; with rotation r it is centred at 9 - r degrees clockwise from the top
+        candidates = [(9 - red_center - 36 * k) % 360 for k in range(10)]
+        rotation = min(candidates, key=lambda r: abs((r - rotation_hint + 180) % 360 - 180))
+        if rotation > 180:
+            rotation -= 360
+
+        return BoardLocation(
+            center_x=cx * scale_x,
+            center_y=cy * scale_y,
+            radius=radius * (scale_x + scale_y) / 2,
+            rotation_adjustment=rotation,
+            axis_ratio=semi_minor / semi_major,
+            ring_pixels=int(len(points)),
+            fingerprint="",
+            located_at=time.time()
+        )
+
+    @classmethod
+    def relocate(cls, image: ImageSource, apply: Optional[bool] = None) -> BoardLocation:
+        """
+        Run a full localization, cache it with the frame fingerprint and optionally apply it.
+
+        Args:
+            image: JPEG bytes of the camera frame, or the decoded frame
+            apply: Whether to write the location to the calibration, None for the configured default
+
+        Returns:
+            BoardLocation: The new location
+
+        Raises:
+            ValueError: If no board is found
+        """
+        config = cls.get_locator_config()
+        calibration = CalibrationService.get_calibration()
+        location = cls.locate(image, config["size"], calibration.rotation_adjustment)
+
+        img = ImageDecoder.open(image)
+        box = cls._board_box(location, img.size)
+        fingerprint = np.asarray(ImageDecoder.thumbnail(img, box, config["fingerprint_size"]), dtype=np.float64)
+        digest = hashlib.blake2b((fingerprint // 16).astype(np.uint8).tobytes(), digest_size=8).hexdigest()
+
+        apply = config["apply"] if apply is None else apply
+        location = location.model_copy(update={"fingerprint": digest, "applied": False})
+
+        with cls._lock:
+            cls._location = location
+            cls._fingerprint = fingerprint
+            cls._fingerprint_box = box
+            cls._relocalizations += 1
+        return cls._apply(location) if apply else location
+
+    @classmethod
+    def _apply(cls, location: BoardLocation) -> BoardLocation:
+        """Write a location to the calibration and mark the cached location as applied."""
+        calibration = CalibrationService.get_calibration()
+        CalibrationService.update_calibration(calibration.model_copy(update={
+            "center_x": location.center_x,
+            "center_y": location.center_y,
+            "radius": location.radius,
+            "rotation_adjustment": location.rotation_adjustment,
+        }))
+
+        location = location.model_copy(update={"applied": True})
+        with cls._lock:
+            if cls._location is not None and cls._location.located_at == location.located_at:
+                cls._location = location
+        return location
+
+    @classmethod
+    def _apply_in_background(cls, location: BoardLocation) -> None:
+        """Write a location found during a request to the calibration on another thread."""
+        def apply() -> None:
+            try:
+                cls._apply(location)
+            except Exception as e:
+                print(f"Error applying board location: {type(e).__name__} - {str(e)}")
+
+        threading.Thread(target=apply, name="board-locator-apply", daemon=True).start()
+
+    @classmethod
+    def check(cls, image: ImageSource) -> None:
+        """
+        Check a frame for board drift, re-locating the board when it has moved.
+
+        Does nothing unless BOARD_LOCATOR_ENABLED is set. Failures are logged, the
+        previous location is kept and checks pause until the retry delay has passed.
+        With BOARD_LOCATOR_APPLY, a new location is written to the calibration after
+        this frame, which is still scored with the previous calibration.
+
+        Args:
+            image: JPEG bytes of the camera frame, or the decoded frame
+        """
+        config = cls.get_locator_config()
+        if not config["enabled"]:
+            return
+
+        with cls._lock:
+            if time.monotonic() < cls._retry_at:
+                return
+            reference, box = cls._fingerprint, cls._fingerprint_box
+
+        try:
+            if reference is None:
+                location = cls.relocate(image, apply=False)
+                cls._located(location, config)
+                return
+
+            size = config["fingerprint_size"]
+            thumbnail = np.asarray(ImageDecoder.thumbnail(ImageDecoder.open(image), box, size), dtype=np.float64)
+            dx, dy, peak = phase_correlation(reference, thumbnail)
+            drift = math.hypot(dx * (box[2] - box[0]) / size, dy * (box[3] - box[1]) / size)
+
+            with cls._lock:
+                cls._checks += 1
+                cls._last_drift = drift
+                if peak < config["min_correlation"]:
+                    cls._inconclusive += 1
+                    return
+
+            if drift > config["drift_tolerance"]:
+                location = cls.relocate(image, apply=False)
+                cls._located(location, config)
+                print(f"Board drifted by {drift:.1f} px, re-located at ({location.center_x:.1f}, {location.center_y:.1f})")
+        except Exception as e:
+            with cls._lock:
+                cls._failures += 1
+                cls._consecutive_failures += 1
+                delay = min(MAX_RETRY_DELAY, config["retry_delay"] * 2 ** (cls._consecutive_failures - 1))
+                cls._retry_at = time.monotonic() + delay
+            print(f"Board localization failed, retrying in {delay:.0f} s: {type(e).__name__} - {str(e)}")
+
+    @classmethod
+    def _located(cls, location: BoardLocation, config: Dict[str, Any]) -> None:
+        """Reset the failure backoff after a successful automatic localization and apply the location."""
+        with cls._lock:
+            cls._consecutive_failures = 0
+            cls._retry_at = 0.0
+        if config["apply"]:
+            cls._apply_in_background(location)
+
+    @classmethod
+    def get_location(cls) -> Optional[BoardLocation]:
+        """
+        Get the cached board location.
+
+        Returns:
+            The last location found, or None
+        """
+        return cls._location
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get board localization statistics.
+
+        Returns:
+            Dict with configuration, drift check counters and the last measured drift
+        """
+        with cls._lock:
+            return {
+                **cls.get_locator_config(),
+                "located": cls._location is not None,
+                "checks": cls._checks,
+                "inconclusive": cls._inconclusive,
+                "relocalizations": cls._relocalizations,
+                "failures": cls._failures,
+                "consecutive_failures": cls._consecutive_failures,
+                "retry_in": max(0.0, cls._retry_at - time.monotonic()),
+                "last_drift": cls._last_drift,
+            }
+
+    @staticmethod
+    def _board_box(location: BoardLocation, frame_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Square around a located board plus the fingerprint margin, clipped to the frame."""
+        half_size = location.radius * (1 + FINGERPRINT_MARGIN)
+        width, height = frame_size
+        return (
+            max(0, int(location.center_x - half_size)),
+            max(0, int(location.center_y - half_size)),
+            min(width, int(math.ceil(location.center_x + half_size))),
+            min(height, int(math.ceil(location.center_y + half_size))),
+        )
@@ -0,0 +1,100 @@
+import json
+import math
+import os
+import threading
+from typing import Optional, Tuple
+
+from models.calibration import BoardCalibration
+
+
+class CalibrationService:
+    """
+    Service for loading and storing the dartboard calibration.
+
+    The calibration is read from a JSON file once and kept in memory. When no file
+    exists the defaults of `BoardCalibration` are used.
+    """
+
+    _calibration: Optional[BoardCalibration] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_calibration_path() -> str:
+        """
+        Get the calibration file path from environment variables.
+
+        Returns:
+            str: Path to the calibration JSON file
+        """
+        return os.environ.get("CALIBRATION_PATH", "config/calibration.json")
+
+    @classmethod
+    def get_calibration(cls) -> BoardCalibration:
+        """
+        Get the current calibration, loading it from disk on first use.
+
+        Returns:
+            BoardCalibration: The current calibration
+        """
+        if cls._calibration is None:
+            with cls._lock:
+                if cls._calibration is None:
+                    cls._calibration = cls._load()
+        return cls._calibration
+
+    @classmethod
+    def update_calibration(cls, calibration: BoardCalibration) -> BoardCalibration:
+        """
+        Replace the current calibration and persist it to disk.
+
+        Args:
+            calibration: The new calibration
+
+        Returns:
+            BoardCalibration: The stored calibration
+        """
+        path = cls.get_calibration_path()
+        with cls._lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                f.write(calibration.model_dump_json(indent=2))
+            cls._calibration = calibration
+        return calibration
+
+    @classmethod
+    def get_board_box(cls, frame_size: Tuple[int, int], margin: float) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the square around the calibrated board, clipped to the frame.
+
+        Args:
+            frame_size: Frame size as (width, height)
+            margin: Margin added around the board as a proportion of its radius
+
+        Returns:
+            Tuple of (left, top, right, bottom), or None if the board is outside the frame
+        """
+        calibration = cls.get_calibration()
+        half_size = calibration.radius * calibration.ring_scale_factor * (1 + margin)
+        width, height = frame_size
+        left = max(0, int(calibration.center_x - half_size))
+        top = max(0, int(calibration.center_y - half_size))
+        right = min(width, int(math.ceil(calibration.center_x + half_size)))
+        bottom = min(height, int(math.ceil(calibration.center_y + half_size)))
+
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right, bottom
+
+    @classmethod
+    def _load(cls) -> BoardCalibration:
+        """Read the calibration file, falling back to the defaults."""
+        path = cls.get_calibration_path()
+        if not os.path.exists(path):
+            return BoardCalibration()
+
+        try:
+            with open(path) as f:
+                return BoardCalibration(**json.load(f))
+        except Exception as e:
+            print(f"Error loading calibration from {path}: {e}")
+            return BoardCalibration()
@@ -0,0 +1,293 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from services.metrics import Metrics
+
+# Protocols and ports tried, in order, when the camera endpoint is not configured
+DEFAULT_ENDPOINTS = [("https", 443), ("http", 80)]
+# Renew the login token this many seconds before the camera expires it
+TOKEN_RENEW_MARGIN = 60
+# Reolink response codes meaning the token is missing or expired
+TOKEN_ERROR_CODES = (-6, -10)
+# Weight of the latest capture in the moving average of the capture latency
+LATENCY_SMOOTHING = 0.2
+# Transport trace events of opening a connection to the camera
+CONNECT_TRACE_EVENTS = ("connect_tcp", "start_tls")
+
+
+class CameraError(Exception):
+    """Raised when the camera cannot be reached or refuses a request"""
+
+
+class Snapshot(NamedTuple):
+    """A snapshot shared by all requests that were coalesced into it"""
+    data: bytes
+    sequence: int
+    requested_at: float
+
+
+class CameraClient:
+    """
+    Asynchronous HTTP client for one Reolink camera.
+
+    Connections are pooled and kept alive between captures. The first protocol and
+    port that answer are remembered, so later captures go straight to them and only
+    fall back to probing after a connection failure. Snapshots are authenticated with
+    a login token, which keeps the password out of request URLs. The token is renewed
+    before it expires and after the camera rejects it.
+
+    Captures are single-flight: a capture requested while another one is in flight,
+    or within the coalescing window after a successful one was requested, shares its
+    snapshot, since the camera serializes snapshot requests and times out when they
+    pile up.
+
+    All state is only touched from the event loop, so no lock is needed. The HTTP
+    client is bound to the event loop it was first used on and is recreated when
+    used from another one.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        username: str,
+        password: str,
+        endpoints: List[Tuple[str, int]],
+        connect_timeout: float,
+        read_timeout: float,
+        pool_size: int,
+        coalesce_window: float
+    ):
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.endpoints = endpoints
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.coalesce_window = coalesce_window
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._endpoint: Optional[Tuple[str, int]] = None
+        self._token: Optional[str] = None
+        self._token_expires: float = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self._inflight_requested_at: float = 0.0
+        self._sequence = 0
+
+        # Metrics
+        self._captures = 0
+        self._coalesced = 0
+        self._failures = 0
+        self._logins = 0
+        self._average_latency: Optional[float] = None
+        self._last_latency: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    async def capture(self) -> Snapshot:
+        """
+        Take a snapshot, sharing one that is in flight or was just requested.
+
+        Returns:
+            Snapshot with the JPEG data
+
+        Raises:
+            CameraError: If no endpoint answers or the camera returns an error
+        """
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight
+        if inflight is not None and inflight.get_loop() is loop and (
+            not inflight.done() or (
+                not inflight.cancelled() and inflight.exception() is None
+                and time.monotonic() - self._inflight_requested_at <= self.coalesce_window
+            )
+        ):
+            self._coalesced += 1
+        else:
+            self._inflight_requested_at = time.monotonic()
+            inflight = self._inflight = asyncio.ensure_future(self._timed_capture(self._inflight_requested_at))
+
+        # Shielded so a caller that goes away does not cancel the snapshot of the others
+        return await asyncio.shield(inflight)
+
+    async def _timed_capture(self, requested_at: float) -> Snapshot:
+        """Take one snapshot and record its latency or failure."""
+        start = time.perf_counter()
+        try:
+            data = await self._capture()
+        except Exception as e:
+            self._failures += 1
+            self._last_error = f"{type(e).__name__}: {str(e)}"
+            Metrics.count("errors", "camera")
+            if isinstance(e, CameraError):
+                raise
+            raise CameraError(str(e)) from e
+
+        latency = time.perf_counter() - start
+        self._captures += 1
+        self._sequence += 1
+        self._last_latency = latency
+        if self._average_latency is None:
+            self._average_latency = latency
+        else:
+            self._average_latency += LATENCY_SMOOTHING * (latency - self._average_latency)
+        return Snapshot(data, self._sequence, requested_at)
+
+    async def _capture(self) -> bytes:
+        """Take a snapshot on the remembered endpoint, probing the others when it fails."""
+        endpoints = self.endpoints
+        if self._endpoint is not None:
+            endpoints = [self._endpoint] + [e for e in endpoints if e != self._endpoint]
+
+        errors = []
+        for endpoint in endpoints:
+            try:
+                image = await self._snap(endpoint)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # Wrong protocol or port, try the next one with a fresh login
+                errors.append(f"{endpoint[0]}:{endpoint[1]} {type(e).__name__}")
+                if self._endpoint == endpoint:
+                    self._endpoint, self._token = None, None
+                continue
+            except CameraError as e:
+                errors.append(f"{endpoint[0]}:{endpoint[1]} {str(e)}")
+                continue
+
+            self._endpoint = endpoint
+            return image
+
+        raise CameraError(f"Camera at {self.ip} did not return a snapshot ({'; '.join(errors)})")
+
+    async def _snap(self, endpoint: Tuple[str, int]) -> bytes:
+        """Request a snapshot from an endpoint, logging in again once if the token was rejected."""
+        for attempt in range(2):
+            token = await self._get_token(endpoint, renew=attempt > 0)
+            response = await self._send(
+                "GET", endpoint, "camera_transfer",
+                params={"cmd": "Snap", "channel": 0, "rs": uuid.uuid4().hex[:16], "token": token}
+            )
+            if response.status_code != 200:
+                raise CameraError(f"Snapshot failed with status code {response.status_code}")
+            if response.headers.get("content-type", "").startswith("image/"):
+                return response.content
+
+            code = self._error_code(response)
+            if code not in TOKEN_ERROR_CODES:
+                raise CameraError(f"Response was not an image (error code {code})")
+
+        raise CameraError("Camera rejected the login token")
+
+    async def _get_token(self, endpoint: Tuple[str, int], renew: bool = False) -> str:
+        """Get a valid login token, logging in when there is none or it is about to expire."""
+        if not renew and self._token is not None and time.time() < self._token_expires:
+            return self._token
+
+        response = await self._send(
+            "POST", endpoint, "camera_login",
+            params={"cmd": "Login"},
+            json=[{
+                "cmd": "Login",
+                "param": {"User": {"Version": "0", "userName": self.username, "password": self.password}},
+            }]
+        )
+        if response.status_code != 200:
+            raise CameraError(f"Login failed with status code {response.status_code}")
+        try:
+            token = response.json()[0]["value"]["Token"]
+        except (ValueError, LookupError, TypeError):
+            raise CameraError(f"Login failed (error code {self._error_code(response)})")
+
+        self._token = token["name"]
+        self._token_expires = time.time() + float(token.get("leaseTime", 3600)) - TOKEN_RENEW_MARGIN
+        self._logins += 1
+        return self._token
+
+    async def _send(self, method: str, endpoint: Tuple[str, int], stage: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request to the camera API, recording the time spent opening a connection
+        as the camera_connect stage and the rest of the request as `stage`.
+        """
+        connect_time = 0.0
+        started: Dict[str, float] = {}
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal connect_time
+            _, name, phase = event.rsplit(".", 2)
+            if name not in CONNECT_TRACE_EVENTS:
+                return
+            if phase == "started":
+                started[name] = time.perf_counter()
+            elif name in started:
+                connect_time += time.perf_counter() - started.pop(name)
+
+        start = time.perf_counter()
+        response = await self._client().request(method, self._url(endpoint), extensions={"trace": trace}, **kwargs)
+        if connect_time:
+            Metrics.observe("camera_connect", connect_time)
+        Metrics.observe(stage, time.perf_counter() - start - connect_time)
+        return response
+
+    def _client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            # Connections opened on another loop cannot be reused
+            self._http = httpx.AsyncClient(verify=False, timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._http
+
+    async def close(self) -> None:
+        """Release the login token and close the pooled connections."""
+        endpoint, token, http = self._endpoint, self._token, self._http
+        self._token, self._http = None, None
+        if http is None or self._loop is not asyncio.get_running_loop():
+            return
+
+        if endpoint is not None and token is not None:
+            try:
+                await http.post(
+                    self._url(endpoint),
+                    params={"cmd": "Logout", "token": token},
+                    json=[{"cmd": "Logout", "param": {}}]
+                )
+            except httpx.HTTPError as e:
+                print(f"Camera logout failed: {type(e).__name__}: {str(e)}")
+        await http.aclose()
+
+    def _url(self, endpoint: Tuple[str, int]) -> str:
+        """API URL of the camera on an endpoint"""
+        protocol, port = endpoint
+        return f"{protocol}://{self.ip}:{port}/cgi-bin/api.cgi"
+
+    @staticmethod
+    def _error_code(response: httpx.Response) -> Optional[int]:
+        """Extract the Reolink error code from a JSON error response"""
+        try:
+            return response.json()[0]["error"]["rspCode"]
+        except (ValueError, LookupError, TypeError):
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get capture statistics of the camera.
+
+        Returns:
+            Dict with the remembered endpoint, capture, coalesced and failure counters, the
+            failure rate, the capture latency and the last error
+        """
+        total = self._captures + self._failures
+        return {
+            "protocol": self._endpoint[0] if self._endpoint else None,
+            "port": self._endpoint[1] if self._endpoint else None,
+            "captures": self._captures,
+            "coalesced": self._coalesced,
+            "failures": self._failures,
+            "failure_rate": self._failures / total if total else None,
+            "logins": self._logins,
+            "average_latency_ms": self._average_latency * 1000 if self._average_latency is not None else None,
+            "last_latency_ms": self._last_latency * 1000 if self._last_latency is not None else None,
+            "last_error": self._last_error,
+        }
@@ -1,13 +1,12 @@
-import glob
+import asyncio
 import os
-from datetime import datetime
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
-import requests
-import urllib3
+from starlette.concurrency import run_in_threadpool
 
-# Suppress insecure request warnings when connecting to camera
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from services.camera_client import DEFAULT_ENDPOINTS, CameraClient
+from services.frame_buffer import BufferedFrame, FrameBuffer, FrameRecord
+from services.metrics import Metrics
 
 class CameraService:
     """
@@ -17,6 +16,11 @@ class CameraService:
     # Directory to store camera feed images
     FEED_DIR = "/app/feed"
 
+    # Only touched from the event loop, so no lock is needed
+    _clients: Dict[str, CameraClient] = {}
+    # Snapshot key and the task buffering that snapshot, shared by the callers of one capture
+    _saved: Optional[Tuple[Tuple[str, int], asyncio.Future]] = None
+
     @staticmethod
     def get_camera_config() -> Tuple[str, str, str]:
         """
@@ -37,121 +41,174 @@ class CameraService:
 
         return camera_ip, camera_username, camera_password
 
-    @classmethod
-    def ensure_feed_directory(cls) -> None:
-        """Ensure the feed directory exists."""
-        os.makedirs(cls.FEED_DIR, exist_ok=True)
+    @staticmethod
+    def get_client_config() -> Dict[str, Any]:
+        """
+        Get camera connection configuration from environment variables.
+
+        Returns:
+            Dict with the (protocol, port) endpoints to try in order, the connect and read
+            timeouts in seconds, the maximum number of pooled connections and the window in
+            seconds within which capture requests share one snapshot
+        """
+        protocol = os.environ.get("CAMERA_PROTOCOL", "auto").lower()
+        port = os.environ.get("CAMERA_PORT")
+        if protocol in ("http", "https"):
+            endpoints = [(protocol, int(port) if port else dict(DEFAULT_ENDPOINTS)[protocol])]
+        else:
+            endpoints = [(p, int(port)) for p, _ in DEFAULT_ENDPOINTS] if port else list(DEFAULT_ENDPOINTS)
+
+        return {
+            "endpoints": endpoints,
+            "connect_timeout": float(os.environ.get("CAMERA_CONNECT_TIMEOUT", "3")),
+            "read_timeout": float(os.environ.get("CAMERA_READ_TIMEOUT", "10")),
+            "pool_size": max(1, int(os.environ.get("CAMERA_POOL_SIZE", "2"))),
+            "coalesce_window": max(0.0, float(os.environ.get("CAMERA_COALESCE_WINDOW_MS", "250"))) / 1000,
+        }
 
     @classmethod
-    def take_picture(cls) -> Optional[str]:
+    async def take_picture(cls) -> Optional[str]:
         """
         Take a picture using the configured camera and save it to the feed directory.
 
+        Concurrent calls share one snapshot and receive the path of the same file.
+
         Returns:
             str: Path to the saved image file if successful, None otherwise
+
+        Raises:
+            ValueError: If the camera configuration is missing
         """
         try:
-            # Ensure feed directory exists
-            cls.ensure_feed_directory()
-
-            # Get camera configuration
-            ip, username, password = cls.get_camera_config()
+            _, record, saved = await cls.capture_frame()
+            await asyncio.shield(saved)
+            return record.path
 
-            # Try HTTPS first
-            image_data = cls._capture_image(ip, username, password, use_https=True)
-
-            # If HTTPS fails, try HTTP
-            if image_data is None:
-                image_data = cls._capture_image(ip, username, password, use_https=False)
-
-            if image_data:
-                # Generate filename with timestamp
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{timestamp}_dart.jpg"
-                file_path = os.path.join(cls.FEED_DIR, filename)
+        except ValueError:
+            # Configuration errors are reported to the client
+            raise
+        except Exception as e:
+            print(f"Error taking picture: {type(e).__name__}: {str(e)}")
+            return None
 
-                # Save the image
-                with open(file_path, "wb") as f:
-                    f.write(image_data)
+    @classmethod
+    async def capture_frame(cls) -> Tuple[bytes, FrameRecord, asyncio.Future]:
+        """
+        Take a snapshot, buffer it in memory and start writing it to the feed directory.
 
-                return file_path
+        Concurrent calls share one snapshot, which is buffered and written once.
 
-            return None
+        Returns:
+            Tuple of (JPEG bytes, record of the buffered frame, future completing when the file is written)
 
-        except Exception as e:
-            print(f"Error taking picture: {type(e).__name__}: {str(e)}")
-            return None
+        Raises:
+            ValueError: If the camera configuration is missing
+            CameraError: If the camera does not return a snapshot
+        """
+        # Reuse the pooled connection and login of the camera
+        client = cls.get_client()
+        snapshot = await client.capture()
+
+        # Callers sharing a snapshot resume one after the other, the first one starts buffering it
+        key = (client.ip, snapshot.sequence)
+        if cls._saved is None or cls._saved[0] != key:
+            cls._saved = (key, asyncio.ensure_future(cls._buffer_frame(snapshot.data)))
+        # Shielded so a cancelled caller does not cancel buffering for the others
+        record, saved = await asyncio.shield(cls._saved[1])
+        return snapshot.data, record, saved
 
-    @staticmethod
-    def _capture_image(
-        ip: str,
-        username: str,
-        password: str,
-        port: int = 443,
-        use_https: bool = True
-    ) -> Optional[bytes]:
+    @classmethod
+    async def _buffer_frame(cls, data: bytes) -> Tuple[FrameRecord, asyncio.Future]:
         """
-        Connect to a Reolink camera and capture an image using direct API calls.
+        Add a frame to the frame buffer and start writing it to the feed directory.
 
-        Args:
-            ip: IP address of the camera
-            username: Camera login username
-            password: Camera login password
-            port: Camera port (default 443 for HTTPS, 80 for HTTP)
-            use_https: Whether to use HTTPS (default True)
+        The frame buffer can touch the disk (loading its index, deleting evicted frames)
+        and waits for writes in progress, so it is called off the event loop.
 
         Returns:
-            bytes: Image data if successful, None otherwise
+            Tuple of (record of the buffered frame, future completing when the file is written)
         """
-        protocol = "https" if use_https else "http"
-        port = port if port else (443 if use_https else 80)
-        base_url = f"{protocol}://{ip}:{port}"
+        record = await run_in_threadpool(FrameBuffer.add, cls.FEED_DIR, data, False)
+        saved = asyncio.ensure_future(run_in_threadpool(FrameBuffer.write, record, data))
+        saved.add_done_callback(cls._on_frame_written)
+        return record, saved
 
-        # Create a session with SSL verification disabled
-        session = requests.Session()
-        session.verify = False
+    @staticmethod
+    def _on_frame_written(saved: asyncio.Future) -> None:
+        """Report a failed background write, which callers that do not await it would never see."""
+        if saved.cancelled():
+            return
+        error = saved.exception()
+        if error is not None:
+            print(f"Error writing frame to the feed: {type(error).__name__}: {str(error)}")
+            Metrics.count("errors", "feed_write")
 
-        try:
-            # Try to get a snapshot directly
-            snapshot_url = f"{base_url}/cgi-bin/api.cgi?cmd=Snap&channel=0&user={username}&password={password}"
+    @classmethod
+    def get_client(cls) -> CameraClient:
+        """
+        Get the pooled client of the configured camera, creating it on first use.
 
-            response = session.get(snapshot_url, timeout=10)
+        A new client is created when the camera configuration changes. Must be called
+        from the event loop.
 
-            if response.status_code == 200:
-                content_type = response.headers.get('content-type', '')
+        Returns:
+            CameraClient for the camera
 
-                if content_type.startswith('image/'):
-                    return response.content
-                else:
-                    print(f"Response was not an image. Content-Type: {content_type}")
-            else:
-                print(f"Error: Status code {response.status_code}")
+        Raises:
+            ValueError: If required environment variables are not set
+        """
+        ip, username, password = cls.get_camera_config()
+        client = cls._clients.get(ip)
+        if client is None or client.username != username or client.password != password:
+            if client is not None:
+                asyncio.ensure_future(client.close())
+            config = cls.get_client_config()
+            client = CameraClient(
+                ip, username, password, config["endpoints"], config["connect_timeout"],
+                config["read_timeout"], config["pool_size"], config["coalesce_window"]
+            )
+            cls._clients[ip] = client
+        return client
 
-            return None
+    @classmethod
+    async def close_clients(cls) -> None:
+        """Log out of all cameras and close their connections."""
+        clients, cls._clients = list(cls._clients.values()), {}
+        for client in clients:
+            await client.close()
 
-        except Exception as e:
-            print(f"Error: {e}")
-            return None
+    @classmethod
+    def get_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """
+        Get capture statistics of every camera used since the server started.
+
+        Returns:
+            Dict mapping camera IPs to their statistics
+        """
+        return {ip: client.get_stats() for ip, client in cls._clients.items()}
 
     @classmethod
-    def get_latest_picture(cls) -> Optional[str]:
+    def get_latest_picture(cls) -> Optional[BufferedFrame]:
         """
-        Get the path to the latest picture in the feed directory.
+        Get the latest picture, from memory unless the server restarted since it was taken.
 
         Returns:
-            str: Path to the latest image file if available, None otherwise
+            BufferedFrame with the image bytes and metadata if available, None otherwise
         """
-        cls.ensure_feed_directory()
+        return FrameBuffer.get_latest(cls.FEED_DIR)
 
-        # List all jpg files in the feed directory
-        image_files = glob.glob(os.path.join(cls.FEED_DIR, "*_dart.jpg"))
+    @classmethod
+    def get_picture(cls, filename: str) -> Optional[BufferedFrame]:
+        """
+        Get a picture of the feed by its file name.
 
-        if not image_files:
-            return None
+        Args:
+            filename: Name of the image file
 
-        # Sort by modification time (newest first)
-        latest_image = max(image_files, key=os.path.getmtime)
-        return latest_image
+        Returns:
+            BufferedFrame with the image bytes and metadata if the picture is in the feed, None otherwise
+        """
+        return FrameBuffer.get(cls.FEED_DIR, filename)
 
     @classmethod
     def delete_all_pictures(cls) -> int:
@@ -161,18 +218,4 @@ class CameraService:
         Returns:
             int: Number of files deleted
         """
-        cls.ensure_feed_directory()
-
-        # List all jpg files in the feed directory
-        image_files = glob.glob(os.path.join(cls.FEED_DIR, "*_dart.jpg"))
-        count = 0
-
-        # Delete each file
-        for file_path in image_files:
-            try:
-                os.remove(file_path)
-                count += 1
-            except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
-
-        return count
+        return FrameBuffer.clear(cls.FEED_DIR)
@@ -0,0 +1,220 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from models.detection import DetectionResponse
+from services.calibration_service import CalibrationService
+from services.image_decoder import ImageDecoder, ImageSource
+
+# Margin around the board used for the comparison, as a proportion of the board radius
+CHANGE_DETECTION_MARGIN = 0.75
+
+
+class ChangeMap:
+    """Thumbnail cells that changed since the last processed frame, in frame coordinates"""
+
+    def __init__(self, mask: np.ndarray, box: Tuple[int, int, int, int]):
+        self.mask = mask
+        self.box = box
+        self.cell_width = (box[2] - box[0]) / mask.shape[1]
+        self.cell_height = (box[3] - box[1]) / mask.shape[0]
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """
+        Check which frame points lie in a changed cell.
+
+        Args:
+            points: Array of shape (N, 2) with frame coordinates
+
+        Returns:
+            Boolean array of shape (N,). Points outside the compared region count as unchanged.
+        """
+        cols = np.floor((points[:, 0] - self.box[0]) / self.cell_width).astype(np.int64)
+        rows = np.floor((points[:, 1] - self.box[1]) / self.cell_height).astype(np.int64)
+        height, width = self.mask.shape
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        return inside & self.mask[np.where(inside, rows, 0), np.where(inside, cols, 0)]
+
+    def bounding_box(self, margin: float = 0.0) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the frame region enclosing all changed cells.
+
+        Args:
+            margin: Margin added on each side, as a proportion of the larger side of the region
+
+        Returns:
+            Tuple of (left, top, right, bottom) clipped to the compared region, or None if nothing changed
+        """
+        rows, cols = np.nonzero(self.mask)
+        if len(rows) == 0:
+            return None
+
+        left = self.box[0] + cols.min() * self.cell_width
+        top = self.box[1] + rows.min() * self.cell_height
+        right = self.box[0] + (cols.max() + 1) * self.cell_width
+        bottom = self.box[1] + (rows.max() + 1) * self.cell_height
+        pad = max(right - left, bottom - top) * margin
+        return (
+            max(self.box[0], int(left - pad)),
+            max(self.box[1], int(top - pad)),
+            min(self.box[2], int(np.ceil(right + pad))),
+            min(self.box[3], int(np.ceil(bottom + pad))),
+        )
+
+
+class ChangeDetector:
+    """
+    Skips inference for frames in which the dartboard has not changed.
+
+    Each frame is reduced to a small grayscale thumbnail of the board region and
+    compared with the thumbnail of the last frame that went through the model. When
+    too few cells differ, the response of that frame is reused.
+    """
+
+    _lock = threading.Lock()
+    _reference: Optional[np.ndarray] = None
+    _reference_key: Optional[Tuple[Any, ...]] = None
+    _response: Optional[DetectionResponse] = None
+    _hits: int = 0
+    _misses: int = 0
+
+    @staticmethod
+    def get_change_config() -> Dict[str, Any]:
+        """
+        Get change detection configuration from environment variables.
+
+        Returns:
+            Dict with whether change detection is enabled, the thumbnail size, the gray level
+            difference at which a cell counts as changed and the changed area that triggers inference
+        """
+        return {
+            "enabled": os.environ.get("CHANGE_DETECTION_ENABLED", "false").lower() in ("1", "true", "yes"),
+            "size": max(8, int(os.environ.get("CHANGE_DETECTION_SIZE", "96"))),
+            "pixel_threshold": float(os.environ.get("CHANGE_PIXEL_THRESHOLD", "20")),
+            "area_threshold": float(os.environ.get("CHANGE_AREA_THRESHOLD", "0.001")),
+        }
+
+    @staticmethod
+    def compute_thumbnail(image: ImageSource, size: int) -> np.ndarray:
+        """
+        Reduce the board region of a frame to a small grayscale thumbnail.
+
+        Args:
+            image: JPEG bytes of the camera frame, or the decoded frame
+            size: Width and height of the thumbnail
+
+        Returns:
+            Array of shape (size, size) with gray levels
+        """
+        img = ImageDecoder.open(image)
+        box = CalibrationService.get_board_box(img.size, CHANGE_DETECTION_MARGIN)
+        return np.asarray(ImageDecoder.thumbnail(img, box, size), dtype=np.int16)
+
+    @classmethod
+    def check(cls, image: ImageSource, key: Tuple[Any, ...]) -> Tuple[Optional[DetectionResponse], Optional[np.ndarray]]:
+        """
+        Compare a frame with the last processed frame.
+
+        Args:
+            image: JPEG bytes of the camera frame, or the decoded frame
+            key: Values that must match for the cached response to be reused, such as the
+                frame size and the model
+
+        Returns:
+            Tuple of (cached response flagged as skipped or None, thumbnail to pass to `store`).
+            Both are None when change detection is disabled.
+        """
+        config = cls.get_change_config()
+        if not config["enabled"]:
+            return None, None
+
+        thumbnail = cls.compute_thumbnail(image, config["size"])
+
+        with cls._lock:
+            reference, reference_key, response = cls._reference, cls._reference_key, cls._response
+
+        if response is not None and reference_key == key and reference.shape == thumbnail.shape:
+            changed = np.count_nonzero(np.abs(thumbnail - reference) > config["pixel_threshold"])
+            if changed / thumbnail.size < config["area_threshold"]:
+                cls._hits += 1
+                return response.model_copy(update={"inference_skipped": True, "skip_reason": "unchanged", "events": []}), thumbnail
+
+        cls._misses += 1
+        return None, thumbnail
+
+    @classmethod
+    def get_changes(
+        cls,
+        thumbnail: Optional[np.ndarray],
+        key: Tuple[Any, ...],
+        frame_size: Tuple[int, int]
+    ) -> Optional[ChangeMap]:
+        """
+        Get the regions of a frame that changed since the last processed frame.
+
+        Must be called after `check` and before `store`.
+
+        Args:
+            thumbnail: Thumbnail returned by `check`
+            key: Same key that was passed to `check`
+            frame_size: Frame size as (width, height)
+
+        Returns:
+            ChangeMap, or None when change detection is disabled or there is no comparable reference
+        """
+        if thumbnail is None:
+            return None
+
+        with cls._lock:
+            reference, reference_key = cls._reference, cls._reference_key
+        if reference is None or reference_key != key or reference.shape != thumbnail.shape:
+            return None
+
+        box = CalibrationService.get_board_box(frame_size, CHANGE_DETECTION_MARGIN) or (0, 0, *frame_size)
+        mask = np.abs(thumbnail - reference) > cls.get_change_config()["pixel_threshold"]
+        return ChangeMap(mask, box)
+
+    @classmethod
+    def store(cls, thumbnail: Optional[np.ndarray], key: Tuple[Any, ...], response: DetectionResponse) -> None:
+        """
+        Remember a processed frame and its response as the new reference.
+
+        Args:
+            thumbnail: Thumbnail returned by `check`, or None when change detection is disabled
+            key: Same key that was passed to `check`
+            response: Response produced by the model for the frame
+        """
+        if thumbnail is None:
+            return
+
+        with cls._lock:
+            cls._reference = thumbnail
+            cls._reference_key = key
+            cls._response = response
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget the reference frame so the next frame always runs inference."""
+        with cls._lock:
+            cls._reference = None
+            cls._reference_key = None
+            cls._response = None
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get change detection statistics.
+
+        Returns:
+            Dict with configuration and hit/miss counters
+        """
+        config = cls.get_change_config()
+        total = cls._hits + cls._misses
+        return {
+            **config,
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "hit_rate": cls._hits / total if total else None,
+        }
@@ -0,0 +1,178 @@
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models.detection import DartDetection, DetectionResponse, TrackEvent, TrackedDartsResponse
+from services.change_detector import ChangeMap
+from services.obb_utils import probiou
+
+
+class Track:
+    """A dart followed across frames"""
+
+    def __init__(self, dart_id: int, detection: DartDetection):
+        self.dart_id = dart_id
+        self.detection = detection
+        self.misses = 0
+
+    @property
+    def box(self) -> List[float]:
+        """Rotated box as [x, y, w, h, angle_radians]"""
+        d = self.detection
+        return [d.x_center, d.y_center, d.width, d.height, math.radians(d.angle)]
+
+
+class DartTracker:
+    """
+    Follows darts across consecutive frames and reports only the changes.
+
+    Detections are matched to the tracked darts by rotated box overlap, falling back
+    to centre distance for boxes that jittered apart. Matched darts keep their ID,
+    unmatched detections become new darts and darts that stay undetected for several
+    frames are reported as removed. When the change detector provides the changed
+    regions of the frame, a dart in an unchanged region is never considered removed,
+    since nothing there can have moved.
+    """
+
+    _lock = threading.Lock()
+    _tracks: List[Track] = []
+    _next_id: int = 1
+    _frames: int = 0
+
+    # Metrics
+    _new: int = 0
+    _removed: int = 0
+
+    @staticmethod
+    def get_tracking_config() -> Dict[str, Any]:
+        """
+        Get dart tracking configuration from environment variables.
+
+        Returns:
+            Dict with whether tracking is enabled, the minimum overlap and maximum centre distance
+            in frame pixels for a match and the number of missed frames after which a dart is removed
+        """
+        return {
+            "enabled": os.environ.get("TRACKING_ENABLED", "true").lower() in ("1", "true", "yes"),
+            "iou_threshold": float(os.environ.get("TRACK_IOU_THRESHOLD", "0.2")),
+            "max_distance": float(os.environ.get("TRACK_MAX_DISTANCE", "40")),
+            "max_misses": max(1, int(os.environ.get("TRACK_MAX_MISSES", "2"))),
+        }
+
+    @classmethod
+    def update(cls, response: DetectionResponse, changes: Optional[ChangeMap] = None) -> None:
+        """
+        Match the detections of a frame to the tracked darts.
+
+        Sets `dart_id` on every detection and fills `events` with the darts that
+        appeared or were removed.
+
+        Args:
+            response: Response for the frame, updated in place
+            changes: Regions that changed since the previous frame, or None if unknown
+        """
+        config = cls.get_tracking_config()
+        if not config["enabled"]:
+            return
+
+        detections = response.detections
+        events: List[TrackEvent] = []
+
+        with cls._lock:
+            cls._frames += 1
+            tracks = cls._tracks
+            matched_tracks = set()
+            matched_detections = set()
+
+            if detections and tracks:
+                detection_boxes = np.array([
+                    [d.x_center, d.y_center, d.width, d.height, math.radians(d.angle)] for d in detections
+                ])
+                track_boxes = np.array([track.box for track in tracks])
+                ious = probiou(detection_boxes, track_boxes)
+                distances = np.hypot(
+                    detection_boxes[:, None, 0] - track_boxes[None, :, 0],
+                    detection_boxes[:, None, 1] - track_boxes[None, :, 1]
+                )
+
+                # Greedy assignment, best overlap first and closest centre among equals
+                candidates = np.argwhere((ious >= config["iou_threshold"]) | (distances <= config["max_distance"]))
+                order = np.lexsort((distances[tuple(candidates.T)], -ious[tuple(candidates.T)]))
+                for i, j in candidates[order].tolist():
+                    if i in matched_detections or j in matched_tracks:
+                        continue
+                    matched_detections.add(i)
+                    matched_tracks.add(j)
+                    tracks[j].detection = detections[i]
+                    tracks[j].misses = 0
+                    detections[i].dart_id = tracks[j].dart_id
+
+            # Darts that were not detected again, unless their region did not change
+            kept = []
+            for j, track in enumerate(tracks):
+                if j in matched_tracks:
+                    kept.append(track)
+                    continue
+                center = np.array([[track.detection.x_center, track.detection.y_center]])
+                if changes is not None and not changes.contains(center)[0]:
+                    kept.append(track)
+                    continue
+                track.misses += 1
+                if track.misses >= config["max_misses"]:
+                    events.append(TrackEvent(type="removed", dart_id=track.dart_id, detection=track.detection))
+                    cls._removed += 1
+                else:
+                    kept.append(track)
+
+            for i, detection in enumerate(detections):
+                if i in matched_detections:
+                    continue
+                detection.dart_id = cls._next_id
+                kept.append(Track(cls._next_id, detection))
+                events.append(TrackEvent(type="new", dart_id=cls._next_id, detection=detection))
+                cls._next_id += 1
+                cls._new += 1
+            cls._tracks = kept
+
+        response.events = events
+
+    @classmethod
+    def get_darts(cls) -> TrackedDartsResponse:
+        """
+        Get the darts currently on the board.
+
+        Returns:
+            TrackedDartsResponse with the latest detection of each dart
+        """
+        with cls._lock:
+            return TrackedDartsResponse(
+                darts=[track.detection for track in sorted(cls._tracks, key=lambda t: t.dart_id)],
+                frames=cls._frames
+            )
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget all tracked darts, e.g. at the start of a new turn. IDs keep increasing."""
+        with cls._lock:
+            cls._tracks = []
+            cls._frames = 0
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get tracking statistics.
+
+        Returns:
+            Dict with configuration, the number of tracked darts and event counters
+        """
+        with cls._lock:
+            return {
+                **cls.get_tracking_config(),
+                "tracked": len(cls._tracks),
+                "frames": cls._frames,
+                "new": cls._new,
+                "removed": cls._removed,
+            }
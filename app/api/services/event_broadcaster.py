@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Hashable, Optional, Set
+
+# Seconds between keep-alive comments on idle connections, so proxies do not close them
+HEARTBEAT_INTERVAL = 15.0
+
+
+class Subscriber:
+    """A connected client with its queue of pending events"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.connected_at = time.time()
+        self.lagged = 0
+
+
+class EventBroadcaster:
+    """
+    Fans detection events out to all connected clients as Server-Sent Events.
+
+    Each event is serialized once and put on the queue of every subscriber, so any
+    number of browser tabs receive the result of one capture and one inference. A
+    subscriber whose queue is full is not waited for: its pending events are dropped
+    and it receives only the latest event, which describes the current state. New
+    subscribers also start with the latest event.
+
+    Events are published from the event loop. Producers on other threads, such as
+    stream ingestion, use `publish_threadsafe`, which hands the event to the loop
+    captured by `start`.
+    """
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    # Guards the latest event, which threads may set before the loop is known
+    _lock = threading.Lock()
+    _subscribers: Set[Subscriber] = set()
+    _latest: Optional[str] = None
+    _latest_key: Optional[Hashable] = None
+    _sequence: int = 0
+
+    # Metrics
+    _peak_subscribers: int = 0
+    _connections: int = 0
+    _published: int = 0
+    _delivered: int = 0
+    _dropped: int = 0
+    _last_fanout_ms: Optional[float] = None
+
+    @staticmethod
+    def get_events_config() -> Dict[str, int]:
+        """
+        Get event broadcasting configuration from environment variables.
+
+        Returns:
+            Dict with the number of events queued per subscriber before it is dropped to the latest event
+        """
+        return {
+            "queue_size": max(1, int(os.environ.get("EVENTS_QUEUE_SIZE", "4"))),
+        }
+
+    @classmethod
+    def start(cls) -> None:
+        """Remember the running event loop, so threads can publish before anyone has subscribed."""
+        cls._loop = asyncio.get_running_loop()
+
+    @classmethod
+    def _set_latest(cls, event_type: str, data: Dict[str, Any], key: Optional[Hashable]) -> Optional[str]:
+        """
+        Format an event and make it the latest one.
+
+        Returns:
+            The SSE message, or None if the event repeats the latest key
+        """
+        with cls._lock:
+            if key is not None and key == cls._latest_key:
+                return None
+            cls._latest_key = key
+            cls._sequence += 1
+            message = f"id: {cls._sequence}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+            cls._latest = message
+            cls._published += 1
+        return message
+
+    @classmethod
+    def publish(cls, event_type: str, data: Dict[str, Any], key: Optional[Hashable] = None) -> None:
+        """
+        Send an event to all subscribers.
+
+        Must be called from the event loop.
+
+        Args:
+            event_type: SSE event name
+            data: JSON-serializable payload
+            key: Identity of the event, e.g. the frame it describes. An event with the same
+                key as the previous one is not sent again.
+        """
+        start = time.perf_counter()
+        message = cls._set_latest(event_type, data, key)
+        if message is None:
+            return
+
+        for subscriber in cls._subscribers:
+            if subscriber.queue.full():
+                # Slow consumer: skip what it has not read yet and only send the latest state
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                    cls._dropped += 1
+                subscriber.lagged += 1
+            subscriber.queue.put_nowait(message)
+            cls._delivered += 1
+
+        cls._last_fanout_ms = (time.perf_counter() - start) * 1000
+
+    @classmethod
+    def publish_threadsafe(cls, event_type: str, data: Dict[str, Any], key: Optional[Hashable] = None) -> None:
+        """
+        Send an event to all subscribers from a thread outside the event loop.
+
+        Without an event loop, e.g. before `start` has run, the event only becomes the
+        latest one, which clients receive when they subscribe.
+
+        Args:
+            event_type: SSE event name
+            data: JSON-serializable payload
+            key: Identity of the event, see `publish`
+        """
+        loop = cls._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(cls.publish, event_type, data, key)
+        else:
+            cls._set_latest(event_type, data, key)
+
+    @classmethod
+    async def subscribe(cls) -> AsyncIterator[str]:
+        """
+        Stream events to one client as SSE messages, starting with the latest event.
+
+        Yields:
+            SSE formatted messages and keep-alive comments
+        """
+        cls._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(cls.get_events_config()["queue_size"])
+        with cls._lock:
+            latest = cls._latest
+        if latest is not None:
+            subscriber.queue.put_nowait(latest)
+
+        cls._subscribers.add(subscriber)
+        cls._connections += 1
+        cls._peak_subscribers = max(cls._peak_subscribers, len(cls._subscribers))
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            cls._subscribers.discard(subscriber)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get broadcasting statistics.
+
+        Returns:
+            Dict with configuration, current and peak subscribers and counters of published,
+            delivered and dropped events
+        """
+        return {
+            **cls.get_events_config(),
+            "subscribers": len(cls._subscribers),
+            "peak_subscribers": cls._peak_subscribers,
+            "connections": cls._connections,
+            "published": cls._published,
+            "delivered": cls._delivered,
+            "dropped": cls._dropped,
+            "lagging_subscribers": sum(1 for s in cls._subscribers if s.lagged),
+            "last_fanout_ms": cls._last_fanout_ms,
+        }
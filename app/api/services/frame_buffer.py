@@ -0,0 +1,375 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from services.metrics import Metrics
+
+# Name of the index file kept next to the frames
+INDEX_FILENAME = "index.json"
+# Changes since the index file was written, one JSON object per line
+JOURNAL_FILENAME = "index.journal"
+# The journal is folded into the index file once it has this many lines, or more lines than the index has entries
+JOURNAL_COMPACT_LINES = 100
+# Pattern of the frame files in the feed directory
+FRAME_PATTERN = "*_dart.jpg"
+# Capture time in frame names
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+class FrameRecord(NamedTuple):
+    """Metadata of a frame stored in the feed directory"""
+    filename: str
+    path: str
+    size: int
+    captured_at: float
+    sequence: int
+
+
+class BufferedFrame(NamedTuple):
+    """A frame held in memory"""
+    record: FrameRecord
+    data: bytes
+
+
+class FrameBuffer:
+    """
+    Keeps recent camera frames in memory and caps the feed directory.
+
+    The last FRAME_BUFFER_SIZE frames are kept in a ring buffer with their bytes, so
+    the latest frame is served without touching the disk. Every frame is also written
+    to the feed directory, whose contents are tracked in an index file instead of
+    being listed on each request. When the directory exceeds the configured number
+    of files or bytes, the oldest frames are deleted.
+
+    Each write appends the added and deleted frames to a journal next to the index,
+    so a write costs the same however many frames are kept. The journal is folded
+    into the index file once it has grown past the index.
+    """
+
+    _lock = threading.Lock()
+    _directory: Optional[str] = None
+    _memory: Deque[BufferedFrame] = deque()
+    _index: "OrderedDict[str, FrameRecord]" = OrderedDict()
+    _bytes: int = 0
+    _sequence: int = 0
+    # Journal entries not yet appended, and the number of lines already in the journal
+    _journal_pending: List[Dict[str, Any]] = []
+    _journal_lines: int = 0
+    # Latest capture time of any frame tracked, as formatted in frame names
+    _last_timestamp: str = ""
+
+    # Metrics
+    _added: int = 0
+    _evicted: int = 0
+    _memory_hits: int = 0
+    _disk_reads: int = 0
+
+    @staticmethod
+    def get_buffer_config() -> Dict[str, int]:
+        """
+        Get frame buffer configuration from environment variables.
+
+        Returns:
+            Dict with the number of frames kept in memory and the maximum number of files
+            and bytes kept in the feed directory
+        """
+        return {
+            "memory_frames": max(1, int(os.environ.get("FRAME_BUFFER_SIZE", "8"))),
+            "max_files": max(1, int(os.environ.get("FEED_MAX_FILES", "500"))),
+            "max_bytes": max(1, int(os.environ.get("FEED_MAX_BYTES", str(1024 ** 3)))),
+        }
+
+    @classmethod
+    def _open(cls, directory: str) -> None:
+        """
+        Load the index of a feed directory, must be called with the lock held.
+
+        Index entries whose file is gone are dropped, and frames written before the index
+        existed are added in order of modification time.
+        """
+        if cls._directory == directory:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        config = cls.get_buffer_config()
+        cls._directory = directory
+        cls._memory = deque(maxlen=config["memory_frames"])
+        cls._index = OrderedDict()
+        cls._bytes = 0
+        cls._last_timestamp = ""
+
+        entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        try:
+            with open(os.path.join(directory, INDEX_FILENAME)) as f:
+                entries.update((entry["filename"], entry) for entry in json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error reading frame index, rebuilding it: {type(e).__name__}: {str(e)}")
+        try:
+            with open(os.path.join(directory, JOURNAL_FILENAME)) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash, the frames on disk are picked up below
+                        continue
+                    if entry.pop("deleted", False):
+                        entries.pop(entry["filename"], None)
+                    else:
+                        entries[entry["filename"]] = entry
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error reading frame index journal: {type(e).__name__}: {str(e)}")
+
+        known = set()
+        for entry in entries.values():
+            path = os.path.join(directory, entry["filename"])
+            if os.path.exists(path):
+                known.add(entry["filename"])
+                cls._track(FrameRecord(entry["filename"], path, entry["size"], entry["captured_at"], entry["sequence"]))
+
+        untracked = [path for path in glob.glob(os.path.join(directory, FRAME_PATTERN)) if os.path.basename(path) not in known]
+        for path in sorted(untracked, key=os.path.getmtime):
+            cls._track(FrameRecord(
+                os.path.basename(path), path, os.path.getsize(path), os.path.getmtime(path), cls._sequence + 1
+            ))
+
+        cls._evict(config)
+        cls._write_index()
+
+    @classmethod
+    def _track(cls, record: FrameRecord) -> None:
+        """Add a record to the index, must be called with the lock held."""
+        cls._index[record.filename] = record
+        cls._bytes += record.size
+        cls._sequence = max(cls._sequence, record.sequence)
+        cls._last_timestamp = max(cls._last_timestamp, datetime.fromtimestamp(record.captured_at).strftime(TIMESTAMP_FORMAT))
+
+    @classmethod
+    def _evict(cls, config: Dict[str, int]) -> None:
+        """Delete the oldest frames until the retention limits are met, must be called with the lock held."""
+        evicted = False
+        while len(cls._index) > 1 and (len(cls._index) > config["max_files"] or cls._bytes > config["max_bytes"]):
+            _, record = cls._index.popitem(last=False)
+            cls._bytes -= record.size
+            cls._evicted += 1
+            cls._journal_pending.append({"filename": record.filename, "deleted": True})
+            evicted = True
+            try:
+                os.remove(record.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error deleting {record.path}: {e}")
+
+        # Evicted frames must not be served from memory either
+        if evicted:
+            cls._memory = deque(
+                (frame for frame in cls._memory if cls._index.get(frame.record.filename) is frame.record),
+                maxlen=cls._memory.maxlen
+            )
+
+    @staticmethod
+    def _entry(record: FrameRecord) -> Dict[str, Any]:
+        """Index entry of a frame"""
+        return {"filename": record.filename, "size": record.size, "captured_at": record.captured_at, "sequence": record.sequence}
+
+    @classmethod
+    def _write_index(cls) -> None:
+        """Replace the index file atomically and empty the journal, must be called with the lock held."""
+        path = os.path.join(cls._directory, INDEX_FILENAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump([cls._entry(r) for r in cls._index.values()], f)
+        os.replace(path + ".tmp", path)
+
+        try:
+            os.remove(os.path.join(cls._directory, JOURNAL_FILENAME))
+        except FileNotFoundError:
+            pass
+        cls._journal_pending = []
+        cls._journal_lines = 0
+
+    @classmethod
+    def _write_journal(cls) -> None:
+        """Append the pending index changes to the journal, must be called with the lock held."""
+        if len(cls._journal_pending) + cls._journal_lines > max(JOURNAL_COMPACT_LINES, len(cls._index)):
+            cls._write_index()
+            return
+
+        lines = "".join(json.dumps(entry) + "\n" for entry in cls._journal_pending)
+        with open(os.path.join(cls._directory, JOURNAL_FILENAME), "a") as f:
+            f.write(lines)
+        cls._journal_lines += len(cls._journal_pending)
+        cls._journal_pending = []
+
+    @classmethod
+    def add(cls, directory: str, data: bytes, write: bool = True) -> FrameRecord:
+        """
+        Store a captured frame in memory and in the feed directory.
+
+        Args:
+            directory: Feed directory
+            data: JPEG bytes of the frame
+            write: Whether to write the file now. Otherwise the frame is only buffered in
+                memory until `write` is called, e.g. from a background task.
+
+        Returns:
+            FrameRecord of the stored frame
+        """
+        captured_at = time.time()
+        with cls._lock:
+            cls._open(directory)
+
+            # Only the first frame of a second gets the plain name. Later frames get their
+            # sequence number in the name, even after earlier frames were evicted, so a name
+            # never refers to two different frames.
+            sequence = cls._sequence + 1
+            timestamp = datetime.fromtimestamp(captured_at).strftime(TIMESTAMP_FORMAT)
+            filename = f"{timestamp}_dart.jpg"
+            if timestamp <= cls._last_timestamp:
+                filename = f"{timestamp}_{sequence}_dart.jpg"
+
+            record = FrameRecord(filename, os.path.join(directory, filename), len(data), captured_at, sequence)
+            cls._track(record)
+            cls._memory.append(BufferedFrame(record, data))
+            cls._added += 1
+            cls._evict(cls.get_buffer_config())
+            if write:
+                cls._write(record, data)
+            return record
+
+    @classmethod
+    def write(cls, record: FrameRecord, data: bytes) -> None:
+        """
+        Write a frame buffered with `add(..., write=False)` to the feed directory.
+
+        Frames that were evicted or cleared in the meantime are not written.
+
+        Args:
+            record: Record returned by `add`
+            data: JPEG bytes of the frame
+        """
+        with cls._lock:
+            if cls._index.get(record.filename) is record:
+                cls._write(record, data)
+
+    @classmethod
+    def _write(cls, record: FrameRecord, data: bytes) -> None:
+        """Write a frame file and the index, must be called with the lock held."""
+        start = time.perf_counter()
+        with open(record.path, "wb") as f:
+            f.write(data)
+        cls._journal_pending.append(cls._entry(record))
+        cls._write_journal()
+        Metrics.observe_since("feed_write", start)
+
+    @classmethod
+    def get_latest(cls, directory: str) -> Optional[BufferedFrame]:
+        """
+        Get the most recent frame.
+
+        Args:
+            directory: Feed directory
+
+        Returns:
+            BufferedFrame, or None if there are no frames
+        """
+        with cls._lock:
+            cls._open(directory)
+            if cls._memory:
+                cls._memory_hits += 1
+                return cls._memory[-1]
+            if not cls._index:
+                return None
+            record = next(reversed(cls._index.values()))
+
+        # Only after a restart: the frames on disk are not in memory yet
+        return cls._read(record)
+
+    @classmethod
+    def get(cls, directory: str, filename: str) -> Optional[BufferedFrame]:
+        """
+        Get a stored frame by its file name.
+
+        Args:
+            directory: Feed directory
+            filename: Name of the frame file
+
+        Returns:
+            BufferedFrame, or None if the frame is not stored
+        """
+        with cls._lock:
+            cls._open(directory)
+            for frame in reversed(cls._memory):
+                if frame.record.filename == filename:
+                    cls._memory_hits += 1
+                    return frame
+            record = cls._index.get(filename)
+        return cls._read(record) if record is not None else None
+
+    @classmethod
+    def _read(cls, record: FrameRecord) -> Optional[BufferedFrame]:
+        """Read a frame from disk"""
+        try:
+            with open(record.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with cls._lock:
+            cls._disk_reads += 1
+        return BufferedFrame(record, data)
+
+    @classmethod
+    def clear(cls, directory: str) -> int:
+        """
+        Delete all stored frames.
+
+        Args:
+            directory: Feed directory
+
+        Returns:
+            int: Number of files deleted
+        """
+        with cls._lock:
+            cls._open(directory)
+            count = 0
+            for record in cls._index.values():
+                try:
+                    os.remove(record.path)
+                    count += 1
+                except Exception as e:
+                    print(f"Error deleting {record.path}: {e}")
+            cls._index.clear()
+            cls._memory.clear()
+            cls._bytes = 0
+            cls._write_index()
+            return count
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get frame buffer statistics.
+
+        Returns:
+            Dict with configuration, the frames and bytes held in memory and on disk and
+            counters of added, evicted and served frames
+        """
+        with cls._lock:
+            return {
+                **cls.get_buffer_config(),
+                "frames_in_memory": len(cls._memory),
+                "memory_bytes": sum(frame.record.size for frame in cls._memory),
+                "files": len(cls._index),
+                "disk_bytes": cls._bytes,
+                "added": cls._added,
+                "evicted": cls._evicted,
+                "memory_hits": cls._memory_hits,
+                "disk_reads": cls._disk_reads,
+            }
@@ -0,0 +1,436 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.calibration import BoardHomography, HomographyStatus, ReferencePoint
+from services.image_decoder import ImageDecoder, ImageSource
+
+# Radius of the outer edge of the double ring on a standard board, in millimetres
+BOARD_RADIUS_MM = 170.0
+# Segment order clockwise from the top, used to name the double ring keypoints
+KEYPOINT_SEGMENTS = [20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5]
+# Area around the board compared during validation, in board radii
+VALIDATION_AREA = 1.4
+
+
+def keypoint_position(name: str) -> Tuple[float, float]:
+    """
+    Get the board position of a named keypoint.
+
+    Args:
+        name: 'bull', or 'A/B' for the outer corner of the double ring between adjacent segments A and B
+
+    Returns:
+        Tuple of (x, y) in board millimetres
+
+    Raises:
+        ValueError: If the name is not a known keypoint
+    """
+    if name.strip().lower() == "bull":
+        return 0.0, 0.0
+
+    try:
+        first, second = (int(part) for part in name.split("/"))
+        i, j = KEYPOINT_SEGMENTS.index(first), KEYPOINT_SEGMENTS.index(second)
+    except ValueError:
+        raise ValueError(f"Unknown keypoint '{name}'. Use 'bull' or two adjacent segments such as '20/1'.")
+
+    if (i + 1) % 20 == j:
+        boundary = j
+    elif (j + 1) % 20 == i:
+        boundary = i
+    else:
+        raise ValueError(f"Segments {first} and {second} in keypoint '{name}' are not adjacent")
+
+    # Segment k spans (k * 18 - 9) to (k * 18 + 9) degrees clockwise from the top
+    angle = math.radians(boundary * 18 - 9)
+    return BOARD_RADIUS_MM * math.sin(angle), -BOARD_RADIUS_MM * math.cos(angle)
+
+
+def solve_homography(frame_points: np.ndarray, board_points: np.ndarray) -> np.ndarray:
+    """
+    Solve the homography mapping frame points to board points with the normalized DLT.
+
+    Args:
+        frame_points: Array of shape (N, 2) with frame pixels, N >= 4
+        board_points: Array of shape (N, 2) with the matching board positions
+
+    Returns:
+        3x3 matrix H with board ~ H @ [x, y, 1]
+
+    Raises:
+        ValueError: If the points do not determine a homography
+    """
+    def normalize(points: np.ndarray) -> np.ndarray:
+        # Similarity moving the centroid to the origin with a mean distance of sqrt(2)
+        centroid = points.mean(axis=0)
+        spread = np.sqrt(((points - centroid) ** 2).sum(axis=1)).mean()
+        if spread == 0:
+            raise ValueError("Reference points must not all coincide")
+        scale = math.sqrt(2) / spread
+        return np.array([[scale, 0, -scale * centroid[0]], [0, scale, -scale * centroid[1]], [0, 0, 1]])
+
+    t_frame, t_board = normalize(frame_points), normalize(board_points)
+    src = apply_homography(t_frame, frame_points)
+    dst = apply_homography(t_board, board_points)
+
+    rows = []
+    for (x, y), (u, v) in zip(src, dst):
+        rows.append([-x, -y, -1, 0, 0, 0, u * x, u * y, u])
+        rows.append([0, 0, 0, -x, -y, -1, v * x, v * y, v])
+    _, singular_values, vt = np.linalg.svd(np.array(rows))
+    if singular_values[7] < 1e-9 * singular_values[0]:
+        raise ValueError("Reference points are degenerate, e.g. three or more lie on one line")
+
+    matrix = np.linalg.inv(t_board) @ vt[-1].reshape(3, 3) @ t_frame
+    return matrix / matrix[2, 2]
+
+
+def apply_homography(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Map many points through a homography at once.
+
+    Args:
+        matrix: 3x3 homography
+        points: Array of shape (N, 2)
+
+    Returns:
+        Array of shape (N, 2) with the mapped points
+    """
+    mapped = points @ matrix[:, :2].T + matrix[:, 2]
+    return mapped[:, :2] / mapped[:, 2:3]
+
+
+def phase_correlation(reference: np.ndarray, current: np.ndarray) -> Tuple[float, float, float]:
+    """
+    Estimate the translation of an image relative to a reference.
+
+    Args:
+        reference: Grayscale reference image
+        current: Grayscale image of the same shape
+
+    Returns:
+        Tuple of (shift_x, shift_y, peak) where the shift is in pixels with sub-pixel
+        precision and the peak (0-1) measures how well the images correlate
+    """
+    height, width = reference.shape
+    window = np.outer(np.hanning(height), np.hanning(width))
+    f_reference = np.fft.fft2((reference - reference.mean()) * window)
+    f_current = np.fft.fft2((current - current.mean()) * window)
+    cross_power = f_current * np.conj(f_reference)
+    cross_power /= np.abs(cross_power) + 1e-9
+    correlation = np.fft.ifft2(cross_power).real
+
+    peak_y, peak_x = np.unravel_index(np.argmax(correlation), correlation.shape)
+
+    def refine(before: float, peak: float, after: float) -> float:
+        # Vertex of the parabola through the peak and its neighbours
+        denominator = before - 2 * peak + after
+        return 0.0 if denominator == 0 else 0.5 * (before - after) / denominator
+
+    dx = peak_x + refine(correlation[peak_y, peak_x - 1], correlation[peak_y, peak_x],
+                         correlation[peak_y, (peak_x + 1) % width])
+    dy = peak_y + refine(correlation[peak_y - 1, peak_x], correlation[peak_y, peak_x],
+                         correlation[(peak_y + 1) % height, peak_x])
+    if dx > width / 2:
+        dx -= width
+    if dy > height / 2:
+        dy -= height
+    return float(dx), float(dy), float(correlation[peak_y, peak_x])
+
+
+class HomographyService:
+    """
+    Service for the camera-to-board homography.
+
+    The homography is solved once from reference points and persisted. Scoring then
+    maps detections to board millimetres with one batched matrix operation, which
+    accounts for the perspective of the camera.
+
+    Each frame is cheaply validated against a reference frame with phase correlation
+    on a small thumbnail. When the camera has been moved, the translation is folded
+    into the homography instead of requiring new reference points.
+    """
+
+    _lock = threading.Lock()
+    _homography: Optional[BoardHomography] = None
+    _matrix: Optional[np.ndarray] = None
+    _loaded: bool = False
+    _version: int = 0
+
+    # Validation state
+    _reference: Optional[np.ndarray] = None
+    _reference_box: Optional[Tuple[int, int, int, int]] = None
+    _checks: int = 0
+    _inconclusive: int = 0
+    _moves: int = 0
+    _last_shift: Optional[List[float]] = None
+    _last_correlation: Optional[float] = None
+
+    @staticmethod
+    def get_homography_config() -> Dict[str, Any]:
+        """
+        Get homography configuration from environment variables.
+
+        Returns:
+            Dict with the file path, whether frames are validated, the validation thumbnail size,
+            the shift in frame pixels treated as camera movement and the minimum correlation peak
+        """
+        return {
+            "path": os.environ.get("HOMOGRAPHY_PATH", "config/homography.json"),
+            "check_enabled": os.environ.get("HOMOGRAPHY_CHECK_ENABLED", "true").lower() in ("1", "true", "yes"),
+            "check_size": max(32, int(os.environ.get("HOMOGRAPHY_CHECK_SIZE", "256"))),
+            "max_shift": float(os.environ.get("HOMOGRAPHY_MAX_SHIFT", "3")),
+            "min_correlation": float(os.environ.get("HOMOGRAPHY_MIN_CORRELATION", "0.3")),
+        }
+
+    @classmethod
+    def get_matrix(cls) -> Optional[np.ndarray]:
+        """
+        Get the current frame-to-board matrix, loading it from disk on first use.
+
+        Returns:
+            3x3 matrix, or None when no homography has been solved
+        """
+        if not cls._loaded:
+            with cls._lock:
+                if not cls._loaded:
+                    cls._set(cls._load())
+                    cls._loaded = True
+        return cls._matrix
+
+    @classmethod
+    def get_version(cls) -> int:
+        """
+        Get a counter that changes whenever the homography changes, for use in cache keys.
+
+        Returns:
+            int: Homography version
+        """
+        cls.get_matrix()
+        return cls._version
+
+    @classmethod
+    def update(cls, points: List[ReferencePoint]) -> BoardHomography:
+        """
+        Solve the homography from reference points and persist it.
+
+        Args:
+            points: At least four reference points
+
+        Returns:
+            BoardHomography: The solved homography
+
+        Raises:
+            ValueError: If a keypoint is unknown or the points do not determine a homography
+        """
+        frame_points = np.array([[point.x, point.y] for point in points], dtype=np.float64)
+        board_points = []
+        for point in points:
+            if point.keypoint is not None:
+                board_points.append(keypoint_position(point.keypoint))
+            elif point.board_x is not None and point.board_y is not None:
+                board_points.append((point.board_x, point.board_y))
+            else:
+                raise ValueError(f"Reference point ({point.x}, {point.y}) needs a keypoint or board coordinates")
+        board_points = np.array(board_points, dtype=np.float64)
+
+        matrix = solve_homography(frame_points, board_points)
+        error = np.linalg.norm(apply_homography(matrix, frame_points) - board_points, axis=1).mean()
+        homography = BoardHomography(
+            matrix=matrix.tolist(),
+            points=points,
+            reprojection_error_mm=float(error),
+            solved_at=time.time()
+        )
+
+        with cls._lock:
+            cls._save(homography)
+            cls._set(homography)
+            cls._loaded = True
+        return homography
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove the homography so scoring falls back to the circular calibration."""
+        path = cls.get_homography_config()["path"]
+        with cls._lock:
+            if os.path.exists(path):
+                os.remove(path)
+            cls._set(None)
+            cls._loaded = True
+
+    @staticmethod
+    def frame_to_board(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """
+        Map frame pixels to board millimetres.
+
+        Args:
+            matrix: Frame-to-board matrix from `get_matrix`
+            points: Array of shape (N, 2) with frame pixels
+
+        Returns:
+            Array of shape (N, 2) with board positions
+        """
+        return apply_homography(matrix, points)
+
+    @staticmethod
+    def board_to_frame(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """
+        Map board millimetres to frame pixels.
+
+        Args:
+            matrix: Frame-to-board matrix from `get_matrix`
+            points: Array of shape (N, 2) with board positions
+
+        Returns:
+            Array of shape (N, 2) with frame pixels
+        """
+        return apply_homography(np.linalg.inv(matrix), points)
+
+    @staticmethod
+    def get_board_box(matrix: np.ndarray, frame_size: Tuple[int, int], radius_mm: float) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the frame region covering a circle around the bull, clipped to the frame.
+
+        Args:
+            matrix: Frame-to-board matrix
+            frame_size: Frame size as (width, height)
+            radius_mm: Radius of the circle on the board
+
+        Returns:
+            Tuple of (left, top, right, bottom), or None if the circle is outside the frame
+        """
+        angles = np.linspace(0, 2 * np.pi, 72, endpoint=False)
+        circle = radius_mm * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        outline = HomographyService.board_to_frame(matrix, circle)
+        width, height = frame_size
+        left, top = np.floor(outline.min(axis=0)).astype(int)
+        right, bottom = np.ceil(outline.max(axis=0)).astype(int)
+        left, top, right, bottom = max(0, left), max(0, top), min(width, right), min(height, bottom)
+
+        if right <= left or bottom <= top:
+            return None
+        return int(left), int(top), int(right), int(bottom)
+
+    @classmethod
+    def validate(cls, image: ImageSource) -> None:
+        """
+        Check a frame for camera movement and compensate it.
+
+        The first frame after solving becomes the reference. Later frames are compared
+        with it by phase correlation. A confident shift above the threshold is treated as
+        camera movement: it is folded into the homography, which is persisted, and the
+        frame becomes the new reference. Weak correlations, e.g. while a player stands in
+        front of the board, are ignored.
+
+        Args:
+            image: JPEG bytes of the camera frame, or the decoded frame
+        """
+        config = cls.get_homography_config()
+        matrix = cls.get_matrix()
+        if matrix is None or not config["check_enabled"]:
+            return
+
+        img = ImageDecoder.open(image)
+        with cls._lock:
+            box = cls._reference_box
+            if box is None:
+                box = cls.get_board_box(matrix, img.size, BOARD_RADIUS_MM * VALIDATION_AREA)
+                if box is None:
+                    return
+
+        size = config["check_size"]
+        thumbnail = np.asarray(ImageDecoder.thumbnail(img, box, size), dtype=np.float64)
+
+        with cls._lock:
+            if cls._reference is None or cls._reference_box != box or cls._matrix is not matrix:
+                cls._reference, cls._reference_box = thumbnail, box
+                return
+            reference = cls._reference
+
+        dx, dy, peak = phase_correlation(reference, thumbnail)
+        shift_x = dx * (box[2] - box[0]) / size
+        shift_y = dy * (box[3] - box[1]) / size
+
+        with cls._lock:
+            cls._checks += 1
+            cls._last_shift = [shift_x, shift_y]
+            cls._last_correlation = peak
+            if peak < config["min_correlation"]:
+                cls._inconclusive += 1
+                return
+            if math.hypot(shift_x, shift_y) <= config["max_shift"] or cls._matrix is not matrix:
+                return
+
+            # Frame point p + shift shows what p showed before the move
+            translation = np.array([[1, 0, -shift_x], [0, 1, -shift_y], [0, 0, 1]])
+            moved = matrix @ translation
+            homography = cls._homography.model_copy(update={
+                "matrix": (moved / moved[2, 2]).tolist(),
+                "shift_x": cls._homography.shift_x + shift_x,
+                "shift_y": cls._homography.shift_y + shift_y,
+            })
+            try:
+                cls._save(homography)
+            except OSError as e:
+                print(f"Error saving homography: {e}")
+            cls._set(homography)
+            cls._moves += 1
+            print(f"Camera moved by ({shift_x:.1f}, {shift_y:.1f}) px, homography updated")
+
+    @classmethod
+    def get_status(cls) -> HomographyStatus:
+        """
+        Get the current homography and validation statistics.
+
+        Returns:
+            HomographyStatus: Current state
+        """
+        cls.get_matrix()
+        with cls._lock:
+            return HomographyStatus(
+                active=cls._matrix is not None,
+                homography=cls._homography,
+                checks=cls._checks,
+                inconclusive=cls._inconclusive,
+                moves=cls._moves,
+                last_shift=cls._last_shift,
+                last_correlation=cls._last_correlation,
+            )
+
+    @classmethod
+    def _set(cls, homography: Optional[BoardHomography]) -> None:
+        """Install a homography and reset the validation reference. Must hold the lock."""
+        cls._homography = homography
+        cls._matrix = np.array(homography.matrix, dtype=np.float64) if homography is not None else None
+        cls._reference = None
+        cls._reference_box = None
+        cls._version += 1
+
+    @classmethod
+    def _save(cls, homography: BoardHomography) -> None:
+        """Write a homography to the homography file."""
+        path = cls.get_homography_config()["path"]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write(homography.model_dump_json(indent=2))
+
+    @classmethod
+    def _load(cls) -> Optional[BoardHomography]:
+        """Read the homography file, if any."""
+        path = cls.get_homography_config()["path"]
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path) as f:
+                return BoardHomography(**json.load(f))
+        except Exception as e:
+            print(f"Error loading homography from {path}: {e}")
+            return None
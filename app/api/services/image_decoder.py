@@ -0,0 +1,117 @@
+import io
+import math
+import os
+from typing import Optional, Tuple, Union
+
+from PIL import Image
+
+# A frame as JPEG bytes, or already decoded, e.g. by stream ingestion
+ImageSource = Union[bytes, Image.Image]
+
+
+class ImageDecoder:
+    """
+    Decodes camera frames at the lowest resolution the caller needs.
+
+    JPEG frames are decoded with DCT-domain downscaling (PIL `draft`), which
+    produces a 1/2, 1/4 or 1/8 scale image directly instead of decoding the full
+    4K frame and resizing it afterwards. The scale is always chosen so the decoded
+    image is at least as large as requested.
+    """
+
+    @staticmethod
+    def is_draft_enabled() -> bool:
+        """
+        Check whether reduced-resolution decoding is enabled.
+
+        Returns:
+            bool: Value of the DECODE_DRAFT_ENABLED environment variable (default True)
+        """
+        return os.environ.get("DECODE_DRAFT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def open(image: ImageSource) -> Image.Image:
+        """
+        Open an image without decoding its pixels.
+
+        Decoded images are returned as they are. They are never modified by `decode`
+        and `thumbnail`, so the same image can be opened by several stages.
+
+        Args:
+            image: Raw bytes of the image, or a decoded image
+
+        Returns:
+            Lazily loaded image whose size is the original frame size
+        """
+        if isinstance(image, Image.Image):
+            return image
+        return Image.open(io.BytesIO(image))
+
+    @staticmethod
+    def decode(
+        img: Image.Image,
+        min_scale: float,
+        box: Optional[Tuple[int, int, int, int]] = None,
+        mode: str = "RGB",
+    ) -> Tuple[Image.Image, Tuple[float, float, float, float]]:
+        """
+        Decode an opened image at reduced resolution, optionally keeping only a region.
+
+        Must be called before the pixels of a JPEG image have been loaded. Decoded
+        images are only converted and cropped.
+
+        Args:
+            img: Image returned by `open`
+            min_scale: Smallest acceptable scale of the decoded image relative to the original
+            box: Region (left, top, right, bottom) in original frame pixels to keep, or None
+            mode: Mode of the decoded image
+
+        Returns:
+            Tuple of (decoded image, transform) where transform is
+            (scale_x, scale_y, offset_x, offset_y) mapping decoded pixels back to the
+            original frame: frame = decoded * scale + offset
+        """
+        width, height = img.size
+
+        if img.format == "JPEG" and min_scale < 1 and ImageDecoder.is_draft_enabled():
+            img.draft(mode, (math.ceil(width * min_scale), math.ceil(height * min_scale)))
+
+        if img.mode != mode:
+            img = img.convert(mode)
+
+        scale_x = width / img.size[0]
+        scale_y = height / img.size[1]
+
+        if box is None:
+            return img, (scale_x, scale_y, 0.0, 0.0)
+
+        left, top, right, bottom = box
+        region = img.crop((
+            int(left / scale_x),
+            int(top / scale_y),
+            math.ceil(right / scale_x),
+            math.ceil(bottom / scale_y),
+        ))
+        offset_x = int(left / scale_x) * scale_x
+        offset_y = int(top / scale_y) * scale_y
+        return region, (scale_x, scale_y, offset_x, offset_y)
+
+    @staticmethod
+    def thumbnail(img: Image.Image, box: Optional[Tuple[int, int, int, int]], size: int) -> Image.Image:
+        """
+        Decode a region of an opened image as a small square grayscale thumbnail.
+
+        The region is decoded in grayscale at the smallest JPEG scale that covers the
+        thumbnail, which is much cheaper than a full decode.
+
+        Args:
+            img: Image returned by `open`
+            box: Region (left, top, right, bottom) in original frame pixels, or None for the whole frame
+            size: Width and height of the thumbnail
+
+        Returns:
+            Grayscale image of shape (size, size)
+        """
+        region_size = max(box[2] - box[0], box[3] - box[1]) if box is not None else max(img.size)
+        region, _ = ImageDecoder.decode(img, size / region_size, box, mode="L")
+        return region.resize((size, size), Image.BILINEAR, reducing_gap=2.0)
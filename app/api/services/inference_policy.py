@@ -0,0 +1,148 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+# Inference tiers, from cheapest to most expensive
+TIER_FAST = "fast"            # Production pass at the normal input size
+TIER_HIGH_RES = "high_res"    # Same thresholds at a larger input size
+TIER_TTA = "tta"              # Very low confidence threshold with test-time augmentation
+TIER_REGION = "region"        # Larger input size on the changed region of the board only
+ESCALATION_TIERS = (TIER_HIGH_RES, TIER_TTA)
+
+# Cost of the TTA tier relative to the fast tier before it has been measured.
+# Augmentation runs the model on three scaled and flipped copies of the image.
+TTA_COST_FACTOR = 3.0
+# Weight of the latest duration in the moving average of each tier's cost
+COST_SMOOTHING = 0.2
+
+
+class InferencePolicy:
+    """
+    Decides whether a frame without detections should be re-run with a more
+    expensive inference tier, given a per-request latency budget.
+
+    The cost of each tier is tracked as a moving average of observed durations.
+    Until a tier has been measured, its cost is estimated from the fast tier.
+    """
+
+    _lock = threading.Lock()
+    _costs: Dict[str, float] = {}
+    _answered_by: Dict[str, int] = {}
+    _skipped_for_budget: int = 0
+
+    @staticmethod
+    def get_policy_config() -> Dict[str, float]:
+        """
+        Get the tier policy configuration from environment variables.
+
+        Returns:
+            Dict with the default latency budget in milliseconds (0 = fast tier only) and
+            the input size multiplier of the high resolution tier
+        """
+        return {
+            "budget_ms": max(0.0, float(os.environ.get("INFERENCE_BUDGET_MS", "0"))),
+            "high_res_scale": max(1.0, float(os.environ.get("INFERENCE_HIGH_RES_SCALE", "1.5"))),
+        }
+
+    @classmethod
+    def resolve_budget(cls, budget_ms: Optional[float]) -> float:
+        """
+        Get the budget that applies to a request.
+
+        Args:
+            budget_ms: Budget requested by the client, or None to use the server default
+
+        Returns:
+            float: Latency budget in milliseconds
+        """
+        return cls.get_policy_config()["budget_ms"] if budget_ms is None else budget_ms
+
+    @classmethod
+    def estimate_cost(cls, tier: str) -> Optional[float]:
+        """
+        Estimate the duration of a tier.
+
+        Args:
+            tier: Name of the tier
+
+        Returns:
+            Estimated duration in milliseconds, or None if nothing has been measured yet
+        """
+        with cls._lock:
+            if tier in cls._costs:
+                return cls._costs[tier]
+            fast_cost = cls._costs.get(TIER_FAST)
+
+        if fast_cost is None:
+            return None
+        if tier == TIER_HIGH_RES:
+            return fast_cost * cls.get_policy_config()["high_res_scale"] ** 2
+        if tier == TIER_TTA:
+            return fast_cost * TTA_COST_FACTOR
+        return fast_cost
+
+    @classmethod
+    def can_escalate(cls, tier: str, elapsed_ms: float, budget_ms: float) -> bool:
+        """
+        Check whether a tier is expected to finish within the remaining budget.
+
+        Args:
+            tier: Name of the tier to run next
+            elapsed_ms: Time already spent on the request
+            budget_ms: Latency budget of the request
+
+        Returns:
+            bool: True if the tier should be run
+        """
+        if budget_ms <= 0:
+            return False
+
+        cost = cls.estimate_cost(tier)
+        if cost is None or elapsed_ms + cost > budget_ms:
+            with cls._lock:
+                cls._skipped_for_budget += 1
+            return False
+        return True
+
+    @classmethod
+    def record_cost(cls, tier: str, duration_ms: float) -> None:
+        """
+        Fold an observed tier duration into its moving average.
+
+        Args:
+            tier: Name of the tier
+            duration_ms: Observed duration in milliseconds
+        """
+        with cls._lock:
+            if tier in cls._costs:
+                cls._costs[tier] += COST_SMOOTHING * (duration_ms - cls._costs[tier])
+            else:
+                cls._costs[tier] = duration_ms
+
+    @classmethod
+    def record_answer(cls, tier: str) -> None:
+        """
+        Count the tier that produced a response.
+
+        Args:
+            tier: Name of the tier
+        """
+        with cls._lock:
+            cls._answered_by[tier] = cls._answered_by.get(tier, 0) + 1
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get tier policy statistics.
+
+        Returns:
+            Dict with configuration, estimated tier costs, responses per tier and the number
+            of escalations skipped because they did not fit in the budget
+        """
+        with cls._lock:
+            return {
+                **cls.get_policy_config(),
+                "cost_ms": dict(cls._costs),
+                "answered_by": dict(cls._answered_by),
+                "skipped_for_budget": cls._skipped_for_budget,
+            }
@@ -0,0 +1,169 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Weight of the latest task duration in the moving average used for Retry-After
+DURATION_SMOOTHING = 0.2
+
+
+class SchedulerBusyError(Exception):
+    """Raised when the inference queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceScheduler:
+    """
+    Runs blocking inference work on a dedicated thread pool with a bounded queue.
+
+    Requests beyond the configured queue depth are rejected immediately instead of
+    piling up, so the event loop stays free to serve other endpoints.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    # Guards the counters, which are updated from the event loop and the worker threads
+    _lock = threading.Lock()
+    _workers: int = 1
+    _queue_depth: int = 4
+    _pending: int = 0
+    _rejected: int = 0
+    _completed: int = 0
+    _average_duration: Optional[float] = None
+
+    @staticmethod
+    def get_scheduler_config() -> Dict[str, int]:
+        """
+        Get scheduler configuration from environment variables.
+
+        Returns:
+            Dict with the number of workers and the queue depth
+        """
+        return {
+            "workers": max(1, int(os.environ.get("INFERENCE_WORKERS", "1"))),
+            "queue_depth": max(1, int(os.environ.get("INFERENCE_QUEUE_DEPTH", "4"))),
+        }
+
+    @classmethod
+    def start(cls) -> None:
+        """Create the thread pool using the configured number of workers."""
+        if cls._executor is not None:
+            return
+
+        config = cls.get_scheduler_config()
+        cls._workers = config["workers"]
+        cls._queue_depth = config["queue_depth"]
+        cls._executor = ThreadPoolExecutor(max_workers=cls._workers, thread_name_prefix="inference")
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop the thread pool, waiting for running tasks to finish."""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
+
+    @classmethod
+    async def run(cls, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking function on the inference thread pool.
+
+        The queue depth counts both running and waiting tasks.
+
+        Args:
+            func: Blocking function to run
+            *args: Arguments passed to the function
+
+        Returns:
+            The return value of the function
+
+        Raises:
+            SchedulerBusyError: If the queue is full
+        """
+        cls.start()
+
+        with cls._lock:
+            busy = cls._pending >= cls._queue_depth
+            if busy:
+                cls._rejected += 1
+            else:
+                cls._pending += 1
+        if busy:
+            raise SchedulerBusyError(cls.get_retry_after())
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(cls._executor, cls._timed, func, args)
+        finally:
+            with cls._lock:
+                cls._pending -= 1
+
+    @classmethod
+    def submit(cls, func: Callable[..., Any], *args: Any) -> Future:
+        """
+        Run a blocking function on the inference thread pool from a background thread.
+
+        Used by producers outside the event loop, such as stream ingestion, so their
+        inference shares the workers with the requests. These tasks are not counted
+        against the queue depth, callers are expected to submit one at a time.
+
+        Args:
+            func: Blocking function to run
+            *args: Arguments passed to the function
+
+        Returns:
+            Future resolving to the return value of the function
+        """
+        cls.start()
+        return cls._executor.submit(cls._timed, func, args)
+
+    @classmethod
+    def _timed(cls, func: Callable[..., Any], args: tuple) -> Any:
+        """Run a task and fold its duration into the moving average."""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            duration = time.perf_counter() - start
+            with cls._lock:
+                if cls._average_duration is None:
+                    cls._average_duration = duration
+                else:
+                    cls._average_duration += DURATION_SMOOTHING * (duration - cls._average_duration)
+                cls._completed += 1
+
+    @classmethod
+    def get_retry_after(cls) -> int:
+        """
+        Estimate how long a rejected client should wait before retrying.
+
+        Returns:
+            int: Seconds until the queued work is expected to drain, at least 1
+        """
+        with cls._lock:
+            average_duration, pending = cls._average_duration, cls._pending
+        if average_duration is None:
+            return 1
+        return max(1, math.ceil(average_duration * pending / cls._workers))
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get scheduler statistics.
+
+        Returns:
+            Dict with queue configuration, pending, completed and rejected task counts
+        """
+        with cls._lock:
+            return {
+                "workers": cls._workers,
+                "queue_depth": cls._queue_depth,
+                "pending": cls._pending,
+                "completed": cls._completed,
+                "rejected": cls._rejected,
+                "average_duration_ms": cls._average_duration * 1000 if cls._average_duration is not None else None,
+            }
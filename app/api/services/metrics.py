@@ -0,0 +1,179 @@
+import bisect
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Upper bounds in seconds of the latency buckets, from sub-millisecond stages to slow fallback passes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Distribution of observed values per label value, in the Prometheus text format"""
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        # Per label value: count per bucket (the last one is +Inf), then the sum of the values
+        self._series: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        """Record one value."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        """Format the histogram as Prometheus exposition lines."""
+        with self._lock:
+            series = {label_value: list(values) for label_value, values in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_value, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Monotonic count per label value, in the Prometheus text format"""
+
+    def __init__(self, name: str, documentation: str, label: str):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str, amount: float = 1) -> None:
+        """Add to the count of a label value."""
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> List[str]:
+        """Format the counter as Prometheus exposition lines."""
+        with self._lock:
+            values = dict(self._values)
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_value, value in sorted(values.items()):
+            lines.append(f'{self.name}{{{self.label}="{label_value}"}} {value}')
+        return lines
+
+
+class Metrics:
+    """
+    Per-stage latency histograms and pipeline counters, exposed at /metrics.
+
+    Stages record their duration with `observe` and events are counted with `count`.
+    Recording is a bucket lookup and an increment under a lock, so it can stay on the
+    hot path. It does nothing when METRICS_ENABLED is false.
+
+    Stages:
+        camera_connect: Opening a new connection to the camera, including TLS
+        camera_login: Login request for a camera token
+        camera_transfer: Snapshot request and image transfer on an open connection
+        feed_write: Writing a frame to the feed directory
+        stream_encode: JPEG encoding of a detected stream frame for the feed
+        upload_read: Reading an uploaded image from the request
+        decode: JPEG decoding and cropping of the model input
+        preprocess, forward, nms: Model input preparation, forward pass and NMS of the fast tier
+        fallback: Each pass of a more expensive inference tier
+        postprocess: Decoding, mapping and scoring of the model output
+        serialize: JSON serialization of a detection response
+    """
+
+    _enabled: Optional[bool] = None
+
+    _stages = Histogram(
+        "dartvision_stage_duration_seconds", "Duration of a stage of the capture and inference pipeline", "stage",
+        LATENCY_BUCKETS
+    )
+    _counters = {
+        "detections": Counter(
+            "dartvision_detections_total", "Frames run through the model, by the tier that produced the answer", "tier"
+        ),
+        "darts": Counter("dartvision_darts_detected_total", "Darts detected, by the tier that produced the answer", "tier"),
+        "fallbacks": Counter("dartvision_fallbacks_total", "Passes of more expensive inference tiers", "tier"),
+        "cache_hits": Counter(
+            "dartvision_cache_hits_total",
+            "Responses served without running the model: 'result' for repeated images, 'coalesced' for requests "
+            "sharing a running detection, 'unchanged' for frames where the board did not change",
+            "cache"
+        ),
+        "errors": Counter("dartvision_errors_total", "Failures, by the stage that failed", "stage"),
+    }
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """
+        Check whether metrics are recorded.
+
+        Returns:
+            bool: Value of the METRICS_ENABLED environment variable (default True), read once
+        """
+        if cls._enabled is None:
+            cls._enabled = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        return cls._enabled
+
+    @classmethod
+    def observe(cls, stage: str, seconds: float) -> None:
+        """
+        Record the duration of a pipeline stage.
+
+        Args:
+            stage: Name of the stage
+            seconds: Duration in seconds
+        """
+        if cls.is_enabled():
+            cls._stages.observe(stage, seconds)
+
+    @classmethod
+    def observe_since(cls, stage: str, start: float) -> None:
+        """
+        Record the duration of a pipeline stage that started at a `time.perf_counter()` value.
+
+        Args:
+            stage: Name of the stage
+            start: Start time from `time.perf_counter()`
+        """
+        if cls.is_enabled():
+            cls._stages.observe(stage, time.perf_counter() - start)
+
+    @classmethod
+    def count(cls, counter: str, label_value: str, amount: float = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            counter: Key of the counter: detections, darts, fallbacks, cache_hits or errors
+            label_value: Value of the counter's label, e.g. the tier or the failing stage
+            amount: Amount to add
+        """
+        if cls.is_enabled():
+            cls._counters[counter].inc(label_value, amount)
+
+    @classmethod
+    def render(cls) -> str:
+        """
+        Format all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text, ending with a newline
+        """
+        lines = cls._stages.render()
+        for counter in cls._counters.values():
+            lines.extend(counter.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Union
+
+from models.detection import DetectionResponse
+from services.inference_scheduler import InferenceScheduler, SchedulerBusyError
+from services.prediction_service import DetectionError, PredictionService
+
+
+class PendingRequest(NamedTuple):
+    """A request waiting for the next batch"""
+    model: Any
+    image_bytes: bytes
+    budget_ms: Optional[float]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class MicroBatcher:
+    """
+    Groups concurrent prediction requests into batched forward passes.
+
+    Requests are collected until either the batch window expires or the batch is
+    full, then run as one `PredictionService.detect_darts_batch` call on the
+    inference scheduler. Each caller receives its own result.
+
+    Requests waiting in the batcher or running in a batch are bounded by the
+    scheduler's queue depth times the batch size, beyond which they are rejected
+    like a full scheduler queue.
+    """
+
+    _enabled: Optional[bool] = None
+    _window: float = 0.02
+    _max_size: int = 4
+    _capacity: int = 16
+    _queue: List[PendingRequest] = []
+    _timer: Optional[asyncio.TimerHandle] = None
+    # Running batches, referenced so they are not garbage collected before they finish
+    _tasks: Set[asyncio.Task] = set()
+    _in_flight: int = 0
+
+    # Metrics
+    _batches: int = 0
+    _requests: int = 0
+    _batch_sizes: Dict[int, int] = {}
+    _total_wait: float = 0.0
+    _max_wait: float = 0.0
+    _rejected: int = 0
+
+    @staticmethod
+    def get_batching_config() -> Dict[str, Any]:
+        """
+        Get micro-batching configuration from environment variables.
+
+        Returns:
+            Dict with whether batching is enabled, the window in seconds and the maximum batch size
+        """
+        return {
+            "enabled": os.environ.get("BATCH_ENABLED", "false").lower() in ("1", "true", "yes"),
+            "window": max(0.0, float(os.environ.get("BATCH_WINDOW_MS", "20"))) / 1000,
+            "max_size": max(1, int(os.environ.get("BATCH_MAX_SIZE", "4"))),
+        }
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """Check whether micro-batching is enabled, reading the configuration on first use."""
+        if cls._enabled is None:
+            config = cls.get_batching_config()
+            cls._enabled = config["enabled"]
+            cls._window = config["window"]
+            cls._max_size = config["max_size"]
+            cls._capacity = config["max_size"] * InferenceScheduler.get_scheduler_config()["queue_depth"]
+        return cls._enabled
+
+    @classmethod
+    async def submit(
+        cls,
+        model: Any,
+        image_bytes: bytes,
+        budget_ms: Optional[float] = None
+    ) -> Union[DetectionResponse, DetectionError]:
+        """
+        Queue an image for the next batch and wait for its result.
+
+        Args:
+            model: Loaded model from the model registry
+            image_bytes: Raw bytes of the uploaded image
+            budget_ms: Latency budget in milliseconds, or None for the server default
+
+        Returns:
+            The detection response or error for this image
+
+        Raises:
+            SchedulerBusyError: If the batcher or the inference queue is full
+        """
+        cls.is_enabled()
+        if len(cls._queue) + cls._in_flight >= cls._capacity:
+            cls._rejected += 1
+            raise SchedulerBusyError(InferenceScheduler.get_retry_after())
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        cls._queue.append(PendingRequest(model, image_bytes, budget_ms, future, time.perf_counter()))
+
+        if len(cls._queue) >= cls._max_size:
+            cls._flush()
+        elif cls._timer is None:
+            cls._timer = loop.call_later(cls._window, cls._flush)
+
+        return await future
+
+    @classmethod
+    def _flush(cls) -> None:
+        """Dispatch the queued requests as one batch."""
+        if cls._timer is not None:
+            cls._timer.cancel()
+            cls._timer = None
+
+        batch, cls._queue = cls._queue[:cls._max_size], cls._queue[cls._max_size:]
+        if cls._queue:
+            cls._timer = asyncio.get_running_loop().call_later(cls._window, cls._flush)
+        if not batch:
+            return
+
+        dispatched_at = time.perf_counter()
+        for request in batch:
+            wait = dispatched_at - request.enqueued_at
+            cls._total_wait += wait
+            cls._max_wait = max(cls._max_wait, wait)
+        cls._batches += 1
+        cls._requests += len(batch)
+        cls._batch_sizes[len(batch)] = cls._batch_sizes.get(len(batch), 0) + 1
+
+        cls._in_flight += len(batch)
+        task = asyncio.ensure_future(cls._run_batch(batch))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._on_batch_done)
+
+    @classmethod
+    def _on_batch_done(cls, task: asyncio.Task) -> None:
+        """Release a finished batch and report an error that escaped it."""
+        cls._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            print(f"Micro-batch error: {type(error).__name__}: {str(error)}")
+
+    @classmethod
+    async def _run_batch(cls, batch: List[PendingRequest]) -> None:
+        """Run a batch on the inference scheduler and resolve each caller's future."""
+        try:
+            results = await InferenceScheduler.run(
+                PredictionService.detect_darts_batch,
+                batch[0].model,
+                [request.image_bytes for request in batch],
+                [request.budget_ms for request in batch]
+            )
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            cls._in_flight -= len(batch)
+
+        for request, result in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result(result)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get micro-batching statistics.
+
+        Returns:
+            Dict with configuration, batch size distribution and queue wait times
+        """
+        return {
+            "enabled": cls.is_enabled(),
+            "window_ms": cls._window * 1000,
+            "max_size": cls._max_size,
+            "capacity": cls._capacity,
+            "queued": len(cls._queue),
+            "in_flight": cls._in_flight,
+            "rejected": cls._rejected,
+            "batches": cls._batches,
+            "requests": cls._requests,
+            "average_batch_size": cls._requests / cls._batches if cls._batches else None,
+            "batch_sizes": dict(sorted(cls._batch_sizes.items())),
+            "average_wait_ms": cls._total_wait / cls._requests * 1000 if cls._requests else None,
+            "max_wait_ms": cls._max_wait * 1000,
+        }
@@ -0,0 +1,176 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Engines that can be selected with the INFERENCE_ENGINE environment variable
+ENGINE_PYTORCH = "pytorch"
+ENGINE_ONNX = "onnx"
+ENGINE_ONNX_INT8 = "onnx_int8"
+
+# Display names of the ONNX Runtime engines
+ONNX_MODEL_NAMES = {
+    ENGINE_ONNX: "YOLO11n-OBB (ONNX Runtime)",
+    ENGINE_ONNX_INT8: "YOLO11n-OBB INT8 (ONNX Runtime)",
+}
+
+
+class ModelRegistry:
+    """
+    Process-wide registry holding the loaded detection model.
+
+    The model is loaded and warmed up once during application startup so that
+    individual requests never pay the cost of importing ultralytics or reading
+    the weights from disk.
+    """
+
+    _model: Optional[Any] = None
+    _engine: Optional[str] = None
+    _model_path: Optional[str] = None
+    _model_version: Optional[str] = None
+    _load_time_ms: Optional[float] = None
+    _warmup_time_ms: Optional[float] = None
+    _error: Optional[str] = None
+
+    @staticmethod
+    def get_engine_config(default_model_path: str) -> Tuple[str, str]:
+        """
+        Get the inference engine configuration from environment variables.
+
+        Args:
+            default_model_path: Path to the PyTorch model weights
+
+        Returns:
+            Tuple containing (engine, model_path)
+
+        Raises:
+            ValueError: If INFERENCE_ENGINE is set to an unknown engine
+        """
+        engine = os.environ.get("INFERENCE_ENGINE", ENGINE_PYTORCH).lower()
+
+        if engine == ENGINE_PYTORCH:
+            return engine, default_model_path
+        if engine == ENGINE_ONNX:
+            return engine, os.environ.get("ONNX_MODEL_PATH", "model/best.onnx")
+        if engine == ENGINE_ONNX_INT8:
+            return engine, os.environ.get("ONNX_INT8_MODEL_PATH", "model/best.int8.onnx")
+
+        raise ValueError(
+            f"Unknown INFERENCE_ENGINE '{engine}'. Use '{ENGINE_PYTORCH}', '{ENGINE_ONNX}' or '{ENGINE_ONNX_INT8}'."
+        )
+
+    @classmethod
+    def load(cls, model_path: str, warmup_size: int) -> bool:
+        """
+        Load the model for the configured engine and run a warm-up inference on a dummy frame.
+
+        Args:
+            model_path: Path to the PyTorch model weights, used by the PyTorch engine
+            warmup_size: Image size used for the warm-up inference
+
+        Returns:
+            bool: True if the model was loaded successfully, False otherwise
+        """
+        try:
+            engine, model_path = cls.get_engine_config(model_path)
+        except ValueError as e:
+            cls._error = str(e)
+            print(cls._error)
+            return False
+
+        abs_model_path = os.path.abspath(model_path)
+        cls._engine = engine
+        cls._model_path = abs_model_path
+
+        if not os.path.exists(abs_model_path):
+            cls._error = f"Model not found at {abs_model_path}"
+            print(cls._error)
+            return False
+
+        try:
+            start = time.perf_counter()
+            model = cls._create_model(engine, abs_model_path)
+            cls._load_time_ms = (time.perf_counter() - start) * 1000
+
+            # The first inference builds the graph and allocates buffers, so run it
+            # now on a blank frame rather than on the first real request
+            start = time.perf_counter()
+            dummy_frame = np.zeros((warmup_size, warmup_size, 3), dtype=np.uint8)
+            model.predict(source=dummy_frame, imgsz=warmup_size, verbose=False)
+            cls._warmup_time_ms = (time.perf_counter() - start) * 1000
+
+            stat = os.stat(abs_model_path)
+            cls._model = model
+            cls._model_version = f"{engine}:{os.path.basename(abs_model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+            cls._error = None
+            print(f"Model loaded with {engine} engine in {cls._load_time_ms:.1f} ms, warm-up took {cls._warmup_time_ms:.1f} ms")
+            return True
+        except Exception as e:
+            cls._model = None
+            cls._error = f"Failed to load model: {type(e).__name__} - {str(e)}"
+            print(cls._error)
+            return False
+
+    @staticmethod
+    def _create_model(engine: str, model_path: str) -> Any:
+        """
+        Instantiate the model for the given engine.
+
+        Args:
+            engine: Name of the inference engine
+            model_path: Absolute path to the model file
+
+        Returns:
+            Model exposing an ultralytics-style `predict` method
+        """
+        # Imports are local so that each image only needs the dependencies of its engine
+        if engine in ONNX_MODEL_NAMES:
+            from services.onnx_engine import OnnxEngine
+            return OnnxEngine(model_path, model_name=ONNX_MODEL_NAMES[engine])
+
+        from ultralytics import YOLO
+        return YOLO(model_path)
+
+    @classmethod
+    def get_model(cls) -> Optional[Any]:
+        """
+        Get the loaded model.
+
+        Returns:
+            The loaded model if available, None otherwise
+        """
+        return cls._model
+
+    @classmethod
+    def get_model_version(cls) -> Optional[str]:
+        """
+        Get a string identifying the loaded model file.
+
+        Returns:
+            Engine, file name, size and modification time of the model, or None if not loaded
+        """
+        return cls._model_version if cls._model is not None else None
+
+    @classmethod
+    def unload(cls) -> None:
+        """Release the loaded model."""
+        cls._model = None
+
+    @classmethod
+    def get_status(cls) -> Dict[str, Any]:
+        """
+        Get the current state of the registry.
+
+        Returns:
+            Dict with the engine, model path, load state, timings and last error
+        """
+        return {
+            "loaded": cls._model is not None,
+            "engine": cls._engine,
+            "model_path": cls._model_path,
+            "model_version": cls._model_version,
+            "load_time_ms": cls._load_time_ms,
+            "warmup_time_ms": cls._warmup_time_ms,
+            "error": cls._error,
+        }
@@ -0,0 +1,120 @@
+from typing import Tuple
+
+import numpy as np
+
+# Offset added to box centres per class so that NMS never suppresses boxes of different classes
+CLASS_OFFSET = 7680
+
+
+def _covariance_matrix(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert rotated boxes to the covariance terms of their Gaussian representation.
+
+    Args:
+        boxes: Array of shape (N, 5) with [x_center, y_center, width, height, angle_radians]
+
+    Returns:
+        Tuple of (a, b, c) arrays of shape (N,)
+    """
+    a = boxes[:, 2] ** 2 / 12
+    b = boxes[:, 3] ** 2 / 12
+    cos = np.cos(boxes[:, 4])
+    sin = np.sin(boxes[:, 4])
+    return a * cos ** 2 + b * sin ** 2, a * sin ** 2 + b * cos ** 2, (a - b) * cos * sin
+
+
+def probiou(boxes1: np.ndarray, boxes2: np.ndarray, eps: float = 1e-7) -> np.ndarray:
+    """
+    Pairwise probabilistic IoU between two sets of rotated boxes.
+
+    This matches the metric ultralytics uses for OBB NMS, so results from the ONNX
+    engine line up with the PyTorch path.
+
+    Args:
+        boxes1: Array of shape (N, 5) with [x_center, y_center, width, height, angle_radians]
+        boxes2: Array of shape (M, 5) with [x_center, y_center, width, height, angle_radians]
+        eps: Small value to avoid division by zero
+
+    Returns:
+        Array of shape (N, M) with IoU values in [0, 1]
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64)
+    boxes2 = np.asarray(boxes2, dtype=np.float64)
+
+    x1, y1 = boxes1[:, 0:1], boxes1[:, 1:2]
+    x2, y2 = boxes2[None, :, 0], boxes2[None, :, 1]
+    a1, b1, c1 = (v[:, None] for v in _covariance_matrix(boxes1))
+    a2, b2, c2 = (v[None, :] for v in _covariance_matrix(boxes2))
+
+    denominator = (a1 + a2) * (b1 + b2) - (c1 + c2) ** 2 + eps
+    t1 = (((a1 + a2) * (y1 - y2) ** 2 + (b1 + b2) * (x1 - x2) ** 2) / denominator) * 0.25
+    t2 = (((c1 + c2) * (x2 - x1) * (y1 - y2)) / denominator) * 0.5
+    t3 = np.log(
+        ((a1 + a2) * (b1 + b2) - (c1 + c2) ** 2)
+        / (4 * np.sqrt(np.clip(a1 * b1 - c1 ** 2, 0, None) * np.clip(a2 * b2 - c2 ** 2, 0, None)) + eps)
+        + eps
+    ) * 0.5
+    bhattacharyya = np.clip(t1 + t2 + t3, eps, 100.0)
+    hellinger = np.sqrt(1.0 - np.exp(-bhattacharyya) + eps)
+    return 1 - hellinger
+
+
+def nms_rotated(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Non-maximum suppression for rotated boxes.
+
+    Args:
+        boxes: Array of shape (N, 5) with [x_center, y_center, width, height, angle_radians]
+        scores: Array of shape (N,) with confidence scores
+        iou_threshold: Boxes overlapping a higher scoring box by more than this are dropped
+
+    Returns:
+        Indices of the kept boxes, sorted by descending score
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    order = np.argsort(-scores, kind="stable")
+    ious = np.triu(probiou(boxes[order], boxes[order]), k=1)
+    keep = np.nonzero(ious.max(axis=0) < iou_threshold)[0]
+    return order[keep]
+
+
+def regularize_rboxes(boxes: np.ndarray) -> np.ndarray:
+    """
+    Normalize rotated boxes so that width is the long side and the angle is in [0, pi).
+
+    Args:
+        boxes: Array of shape (N, 5) with [x_center, y_center, width, height, angle_radians]
+
+    Returns:
+        New array with the regularized boxes
+    """
+    x, y, w, h, angle = (boxes[:, i] for i in range(5))
+    swap = w <= h
+    long_side = np.where(swap, h, w)
+    short_side = np.where(swap, w, h)
+    angle = (angle + np.where(swap, np.pi / 2, 0.0)) % np.pi
+    return np.stack([x, y, long_side, short_side, angle], axis=-1)
+
+
+def xywhr_to_corners(centers: np.ndarray, sizes: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    Compute the corners of rotated boxes.
+
+    Args:
+        centers: Array of shape (N, 2) with box centres
+        sizes: Array of shape (N, 2) with box widths and heights
+        angles: Array of shape (N,) with rotations in radians
+
+    Returns:
+        Array of shape (N, 4, 2) with the top-left, top-right, bottom-right and
+        bottom-left corners of each box before rotation
+    """
+    half_sizes = np.asarray(sizes, dtype=np.float64)[:, None, :] / 2
+    local = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64) * half_sizes
+    cos = np.cos(angles)[:, None]
+    sin = np.sin(angles)[:, None]
+    x = local[..., 0] * cos - local[..., 1] * sin
+    y = local[..., 0] * sin + local[..., 1] * cos
+    return np.stack([x, y], axis=-1) + np.asarray(centers, dtype=np.float64)[:, None, :]
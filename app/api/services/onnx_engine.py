@@ -0,0 +1,216 @@
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from services.obb_utils import CLASS_OFFSET, nms_rotated, regularize_rboxes
+
+# Padding colour used by ultralytics when letterboxing
+LETTERBOX_COLOR = (114, 114, 114)
+# Maximum number of candidate boxes passed to NMS
+MAX_NMS_CANDIDATES = 30000
+
+
+class OnnxObb:
+    """Oriented boxes of a single image, laid out like ultralytics `Results.obb`"""
+
+    def __init__(self, data: np.ndarray):
+        # Columns: x_center, y_center, width, height, angle (radians), confidence, class_id
+        self.data = data
+
+
+class OnnxResult:
+    """Detection result of a single image, laid out like an ultralytics `Results` object"""
+
+    def __init__(self, data: np.ndarray, speed: Dict[str, float]):
+        self.obb = OnnxObb(data)
+        self.boxes = None
+        self.speed = speed
+
+
+class OnnxEngine:
+    """
+    Runs an exported YOLO OBB model with ONNX Runtime on the CPU.
+
+    `predict` mirrors the parts of the ultralytics `YOLO.predict` signature used by
+    `PredictionService`, so both engines can be driven by the same code.
+    """
+
+    model_name = "YOLO11n-OBB (ONNX Runtime)"
+
+    def __init__(self, model_path: str, model_name: Optional[str] = None):
+        """
+        Create an inference session for the given model.
+
+        Args:
+            model_path: Path to the exported or quantized ONNX model
+            model_name: Name reported in responses, defaults to the class `model_name`
+        """
+        # Import here so the PyTorch image does not require onnxruntime
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        intra_op_threads = int(os.environ.get("ONNX_INTRA_OP_THREADS", "0"))
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.model_path = model_path
+        if model_name is not None:
+            self.model_name = model_name
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Exported models usually have a fixed input size, which then takes precedence over imgsz
+        height, width = model_input.shape[2], model_input.shape[3]
+        self.input_size: Optional[Tuple[int, int]] = (
+            (height, width) if isinstance(height, int) and isinstance(width, int) else None
+        )
+
+    def predict(
+        self,
+        source: Union[Image.Image, np.ndarray, List[Union[Image.Image, np.ndarray]]],
+        conf: float = 0.25,
+        iou: float = 0.7,
+        imgsz: int = 640,
+        max_det: int = 300,
+        augment: bool = False,
+        verbose: bool = False,
+    ) -> List[OnnxResult]:
+        """
+        Run inference on one or more images.
+
+        Test-time augmentation is not available for ONNX models, so `augment` is accepted
+        for compatibility and ignored.
+
+        Args:
+            source: PIL image, BGR array (ultralytics convention) or a list of either
+            conf: Minimum confidence of returned detections
+            iou: IoU threshold used by NMS
+            imgsz: Input size used when the model has a dynamic input shape
+            max_det: Maximum number of detections per image
+            augment: Ignored
+            verbose: Ignored
+
+        Returns:
+            List with one result per input image
+        """
+        sources = source if isinstance(source, list) else [source]
+        return [self._predict_one(image, conf, iou, imgsz, max_det) for image in sources]
+
+    def _predict_one(
+        self,
+        image: Union[Image.Image, np.ndarray],
+        conf: float,
+        iou: float,
+        imgsz: int,
+        max_det: int,
+    ) -> OnnxResult:
+        """Run preprocessing, inference and post-processing for a single image."""
+        start = time.perf_counter()
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image[..., ::-1])
+        input_size = self.input_size or (imgsz, imgsz)
+        tensor, ratio, pad = self._letterbox(image, input_size)
+        preprocess_end = time.perf_counter()
+
+        output = self.session.run(None, {self.input_name: tensor})[0]
+        inference_end = time.perf_counter()
+
+        data = self._postprocess(output[0], conf, iou, max_det, ratio, pad, image.size)
+        postprocess_end = time.perf_counter()
+
+        speed = {
+            "preprocess": (preprocess_end - start) * 1000,
+            "inference": (inference_end - preprocess_end) * 1000,
+            "postprocess": (postprocess_end - inference_end) * 1000,
+        }
+        return OnnxResult(data, speed)
+
+    @staticmethod
+    def _letterbox(image: Image.Image, input_size: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+        """
+        Resize an image keeping its aspect ratio and pad it to the model input size.
+
+        Args:
+            image: Image to preprocess
+            input_size: Model input size as (height, width)
+
+        Returns:
+            Tuple of (NCHW float32 tensor, resize ratio, (pad_x, pad_y))
+        """
+        input_height, input_width = input_size
+        width, height = image.size
+        ratio = min(input_height / height, input_width / width)
+        new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+        pad_x = (input_width - new_width) / 2
+        pad_y = (input_height - new_height) / 2
+
+        resized = image.convert("RGB").resize((new_width, new_height), Image.BILINEAR)
+        canvas = Image.new("RGB", (input_width, input_height), LETTERBOX_COLOR)
+        canvas.paste(resized, (int(round(pad_x - 0.1)), int(round(pad_y - 0.1))))
+
+        tensor = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1)[None] / 255.0
+        return np.ascontiguousarray(tensor), ratio, (pad_x, pad_y)
+
+    @staticmethod
+    def _postprocess(
+        output: np.ndarray,
+        conf: float,
+        iou: float,
+        max_det: int,
+        ratio: float,
+        pad: Tuple[float, float],
+        image_size: Tuple[int, int],
+    ) -> np.ndarray:
+        """
+        Decode raw OBB model output into boxes in original image coordinates.
+
+        Args:
+            output: Raw output of shape (4 + num_classes + 1, num_anchors) with
+                [x, y, w, h, class scores..., angle] per anchor
+            conf: Minimum confidence of returned detections
+            iou: IoU threshold used by NMS
+            max_det: Maximum number of detections
+            ratio: Resize ratio used by the letterbox
+            pad: Padding (pad_x, pad_y) added by the letterbox
+            image_size: Original image size as (width, height)
+
+        Returns:
+            Array of shape (N, 7) with [x, y, w, h, angle, confidence, class_id]
+        """
+        predictions = output.T
+        class_scores = predictions[:, 4:-1]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_scores)), class_ids]
+
+        candidates = confidences > conf
+        if not candidates.any():
+            return np.zeros((0, 7), dtype=np.float32)
+
+        boxes = np.concatenate([predictions[candidates, :4], predictions[candidates, -1:]], axis=1)
+        confidences = confidences[candidates]
+        class_ids = class_ids[candidates]
+
+        if len(confidences) > MAX_NMS_CANDIDATES:
+            top = np.argsort(-confidences)[:MAX_NMS_CANDIDATES]
+            boxes, confidences, class_ids = boxes[top], confidences[top], class_ids[top]
+
+        offset_boxes = boxes.copy()
+        offset_boxes[:, :2] += class_ids[:, None] * CLASS_OFFSET
+        keep = nms_rotated(offset_boxes, confidences, iou)[:max_det]
+        boxes = regularize_rboxes(boxes[keep])
+
+        # Undo the letterbox so coordinates refer to the original image
+        boxes[:, 0] = (boxes[:, 0] - pad[0]) / ratio
+        boxes[:, 1] = (boxes[:, 1] - pad[1]) / ratio
+        boxes[:, 2:4] /= ratio
+        boxes[:, 0] = boxes[:, 0].clip(0, image_size[0])
+        boxes[:, 1] = boxes[:, 1].clip(0, image_size[1])
+
+        return np.concatenate(
+            [boxes, confidences[keep, None], class_ids[keep, None].astype(boxes.dtype)], axis=1
+        ).astype(np.float32)
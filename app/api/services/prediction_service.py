@@ -1,228 +1,586 @@
-import io
-from typing import Dict, List, Union, TypedDict
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union, TypedDict
 
+import numpy as np
 from PIL import Image
 
-from models.detection import DetectionResponse, ModelInfo, DartDetection, BoundingBox
+from models.detection import DetectionResponse, ModelInfo, DartDetection, DartScore, BoundingBox, Point
+from services.board_locator import BoardLocator
+from services.calibration_service import CalibrationService
+from services.change_detector import ChangeDetector, ChangeMap
+from services.dart_tracker import DartTracker
+from services.homography_service import HomographyService
+from services.image_decoder import ImageDecoder, ImageSource
+from services.inference_policy import ESCALATION_TIERS, TIER_FAST, TIER_HIGH_RES, TIER_REGION, InferencePolicy
+from services.metrics import Metrics
+from services.obb_utils import probiou, xywhr_to_corners
+from services.scoring_service import RING_NAMES, ScoringService
 
 # Constants
 IMG_SIZE = 2176  # Based on the model's expected input size
 CONFIDENCE_THRESHOLD = 0.2  # Production-level confidence threshold
+PYTORCH_MODEL_NAME = "YOLO11n-OBB (PyTorch)"
+MODEL_STRIDE = 32  # Model input sizes must be a multiple of the network stride
+REGION_MARGIN = 0.25  # Margin around the changed region that is re-inspected, as a proportion of its size
+DUPLICATE_IOU = 0.5  # Overlap above which a re-inspected detection duplicates an existing one
 
 # Define types for internal use
 class DetectionError(TypedDict):
     """Error response from detection service"""
     error: str
 
-class DartDetectionData(TypedDict):
-    """Internal representation of a dart detection"""
-    x_center: float
-    y_center: float
-    width: float
-    height: float
-    angle: float
-    confidence: float
-    class_id: int
-    detection_index: int
-    corners: List[List[float]]
-    bbox: Dict[str, float]
-
 class PredictionService:
     @staticmethod
-    def detect_darts_pt(model_path: str, image_bytes: bytes) -> Union[DetectionResponse, DetectionError]:
+    def get_roi_config() -> Dict[str, Any]:
         """
-        Run dart detection using the PyTorch model
+        Get board ROI cropping configuration from environment variables.
+
+        Returns:
+            Dict with whether cropping is enabled, the margin around the board as a
+            proportion of its radius and the inference size (0 = derived from the crop)
         """
-        try:
-            # Import necessary libraries here to avoid dependency issues
-            from ultralytics import YOLO
+        return {
+            "enabled": os.environ.get("ROI_CROP_ENABLED", "false").lower() in ("1", "true", "yes"),
+            "margin": float(os.environ.get("ROI_MARGIN", "0.75")),
+            "img_size": int(os.environ.get("ROI_IMG_SIZE", "0")),
+        }
 
-            # Load the PT model
-            model = YOLO(model_path)
+    @staticmethod
+    def get_settings_key() -> Tuple[Any, ...]:
+        """
+        Get the settings that affect detection results, for use in cache keys.
 
-            # Preprocess image
-            img = Image.open(io.BytesIO(image_bytes))
-            original_size = img.size
+        Returns:
+            Tuple with the thresholds, input size, ROI configuration, calibration and homography version
+        """
+        calibration = CalibrationService.get_calibration()
+        return (
+            CONFIDENCE_THRESHOLD,
+            IMG_SIZE,
+            tuple(PredictionService.get_roi_config().items()),
+            tuple(calibration.model_dump().items()),
+            HomographyService.get_version(),
+        )
 
-            # Run inference with the PT model
-            results = model.predict(
-                source=img,
-                conf=CONFIDENCE_THRESHOLD,
-                verbose=False,
-                augment=False,      # No augmentation for inference
-                imgsz=IMG_SIZE,     # Use the same image size as training
-                iou=0.1,            # Lower IoU threshold to detect more objects
-                max_det=100         # Increase max detections
-            )
+    @staticmethod
+    def detect_darts(
+        model: Any,
+        image: ImageSource,
+        budget_ms: Optional[float] = None
+    ) -> Union[DetectionResponse, DetectionError]:
+        """
+        Run dart detection using the loaded model
 
-            # If no results, try a more lenient approach
-            if not results or (len(results) > 0 and not hasattr(results[0], 'obb') and
-                              (not hasattr(results[0], 'boxes') or results[0].boxes is None)):
-                results = model.predict(
-                    source=img,
-                    conf=0.001,     # Much lower confidence threshold
-                    verbose=False,
-                    augment=True,   # Try with augmentation
-                    imgsz=IMG_SIZE
-                )
+        Works with both the ultralytics PyTorch model and the ONNX Runtime engine,
+        which returns results in the same layout. Frames without detections are
+        re-run with more expensive tiers while the latency budget allows. When the
+        board changed but no detection explains the change, only the changed region
+        is re-inspected at a higher resolution. Detections are then matched to the
+        darts of previous frames.
 
-            # Process the results
-            filtered_detections = []
-            detection_index = 1
-
-            # Extract detection results
-            if len(results) > 0:
-                result = results[0]  # Get the first (and only) result
-
-                # Process results
-
-                # For oriented bounding boxes, get the data
-                if hasattr(result, 'obb') and result.obb is not None:
-                    boxes = result.obb.data
-                    # Make sure we have boxes to process
-                    if boxes is not None and len(boxes) > 0:
-                        for i, box in enumerate(boxes):
-                            # Extract values from box tensor
-                            if len(box) >= 6:  # x, y, w, h, angle, conf
-                                x_center = float(box[0])
-                                y_center = float(box[1])
-                                width = float(box[2])
-                                height = float(box[3])
-                                angle = float(box[4])
-                                confidence = float(box[5])
-                                # Safely get class_id
-                                class_id = 0
-                                if hasattr(result, 'boxes') and result.boxes is not None and hasattr(result.boxes, 'cls'):
-                                    class_id = int(result.boxes.cls[i]) if i < len(result.boxes.cls) else 0
-
-
-                            # Calculate corners
-                            import math
-                            corners = []
-                            cos_angle = math.cos(math.radians(angle))
-                            sin_angle = math.sin(math.radians(angle))
-
-                            points = [
-                                [-width/2, -height/2],  # top-left
-                                [width/2, -height/2],   # top-right
-                                [width/2, height/2],    # bottom-right
-                                [-width/2, height/2]    # bottom-left
-                            ]
-
-                            for px, py in points:
-                                rx = px * cos_angle - py * sin_angle + x_center
-                                ry = px * sin_angle + py * cos_angle + y_center
-                                corners.append([float(rx), float(ry)])
-
-                            # Add to filtered detections
-                            detection_data = {
-                                "x_center": float(x_center),
-                                "y_center": float(y_center),
-                                "width": float(width),
-                                "height": float(height),
-                                "angle": float(angle),
-                                "confidence": float(confidence),
-                                "class_id": class_id,
-                                "detection_index": detection_index,
-                                "corners": corners,
-                                "bbox": {
-                                    "x1": float(x_center - width/2),
-                                    "y1": float(y_center - height/2),
-                                    "x2": float(x_center + width/2),
-                                    "y2": float(y_center + height/2)
-                                }
-                            }
-                            filtered_detections.append(detection_data)
-                            detection_index += 1
-                elif hasattr(result, 'boxes') and result.boxes is not None and hasattr(result.boxes, 'data'):
-                    # For standard bounding boxes
-                    boxes = result.boxes.data
-                    # Make sure we have boxes to process
-                    if boxes is not None and len(boxes) > 0:
-                        for i, box in enumerate(boxes):
-                            if len(box) >= 6:  # xyxy, conf, cls
-                                x1, y1, x2, y2 = float(box[0]), float(box[1]), float(box[2]), float(box[3])
-                                confidence = float(box[4])
-                                class_id = int(box[5])
-
-                                # Convert from xyxy to xywh format
-                                x_center = (x1 + x2) / 2
-                                y_center = (y1 + y2) / 2
-                                width = x2 - x1
-                                height = y2 - y1
-                                angle = 0  # no angle for standard boxes
-
-
-                                # Add to filtered detections with simpler corners (no rotation)
-                                corners = [
-                                    [x1, y1],  # top-left
-                                    [x2, y1],  # top-right
-                                    [x2, y2],  # bottom-right
-                                    [x1, y2]   # bottom-left
-                                ]
-
-                                detection_data = {
-                                    "x_center": float(x_center),
-                                    "y_center": float(y_center),
-                                    "width": float(width),
-                                    "height": float(height),
-                                    "angle": float(angle),
-                                    "confidence": float(confidence),
-                                    "class_id": class_id,
-                                    "detection_index": detection_index,
-                                    "corners": corners,
-                                    "bbox": {
-                                        "x1": float(x1),
-                                        "y1": float(y1),
-                                        "x2": float(x2),
-                                        "y2": float(y2)
-                                    }
-                                }
-                                filtered_detections.append(detection_data)
-                                detection_index += 1
-
-
-            # Sort detections by confidence (highest first)
-            sorted_detections = sorted(filtered_detections, key=lambda x: x["confidence"], reverse=True)
-
-            # Create the same response format
-            bbox_objects = []
-            dart_detections = []
-
-            for det in sorted_detections:
-                bbox = BoundingBox(
-                    x1=det["bbox"]["x1"],
-                    y1=det["bbox"]["y1"],
-                    x2=det["bbox"]["x2"],
-                    y2=det["bbox"]["y2"]
-                )
+        Args:
+            model: Loaded model from the model registry
+            image: Raw bytes of the uploaded image, or a decoded frame
+            budget_ms: Latency budget in milliseconds, or None for the server default
+        """
+        try:
+            start = time.perf_counter()
 
-                dart = DartDetection(
-                    x_center=det["x_center"],
-                    y_center=det["y_center"],
-                    width=det["width"],
-                    height=det["height"],
-                    angle=det["angle"],
-                    confidence=det["confidence"],
-                    class_id=det["class_id"],
-                    detection_index=det["detection_index"],
-                    corners=det["corners"],
-                    bbox=bbox
-                )
-                dart_detections.append(dart)
+            # Only the header is read here, pixels are decoded by _prepare_image
+            img = ImageDecoder.open(image)
+            original_size = img.size
+
+            # Reuse the last response when the board has not changed
+            change_key = PredictionService._change_key(model, original_size)
+            cached, thumbnail = ChangeDetector.check(image, change_key)
+            if cached is not None:
+                Metrics.count("cache_hits", "unchanged")
+                return cached
+            changes = ChangeDetector.get_changes(thumbnail, change_key, original_size)
 
-            model_info = ModelInfo(
-                model="YOLO11n-OBB (PyTorch)",
-                image_size=IMG_SIZE,
-                original_size=list(original_size)
+            # Follow board and camera movement before the frame is cropped and scored
+            BoardLocator.check(image)
+            HomographyService.validate(image)
+
+            img, transform, image_size = PredictionService._prepare_image(img)
+            results = PredictionService._predict(model, img, image_size)
+            InferencePolicy.record_cost(TIER_FAST, (time.perf_counter() - start) * 1000)
+            PredictionService._record_speed(results)
+
+            results, transform, image_size, tier = PredictionService._escalate(
+                model, image, img, results, transform, image_size, start,
+                InferencePolicy.resolve_budget(budget_ms)
             )
 
-            # Even if no darts are detected, return a valid response
-            return DetectionResponse(
-                detections=dart_detections,
-                model_info=model_info,
-                darts_count=len(dart_detections)
+            response = PredictionService._build_response(model, results, original_size, image_size, transform, tier)
+            response = PredictionService._reinspect(
+                model, image, response, changes, start, InferencePolicy.resolve_budget(budget_ms)
             )
+            DartTracker.update(response, changes)
+            ChangeDetector.store(thumbnail, change_key, response)
+            PredictionService._record_detection(response)
+            return response
 
         except Exception as e:
-            return DetectionError(error=f"PyTorch model detection error: {type(e).__name__} - {str(e)}")
+            Metrics.count("errors", "detection")
+            return DetectionError(error=f"Model detection error: {type(e).__name__} - {str(e)}")
+
+    @staticmethod
+    def detect_darts_batch(
+        model: Any,
+        images: List[bytes],
+        budgets_ms: Optional[List[Optional[float]]] = None
+    ) -> List[Union[DetectionResponse, DetectionError]]:
+        """
+        Run dart detection on several images with a single batched forward pass
+
+        Images that fail to decode or process get their own error without
+        affecting the rest of the batch. Escalation to more expensive tiers
+        happens per image, counting the batch time against each budget.
+
+        Args:
+            model: Loaded model from the model registry
+            images: Raw bytes of each image
+            budgets_ms: Latency budget of each image, None entries use the server default
+
+        Returns:
+            One response or error per image, in the same order as the input
+        """
+        start = time.perf_counter()
+        budgets_ms = budgets_ms or [None] * len(images)
+        outputs: List[Union[DetectionResponse, DetectionError, None]] = [None] * len(images)
+        loaded = []
+
+        for index, image_bytes in enumerate(images):
+            try:
+                img = ImageDecoder.open(image_bytes)
+                original_size = img.size
+                change_key = PredictionService._change_key(model, original_size)
+                cached, thumbnail = ChangeDetector.check(image_bytes, change_key)
+                if cached is not None:
+                    Metrics.count("cache_hits", "unchanged")
+                    outputs[index] = cached
+                    continue
+                changes = ChangeDetector.get_changes(thumbnail, change_key, original_size)
+
+                BoardLocator.check(image_bytes)
+                HomographyService.validate(image_bytes)
+                img, transform, image_size = PredictionService._prepare_image(img)
+                loaded.append((index, img, original_size, image_size, transform, change_key, thumbnail, changes))
+            except Exception as e:
+                Metrics.count("errors", "detection")
+                outputs[index] = DetectionError(error=f"Model detection error: {type(e).__name__} - {str(e)}")
+
+        if loaded:
+            # A batch shares one input size, so use the largest one requested
+            batch_image_size = max(item[3] for item in loaded)
+            try:
+                batch_results = PredictionService._predict(model, [item[1] for item in loaded], batch_image_size)
+                InferencePolicy.record_cost(TIER_FAST, (time.perf_counter() - start) * 1000 / len(loaded))
+                PredictionService._record_speed(batch_results)
+            except Exception as e:
+                Metrics.count("errors", "detection", len(loaded))
+                for index, *_ in loaded:
+                    outputs[index] = DetectionError(error=f"Model detection error: {type(e).__name__} - {str(e)}")
+                return outputs
+
+            for (index, img, original_size, _, transform, change_key, thumbnail, changes), result in zip(loaded, batch_results):
+                try:
+                    budget_ms = InferencePolicy.resolve_budget(budgets_ms[index])
+                    results, item_transform, image_size, tier = PredictionService._escalate(
+                        model, images[index], img, [result], transform, batch_image_size, start, budget_ms
+                    )
+                    outputs[index] = PredictionService._reinspect(
+                        model, images[index],
+                        PredictionService._build_response(model, results, original_size, image_size, item_transform, tier),
+                        changes, start, budget_ms
+                    )
+                    DartTracker.update(outputs[index], changes)
+                    ChangeDetector.store(thumbnail, change_key, outputs[index])
+                    PredictionService._record_detection(outputs[index])
+                except Exception as e:
+                    Metrics.count("errors", "detection")
+                    outputs[index] = DetectionError(error=f"Model detection error: {type(e).__name__} - {str(e)}")
+
+        return outputs
+
+    @staticmethod
+    def _change_key(model: Any, original_size: Tuple[int, int]) -> Tuple[Any, ...]:
+        """Values that must match for the change detector to reuse a response"""
+        return (id(model), original_size, CalibrationService.get_calibration(), HomographyService.get_version())
+
+    @staticmethod
+    def _prepare_image(
+        img: Image.Image,
+        size_factor: float = 1.0
+    ) -> Tuple[Image.Image, Tuple[float, float, float, float], int]:
+        """
+        Decode the image at the resolution the model needs, cropped to the dartboard
+        when ROI cropping is enabled
+
+        The crop is a square around the calibrated board plus a margin. It is inferred
+        at a size that keeps darts at the same scale as full-frame inference at IMG_SIZE.
+        JPEG frames are decoded at the smallest DCT scale that still covers that size.
+        `size_factor` enlarges the inference size, e.g. for the high resolution tier.
+
+        Returns:
+            Tuple of (model input image, transform (scale_x, scale_y, offset_x, offset_y)
+            from model input pixels to frame pixels, inference size)
+        """
+        roi_config = PredictionService.get_roi_config()
+        box = None
+        image_size = IMG_SIZE
+        if roi_config["enabled"]:
+            # None when the board is outside the frame, so the calibration does not match this camera
+            box = CalibrationService.get_board_box(img.size, roi_config["margin"])
+
+        region_size = max(box[2] - box[0], box[3] - box[1]) if box is not None else max(img.size)
+        if box is not None:
+            image_size = roi_config["img_size"] or (
+                math.ceil(region_size * IMG_SIZE / max(img.size) / MODEL_STRIDE) * MODEL_STRIDE
+            )
+
+        if size_factor != 1.0:
+            image_size = math.ceil(image_size * size_factor / MODEL_STRIDE) * MODEL_STRIDE
+
+        decode_start = time.perf_counter()
+        decoded, transform = ImageDecoder.decode(img, image_size / region_size, box)
+        # Decode now rather than when the model first reads the pixels, so it is timed as its own stage
+        decoded.load()
+        Metrics.observe_since("decode", decode_start)
+        return decoded, transform, image_size
+
+    @staticmethod
+    def _predict(model: Any, source: Union[Image.Image, List[Image.Image]], image_size: int) -> List[Any]:
+        """Run the production inference pass on one image or a batch of images"""
+        return model.predict(
+            source=source,
+            conf=CONFIDENCE_THRESHOLD,
+            verbose=False,
+            augment=False,      # No augmentation for inference
+            imgsz=image_size,   # Same scale as training (full frame at IMG_SIZE)
+            iou=0.1,            # Lower IoU threshold to detect more objects
+            max_det=100         # Increase max detections
+        )
+
+    @staticmethod
+    def _record_speed(results: List[Any]) -> None:
+        """Record the preprocess, forward pass and NMS times the model reports for each image"""
+        for result in results:
+            speed = getattr(result, "speed", None) or {}
+            for stage, key in (("preprocess", "preprocess"), ("forward", "inference"), ("nms", "postprocess")):
+                if speed.get(key) is not None:
+                    Metrics.observe(stage, speed[key] / 1000)
+
+    @staticmethod
+    def _record_detection(response: DetectionResponse) -> None:
+        """Count a detected frame and its darts by the tier that produced the answer"""
+        Metrics.count("detections", response.inference_tier)
+        Metrics.count("darts", response.inference_tier, response.darts_count)
+
+    @staticmethod
+    def _count_boxes(results: List[Any]) -> int:
+        """Count the boxes of the first result without decoding them"""
+        if not results:
+            return 0
+        result = results[0]
+        if getattr(result, 'obb', None) is not None:
+            data = result.obb.data
+        elif getattr(result, 'boxes', None) is not None:
+            data = getattr(result.boxes, 'data', None)
+        else:
+            return 0
+        return 0 if data is None else len(data)
+
+    @staticmethod
+    def _escalate(
+        model: Any,
+        image: ImageSource,
+        img: Image.Image,
+        results: List[Any],
+        transform: Tuple[float, float, float, float],
+        image_size: int,
+        start: float,
+        budget_ms: float
+    ) -> Tuple[List[Any], Tuple[float, float, float, float], int, str]:
+        """
+        Re-run a frame without detections with more expensive tiers while the budget allows
+
+        Each tier only runs if its estimated cost fits in what is left of the budget,
+        so frames of an empty board stay on the fast tier unless the client asks for more.
+
+        Returns:
+            Tuple of (results, transform, inference size, tier that produced the results)
+        """
+        tier = TIER_FAST
+        tier_results, tier_transform, tier_size = results, transform, image_size
+
+        for next_tier in ESCALATION_TIERS:
+            if PredictionService._count_boxes(tier_results) > 0:
+                break
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if not InferencePolicy.can_escalate(next_tier, elapsed_ms, budget_ms):
+                continue
+
+            tier_start = time.perf_counter()
+            if next_tier == TIER_HIGH_RES:
+                # Decode again so the larger input is not just an upscaled reduced decode
+                high_res_scale = InferencePolicy.get_policy_config()["high_res_scale"]
+                high_res_img, tier_transform, tier_size = PredictionService._prepare_image(
+                    ImageDecoder.open(image), high_res_scale
+                )
+                tier_results = PredictionService._predict(model, high_res_img, tier_size)
+            else:
+                tier_transform, tier_size = transform, image_size
+                tier_results = PredictionService._predict_fallback(model, img, image_size)
+            InferencePolicy.record_cost(next_tier, (time.perf_counter() - tier_start) * 1000)
+            Metrics.observe_since("fallback", tier_start)
+            Metrics.count("fallbacks", next_tier)
+            tier = next_tier
+
+        InferencePolicy.record_answer(tier)
+        return tier_results, tier_transform, tier_size, tier
+
+    @staticmethod
+    def _reinspect(
+        model: Any,
+        image: ImageSource,
+        response: DetectionResponse,
+        changes: Optional[ChangeMap],
+        start: float,
+        budget_ms: float
+    ) -> DetectionResponse:
+        """
+        Re-inspect the changed region of the board when no detection lies in it
+
+        A new dart that the full frame pass missed can only be where the frame changed,
+        so only that region is decoded and inferred, at the scale of the high resolution
+        tier. Detections found there are added unless they duplicate an existing one.
+
+        Returns:
+            The response, with the detections of the changed region merged in
+        """
+        if changes is None or not InferencePolicy.can_escalate(TIER_REGION, (time.perf_counter() - start) * 1000, budget_ms):
+            return response
+        box = changes.bounding_box(REGION_MARGIN)
+        if box is None:
+            return response
+        centers = np.array([[d.x_center, d.y_center] for d in response.detections]).reshape(-1, 2)
+        if changes.contains(centers).any():
+            return response
+
+        region_start = time.perf_counter()
+        img = ImageDecoder.open(image)
+        region_size = max(box[2] - box[0], box[3] - box[1])
+        high_res_scale = InferencePolicy.get_policy_config()["high_res_scale"]
+        image_size = max(
+            MODEL_STRIDE,
+            math.ceil(region_size * IMG_SIZE / max(img.size) * high_res_scale / MODEL_STRIDE) * MODEL_STRIDE
+        )
+        region_img, transform = ImageDecoder.decode(img, image_size / region_size, box)
+        results = PredictionService._predict(model, region_img, image_size)
+        InferencePolicy.record_cost(TIER_REGION, (time.perf_counter() - region_start) * 1000)
+        Metrics.observe_since("fallback", region_start)
+        Metrics.count("fallbacks", TIER_REGION)
+
+        region = PredictionService._build_response(model, results, img.size, image_size, transform, TIER_REGION)
+        found = [
+            d for d in region.detections
+            if changes.contains(np.array([[d.x_center, d.y_center]]))[0]
+        ]
+        if found and response.detections:
+            boxes = np.array([[d.x_center, d.y_center, d.width, d.height, math.radians(d.angle)] for d in found])
+            existing = np.array([
+                [d.x_center, d.y_center, d.width, d.height, math.radians(d.angle)] for d in response.detections
+            ])
+            duplicates = (probiou(boxes, existing) > DUPLICATE_IOU).any(axis=1)
+            found = [d for d, duplicate in zip(found, duplicates) if not duplicate]
+        if not found:
+            return response
+
+        detections = sorted(response.detections + found, key=lambda d: -d.confidence)
+        for i, detection in enumerate(detections):
+            detection.detection_index = i + 1
+        return response.model_copy(update={
+            "detections": detections,
+            "darts_count": len(detections),
+            "inference_tier": TIER_REGION,
+        })
+
+    @staticmethod
+    def _predict_fallback(model: Any, img: Image.Image, image_size: int) -> List[Any]:
+        """Run the lenient test-time augmentation pass used by the TTA tier"""
+        return model.predict(
+            source=img,
+            conf=0.001,     # Much lower confidence threshold
+            verbose=False,
+            augment=True,   # Try with augmentation
+            imgsz=image_size
+        )
+
+    @staticmethod
+    def _build_response(
+        model: Any,
+        results: List[Any],
+        original_size: Tuple[int, int],
+        image_size: int,
+        transform: Tuple[float, float, float, float],
+        tier: str
+    ) -> DetectionResponse:
+        """
+        Convert the raw results of a single image into a DetectionResponse
+
+        Coordinates are mapped through the decode transform so they refer to the full frame,
+        where each dart is scored against the calibrated board.
+        """
+        start = time.perf_counter()
+        decoded = PredictionService._decode_result(results[0]) if len(results) > 0 else None
+
+        dart_detections = []
+        if decoded is not None:
+            scale_x, scale_y, offset_x, offset_y = transform
+            scale = np.array([scale_x, scale_y])
+            offset = np.array([offset_x, offset_y])
+            decoded["centers"] = decoded["centers"] * scale + offset
+            decoded["sizes"] = decoded["sizes"] * scale
+            decoded["corners"] = decoded["corners"] * scale + offset
+            decoded["bboxes"] = decoded["bboxes"] * np.tile(scale, 2) + np.tile(offset, 2)
+
+            # Sort detections by confidence (highest first), keeping model order for ties
+            order = np.argsort(-decoded["confidences"], kind="stable")
+
+            # Convert to Python lists in bulk, then build the response objects once.
+            # Values come straight from the model, so validation is skipped.
+            centers = decoded["centers"][order].tolist()
+            sizes = decoded["sizes"][order].tolist()
+            angles = decoded["angles"][order].tolist()
+            confidences = decoded["confidences"][order].tolist()
+            class_ids = decoded["class_ids"][order].tolist()
+            corners = decoded["corners"][order].tolist()
+            bboxes = decoded["bboxes"][order].tolist()
+            detection_indices = (order + 1).tolist()
+
+            scores = ScoringService.score(decoded["centers"][order], decoded["sizes"][order], decoded["angles"][order])
+            tips = scores["tips"].tolist()
+            segments = scores["segments"].tolist()
+            rings = scores["rings"].tolist()
+            points = scores["points"].tolist()
+
+            for i in range(len(order)):
+                x1, y1, x2, y2 = bboxes[i]
+                dart_detections.append(DartDetection.model_construct(
+                    x_center=centers[i][0],
+                    y_center=centers[i][1],
+                    width=sizes[i][0],
+                    height=sizes[i][1],
+                    angle=angles[i],
+                    confidence=confidences[i],
+                    class_id=class_ids[i],
+                    detection_index=detection_indices[i],
+                    corners=corners[i],
+                    bbox=BoundingBox.model_construct(x1=x1, y1=y1, x2=x2, y2=y2),
+                    score=DartScore.model_construct(
+                        segment=segments[i],
+                        ring=RING_NAMES[rings[i]],
+                        points=points[i],
+                        tip=Point.model_construct(x=tips[i][0], y=tips[i][1])
+                    )
+                ))
+
+        model_info = ModelInfo(
+            model=getattr(model, "model_name", PYTORCH_MODEL_NAME),
+            image_size=image_size,
+            original_size=list(original_size)
+        )
+
+        # Even if no darts are detected, return a valid response
+        response = DetectionResponse(
+            detections=dart_detections,
+            model_info=model_info,
+            darts_count=len(dart_detections),
+            inference_tier=tier
+        )
+        Metrics.observe_since("postprocess", start)
+        return response
+
+    @staticmethod
+    def _decode_result(result: Any) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Decode all boxes of a result into arrays in one pass
+
+        Handles both oriented boxes (`obb.data`: x, y, w, h, angle, conf, ...) and
+        standard boxes (`boxes.data`: x1, y1, x2, y2, conf, cls).
+
+        Returns:
+            Dict of arrays indexed by detection in model order: centers (N, 2),
+            sizes (N, 2), angles (N,), confidences (N,), class_ids (N,),
+            corners (N, 4, 2) and bboxes (N, 4), or None if there are no boxes
+        """
+        # For oriented bounding boxes, get the data
+        if hasattr(result, 'obb') and result.obb is not None:
+            data = _to_numpy(result.obb.data)
+            if data is None or len(data) == 0 or data.shape[1] < 6:
+                return None
+
+            centers = data[:, 0:2]
+            sizes = data[:, 2:4]
+            angles = data[:, 4]
+            confidences = data[:, 5]
+
+            # Class ids come from `boxes.cls` when present, otherwise default to 0
+            class_ids = np.zeros(len(data), dtype=np.int64)
+            if hasattr(result, 'boxes') and result.boxes is not None and hasattr(result.boxes, 'cls'):
+                cls = _to_numpy(result.boxes.cls)[:len(data)]
+                class_ids[:len(cls)] = cls
+
+            # The angle is treated as degrees, consistent with `DartDetection.angle`
+            corners = xywhr_to_corners(centers, sizes, np.radians(angles))
+            half_sizes = sizes / 2
+            bboxes = np.concatenate([centers - half_sizes, centers + half_sizes], axis=1)
+
+        elif hasattr(result, 'boxes') and result.boxes is not None and hasattr(result.boxes, 'data'):
+            # For standard bounding boxes
+            data = _to_numpy(result.boxes.data)
+            if data is None or len(data) == 0 or data.shape[1] < 6:
+                return None
+
+            bboxes = data[:, 0:4]
+            x1, y1, x2, y2 = bboxes.T
+            centers = np.stack([(x1 + x2) / 2, (y1 + y2) / 2], axis=1)
+            sizes = np.stack([x2 - x1, y2 - y1], axis=1)
+            angles = np.zeros(len(data))  # no angle for standard boxes
+            confidences = data[:, 4]
+            class_ids = data[:, 5].astype(np.int64)
+
+            # Simpler corners (no rotation): top-left, top-right, bottom-right, bottom-left
+            corners = np.stack([
+                np.stack([x1, y1], axis=1),
+                np.stack([x2, y1], axis=1),
+                np.stack([x2, y2], axis=1),
+                np.stack([x1, y2], axis=1)
+            ], axis=1)
+
+        else:
+            return None
+
+        return {
+            "centers": np.array(centers, dtype=np.float64),
+            "sizes": np.array(sizes, dtype=np.float64),
+            "angles": np.array(angles, dtype=np.float64),
+            "confidences": np.array(confidences, dtype=np.float64),
+            "class_ids": class_ids,
+            "corners": np.array(corners, dtype=np.float64),
+            "bboxes": np.array(bboxes, dtype=np.float64),
+        }
+
+
+def _to_numpy(values: Any) -> Optional[np.ndarray]:
+    """Convert a tensor or array-like to a float64 NumPy array"""
+    if values is None:
+        return None
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values, dtype=np.float64)
@@ -0,0 +1,180 @@
+import hashlib
+import io
+import os
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from services.calibration_service import CalibrationService
+from services.frame_buffer import FrameRecord
+from services.image_decoder import ImageDecoder
+from services.lru_cache import LRUCache
+
+# Margin kept around the board when a preview is cropped to it, as a proportion of its radius
+PREVIEW_ROI_MARGIN = 0.1
+# Encoders and media types of the supported preview formats
+PREVIEW_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+class Preview(NamedTuple):
+    """An encoded preview variant of a frame"""
+    data: bytes
+    media_type: str
+    etag: str
+
+
+class PreviewService:
+    """
+    Resized and optionally board-cropped preview images of camera frames.
+
+    Frames are 4K JPEGs, while the frontend shows them a few hundred pixels wide.
+    Previews are decoded at the smallest JPEG scale that covers the requested width,
+    resized and re-encoded once per frame and variant, then kept in an LRU cache.
+
+    Each variant has a strong ETag derived from the frame and the variant parameters,
+    which are known before the preview is generated. A client that already has the
+    preview gets a 304 without the frame being decoded or the cache being touched.
+    """
+
+    _cache: Optional[LRUCache] = None
+
+    @staticmethod
+    def get_preview_config() -> Dict[str, int]:
+        """
+        Get preview configuration from environment variables.
+
+        Returns:
+            Dict with the default width and quality of previews and the entry and byte limits
+            of the preview cache
+        """
+        return {
+            "default_width": max(16, int(os.environ.get("PREVIEW_DEFAULT_WIDTH", "640"))),
+            "quality": min(95, max(1, int(os.environ.get("PREVIEW_QUALITY", "80")))),
+            "max_entries": int(os.environ.get("PREVIEW_CACHE_MAX_ENTRIES", "64")),
+            "max_bytes": int(os.environ.get("PREVIEW_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        }
+
+    @classmethod
+    def _get_cache(cls) -> LRUCache:
+        """Create the cache on first use."""
+        if cls._cache is None:
+            config = cls.get_preview_config()
+            cls._cache = LRUCache(
+                max_entries=config["max_entries"],
+                max_bytes=config["max_bytes"],
+                size_of=lambda preview: len(preview.data),
+            )
+        return cls._cache
+
+    @staticmethod
+    def make_key(
+        record: FrameRecord,
+        width: int,
+        roi: bool,
+        image_format: str,
+        quality: int
+    ) -> Tuple[Any, ...]:
+        """
+        Build the cache key of a preview variant.
+
+        The board box is part of the key, so cropped previews change when the board
+        is recalibrated.
+
+        Args:
+            record: Frame the preview is made of
+            width: Requested width in pixels
+            roi: Whether the preview is cropped to the calibrated board
+            image_format: Key of PREVIEW_FORMATS
+            quality: Encoder quality
+
+        Returns:
+            Hashable key
+        """
+        box = None
+        if roi:
+            calibration = CalibrationService.get_calibration()
+            box = (calibration.center_x, calibration.center_y, calibration.radius, calibration.ring_scale_factor)
+        return record.filename, record.sequence, record.size, width, box, image_format, quality
+
+    @staticmethod
+    def make_etag(key: Tuple[Any, ...]) -> str:
+        """
+        Build the strong ETag of a preview variant.
+
+        Args:
+            key: Key built with `make_key`
+
+        Returns:
+            Quoted ETag value
+        """
+        return '"' + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest() + '"'
+
+    @classmethod
+    def get_preview(
+        cls,
+        record: FrameRecord,
+        data: bytes,
+        key: Tuple[Any, ...],
+        width: int,
+        roi: bool,
+        image_format: str,
+        quality: int
+    ) -> Preview:
+        """
+        Get a preview variant of a frame, generating it on a cache miss.
+
+        Args:
+            record: Frame the preview is made of
+            data: JPEG bytes of the frame
+            key: Key built with `make_key` for the same parameters
+            width: Requested width in pixels, never upscaled beyond the frame or board region
+            roi: Whether to crop the preview to the calibrated board
+            image_format: Key of PREVIEW_FORMATS
+            quality: Encoder quality
+
+        Returns:
+            Preview with the encoded image and its ETag
+        """
+        cache = cls._get_cache()
+        preview = cache.get(key)
+        if preview is not None:
+            return preview
+
+        img = ImageDecoder.open(data)
+        box = CalibrationService.get_board_box(img.size, PREVIEW_ROI_MARGIN) if roi else None
+        region_width = box[2] - box[0] if box is not None else img.size[0]
+        width = min(width, region_width)
+
+        region, _ = ImageDecoder.decode(img, width / region_width, box)
+        if region.size[0] != width:
+            height = max(1, round(region.size[1] * width / region.size[0]))
+            region = region.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+
+        encoder, media_type = PREVIEW_FORMATS[image_format]
+        output = io.BytesIO()
+        region.save(output, format=encoder, quality=quality)
+
+        preview = Preview(output.getvalue(), media_type, cls.make_etag(key))
+        cache.put(key, preview)
+        return preview
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove all cached previews."""
+        if cls._cache is not None:
+            cls._cache.clear()
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get preview cache statistics.
+
+        Returns:
+            Dict with the default preview settings and the statistics of the underlying LRU cache
+        """
+        config = cls.get_preview_config()
+        return {
+            "default_width": config["default_width"],
+            "quality": config["quality"],
+            **cls._get_cache().get_stats(),
+        }
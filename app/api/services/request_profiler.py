@@ -0,0 +1,227 @@
+import contextlib
+import cProfile
+import glob
+import importlib.util
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Profiling modes: Python call profile, torch operator trace, or both
+MODE_CPROFILE = "cprofile"
+MODE_TORCH = "torch"
+MODE_ALL = "all"
+PROFILE_MODES = (MODE_CPROFILE, MODE_TORCH, MODE_ALL)
+
+# Files of a profile by download format, relative to the profiles directory
+PROFILE_FILES = {
+    "prof": "{id}.prof",            # cProfile data, for pstats or snakeviz
+    "txt": "{id}.txt",              # cProfile summary sorted by cumulative time
+    "torch": "{id}.torch.json",     # torch profiler trace, for chrome://tracing or Perfetto
+}
+METADATA_FILE = "{id}.meta.json"
+# Number of functions listed in the text summary
+SUMMARY_LINES = 60
+# Profile IDs are generated by `run`, anything else is rejected before touching the filesystem
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}_\d{6}_[0-9a-f]{8}$")
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is being recorded"""
+
+
+class RequestProfiler:
+    """
+    Records a cProfile and/or torch profiler trace of a single detection on demand.
+
+    Profiling is off unless PROFILING_ENABLED is set, and then only applies to
+    requests that ask for it. The profiled function runs on the calling thread, i.e.
+    the inference thread, so the profile covers the image decoding, the model's
+    preprocessing, the torch operators and the response building of that request.
+
+    Only one profile is recorded at a time: cProfile hooks are process-wide from
+    Python 3.12 and the torch profiler is global. Each profile is written to the
+    profiles directory under a generated ID, and the oldest profiles are deleted
+    beyond PROFILES_MAX_COUNT.
+    """
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_profiling_config() -> Dict[str, Any]:
+        """
+        Get profiling configuration from environment variables.
+
+        Returns:
+            Dict with whether requests may be profiled, the profiles directory and the number of profiles kept
+        """
+        return {
+            "enabled": os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes"),
+            "directory": os.environ.get("PROFILES_DIR", "/app/profiles"),
+            "max_count": max(1, int(os.environ.get("PROFILES_MAX_COUNT", "20"))),
+        }
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """Check whether requests may be profiled."""
+        return cls.get_profiling_config()["enabled"]
+
+    @staticmethod
+    def is_torch_available() -> bool:
+        """Check whether torch is installed, which the torch profiler requires."""
+        return importlib.util.find_spec("torch") is not None
+
+    @classmethod
+    def run(cls, mode: str, endpoint: str, func: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Call a function while profiling it and store the profile.
+
+        Args:
+            mode: One of PROFILE_MODES
+            endpoint: Path of the profiled request, stored with the profile
+            func: Function to profile
+            *args: Arguments passed to the function
+
+        Returns:
+            Tuple of (return value of the function, profile metadata). The metadata lists
+            no files if the profile could not be stored.
+
+        Raises:
+            ValueError: If the mode is unknown or needs torch, which is not installed
+            ProfilerBusyError: If another profile is being recorded
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode {mode}, expected one of {', '.join(PROFILE_MODES)}")
+        use_torch = mode in (MODE_TORCH, MODE_ALL)
+        if use_torch and not cls.is_torch_available():
+            raise ValueError("The torch profiler is not available because torch is not installed")
+        if not cls._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another request is being profiled")
+
+        try:
+            profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            profiler = cProfile.Profile() if mode in (MODE_CPROFILE, MODE_ALL) else None
+
+            with contextlib.ExitStack() as stack:
+                torch_profile = stack.enter_context(cls._torch_profile()) if use_torch else None
+                start = time.perf_counter()
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    result = func(*args)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                    duration = time.perf_counter() - start
+
+            metadata = {
+                "id": profile_id,
+                "mode": mode,
+                "endpoint": endpoint,
+                "created_at": time.time(),
+                "duration_ms": duration * 1000,
+                "files": [],
+            }
+            try:
+                cls._save(metadata, profiler, torch_profile)
+            except Exception as e:
+                # The request still gets its result, only the profile is lost
+                print(f"Error saving profile {profile_id}: {type(e).__name__}: {str(e)}")
+                metadata["files"] = []
+            return result, metadata
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def _torch_profile() -> Any:
+        """Create a torch profiler context recording CPU and, when available, CUDA activity."""
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        return profile(activities=activities, record_shapes=True)
+
+    @classmethod
+    def _save(cls, metadata: Dict[str, Any], profiler: Optional[cProfile.Profile], torch_profile: Any) -> None:
+        """Write the files of a profile and delete the oldest profiles beyond the limit."""
+        config = cls.get_profiling_config()
+        directory = config["directory"]
+        os.makedirs(directory, exist_ok=True)
+
+        def path(file_format: str) -> str:
+            metadata["files"].append(file_format)
+            return os.path.join(directory, PROFILE_FILES[file_format].format(id=metadata["id"]))
+
+        if profiler is not None:
+            profiler.dump_stats(path("prof"))
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_LINES)
+            with open(path("txt"), "w") as f:
+                f.write(summary.getvalue())
+        if torch_profile is not None:
+            torch_profile.export_chrome_trace(path("torch"))
+
+        with open(os.path.join(directory, METADATA_FILE.format(id=metadata["id"])), "w") as f:
+            json.dump(metadata, f)
+
+        # Profiles created within the same second have random name order, so age is
+        # taken from the modification time and the profile just saved is always kept
+        suffix = METADATA_FILE.format(id="")
+        others = []
+        for old in glob.glob(os.path.join(directory, METADATA_FILE.format(id="*"))):
+            profile_id = os.path.basename(old)[:-len(suffix)]
+            if profile_id != metadata["id"]:
+                try:
+                    others.append((os.path.getmtime(old), profile_id))
+                except OSError:
+                    continue
+        others.sort()
+        for _, profile_id in others[:max(0, len(others) - (config["max_count"] - 1))]:
+            for file_path in glob.glob(os.path.join(directory, f"{profile_id}.*")):
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    print(f"Error deleting profile {file_path}: {e}")
+
+    @classmethod
+    def list_profiles(cls) -> List[Dict[str, Any]]:
+        """
+        List the stored profiles.
+
+        Returns:
+            Metadata of each profile, newest first
+        """
+        directory = cls.get_profiling_config()["directory"]
+        profiles = []
+        for path in sorted(glob.glob(os.path.join(directory, METADATA_FILE.format(id="*"))), reverse=True):
+            try:
+                with open(path) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Error reading profile metadata {path}: {type(e).__name__}: {str(e)}")
+        return profiles
+
+    @classmethod
+    def get_profile_path(cls, profile_id: str, file_format: str) -> Optional[str]:
+        """
+        Get the path of a file of a stored profile.
+
+        Args:
+            profile_id: ID returned when the profile was recorded
+            file_format: Key of PROFILE_FILES
+
+        Returns:
+            Path of the file, or None if the profile or the file does not exist
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id) or file_format not in PROFILE_FILES:
+            return None
+        path = os.path.join(cls.get_profiling_config()["directory"], PROFILE_FILES[file_format].format(id=profile_id))
+        return path if os.path.exists(path) else None
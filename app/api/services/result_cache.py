@@ -0,0 +1,114 @@
+import hashlib
+import os
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from models.detection import DetectionResponse
+from services.lru_cache import LRUCache
+
+
+class ResultCache:
+    """
+    Cache of detection responses keyed by the content of the submitted image.
+
+    Re-submitting the exact same image bytes with the same model and settings
+    returns the stored response without decoding the image or running the model.
+    """
+
+    _cache: Optional[LRUCache] = None
+    _enabled: Optional[bool] = None
+
+    @staticmethod
+    def get_cache_config() -> Dict[str, Any]:
+        """
+        Get result cache configuration from environment variables.
+
+        Returns:
+            Dict with whether the cache is enabled, its entry and byte limits and the TTL in seconds
+        """
+        ttl = float(os.environ.get("RESULT_CACHE_TTL", "0"))
+        return {
+            "enabled": os.environ.get("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+            "max_entries": int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "64")),
+            "max_bytes": int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+            "ttl": ttl if ttl > 0 else None,
+        }
+
+    @classmethod
+    def _get_cache(cls) -> Optional[LRUCache]:
+        """Create the cache on first use, or return None if it is disabled."""
+        if cls._enabled is None:
+            config = cls.get_cache_config()
+            cls._enabled = config["enabled"]
+            if cls._enabled:
+                cls._cache = LRUCache(
+                    max_entries=config["max_entries"],
+                    max_bytes=config["max_bytes"],
+                    ttl=config["ttl"],
+                    size_of=lambda response: len(response.model_dump_json()),
+                )
+        return cls._cache
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model_version: Optional[str], params: Tuple[Hashable, ...]) -> Tuple[Hashable, ...]:
+        """
+        Build the cache key of an image.
+
+        Args:
+            image_bytes: Raw bytes of the submitted image
+            model_version: Identifier of the loaded model
+            params: Settings that affect the detections, such as thresholds and input size
+
+        Returns:
+            Hashable key
+        """
+        return hashlib.blake2b(image_bytes, digest_size=16).digest(), model_version, params
+
+    @classmethod
+    def get(cls, key: Tuple[Hashable, ...]) -> Optional[DetectionResponse]:
+        """
+        Get the cached response of an image.
+
+        Args:
+            key: Key built with `make_key`
+
+        Returns:
+            The cached response flagged as skipped, or None on a miss
+        """
+        cache = cls._get_cache()
+        if cache is None:
+            return None
+
+        response = cache.get(key)
+        if response is None:
+            return None
+        return response.model_copy(update={"inference_skipped": True, "skip_reason": "cache_hit", "events": []})
+
+    @classmethod
+    def put(cls, key: Tuple[Hashable, ...], response: DetectionResponse) -> None:
+        """
+        Store the response of an image.
+
+        Args:
+            key: Key built with `make_key`
+            response: Response to cache
+        """
+        cache = cls._get_cache()
+        if cache is not None:
+            cache.put(key, response)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove all cached responses."""
+        if cls._cache is not None:
+            cls._cache.clear()
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get result cache statistics.
+
+        Returns:
+            Dict with whether the cache is enabled and the statistics of the underlying LRU cache
+        """
+        cache = cls._get_cache()
+        return {"enabled": cache is not None, **(cache.get_stats() if cache is not None else {})}
@@ -0,0 +1,288 @@
+import math
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from models.calibration import BoardCalibration
+from services.calibration_service import CalibrationService
+from services.homography_service import BOARD_RADIUS_MM, HomographyService
+
+# Standard dartboard segment order, clockwise starting from the top (20)
+SEGMENT_ORDER = np.array([20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5], dtype=np.uint8)
+BULL_SEGMENT = 25
+
+# Ring names indexed by the ring codes stored in the raster
+RING_MISS = 0
+RING_SINGLE = 1
+RING_DOUBLE = 2
+RING_TRIPLE = 3
+RING_OUTER_BULL = 4
+RING_INNER_BULL = 5
+RING_NAMES = ("miss", "single", "double", "triple", "outer-bull", "inner-bull")
+
+
+class ScoringRaster:
+    """
+    Lookup table mapping frame pixels around the board to (segment, ring, points).
+
+    Cell (row, col) holds the score at frame position (origin_x + col + 0.5, origin_y + row + 0.5).
+    Positions outside the raster are misses. The raster also keeps the board centre and the
+    detection offsets used to estimate dart tips for the geometry it was built from.
+    """
+
+    def __init__(
+        self,
+        calibration: BoardCalibration,
+        homography_version: Optional[int],
+        origin: Tuple[int, int],
+        center: Tuple[float, float],
+        detection_offset: Tuple[float, float],
+        segments: np.ndarray,
+        rings: np.ndarray,
+        points: np.ndarray
+    ):
+        self.calibration = calibration
+        self.homography_version = homography_version
+        self.origin = origin
+        self.center = center
+        self.detection_offset = detection_offset
+        self.segments = segments
+        self.rings = rings
+        self.points = points
+
+    def lookup(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Look up the scores of many frame positions at once.
+
+        Args:
+            positions: Array of shape (N, 2) with frame coordinates
+
+        Returns:
+            Tuple of (segments, ring codes, points) arrays of shape (N,)
+        """
+        cols = np.floor(positions[:, 0] - self.origin[0]).astype(np.int64)
+        rows = np.floor(positions[:, 1] - self.origin[1]).astype(np.int64)
+        height, width = self.segments.shape
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        rows, cols = np.where(inside, rows, 0), np.where(inside, cols, 0)
+
+        return (
+            np.where(inside, self.segments[rows, cols], 0),
+            np.where(inside, self.rings[rows, cols], RING_MISS),
+            np.where(inside, self.points[rows, cols], 0),
+        )
+
+
+class ScoringService:
+    """
+    Scores detected darts on the server.
+
+    The segment, ring and points of every pixel around the board are computed once
+    from the calibration, so scoring a frame is a single vectorized lookup of the
+    estimated dart tips. The raster is rebuilt only when the calibration changes.
+
+    Without a homography the board is modelled as a front-on circle, mirroring
+    `getDartScore` in the frontend's dartboardScoring.ts, except that tips outside the
+    double ring score as a miss instead of a single. With a homography, pixels are
+    mapped to board millimetres, so the perspective of the camera is accounted for and
+    the rotation, ring scale and detection offset adjustments are not applied. Lookups
+    are exact to within one pixel of a ring or segment boundary.
+    """
+
+    _lock = threading.Lock()
+    _raster: Optional[ScoringRaster] = None
+    _builds: int = 0
+
+    @staticmethod
+    def build_raster(
+        calibration: BoardCalibration,
+        homography: Optional[np.ndarray] = None,
+        homography_version: Optional[int] = None
+    ) -> ScoringRaster:
+        """
+        Compute the score of every frame pixel that can score.
+
+        Args:
+            calibration: Board calibration, whose ring ratios are used in both geometries
+            homography: Frame-to-board matrix, or None to use the circular calibration
+            homography_version: Version of the homography, stored with the raster
+
+        Returns:
+            ScoringRaster covering the scoring area of the board
+        """
+        if homography is None:
+            scoring_radius = calibration.radius * max(
+                calibration.ring_scale_factor * calibration.double_outer_ratio,
+                calibration.outer_bull_ratio
+            )
+            origin_x = math.floor(calibration.center_x - scoring_radius) - 1
+            origin_y = math.floor(calibration.center_y - scoring_radius) - 1
+            width = height = 2 * math.ceil(scoring_radius) + 3
+
+            xs = origin_x + np.arange(width) + 0.5 - calibration.center_x
+            ys = origin_y + np.arange(height) + 0.5 - calibration.center_y
+            dx, dy = np.meshgrid(xs, ys)
+
+            # Bull checks use the plain radius, rings are scaled by the ring scale factor
+            ratio = np.hypot(dx, dy) / calibration.radius
+            ring_ratio = ratio / calibration.ring_scale_factor
+
+            # 0 degrees at the top, increasing clockwise, plus the rotation adjustment
+            segment_angles = np.degrees(np.arctan2(dy, dx)) + 90 + calibration.rotation_adjustment
+            center = (calibration.center_x, calibration.center_y)
+            detection_offset = (calibration.detection_offset_x, calibration.detection_offset_y)
+        else:
+            # Bounding box of the scoring area as seen by the camera
+            scoring_radius = BOARD_RADIUS_MM * max(calibration.double_outer_ratio, calibration.outer_bull_ratio)
+            angles = np.linspace(0, 2 * np.pi, 360, endpoint=False)
+            outline = HomographyService.board_to_frame(
+                homography, scoring_radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+            )
+            origin_x, origin_y = (int(v) - 1 for v in np.floor(outline.min(axis=0)))
+            width, height = (int(v) + 2 for v in np.ceil(outline.max(axis=0)) - (origin_x, origin_y))
+
+            xs, ys = np.meshgrid(origin_x + np.arange(width) + 0.5, origin_y + np.arange(height) + 0.5)
+            board = HomographyService.frame_to_board(homography, np.stack([xs.ravel(), ys.ravel()], axis=1))
+            bx, by = board[:, 0].reshape(height, width), board[:, 1].reshape(height, width)
+
+            ratio = ring_ratio = np.hypot(bx, by) / BOARD_RADIUS_MM
+            # Board y points down, segment 20 is centred on the top and spans 18 degrees
+            segment_angles = np.degrees(np.arctan2(bx, -by)) + 9
+            center = tuple(HomographyService.board_to_frame(homography, np.zeros((1, 2)))[0])
+            detection_offset = (0.0, 0.0)
+
+        segments, rings, points = ScoringService._classify(calibration, ratio, ring_ratio, segment_angles)
+        return ScoringRaster(
+            calibration, homography_version, (origin_x, origin_y), center, detection_offset,
+            segments, rings, points
+        )
+
+    @staticmethod
+    def _classify(
+        calibration: BoardCalibration,
+        ratio: np.ndarray,
+        ring_ratio: np.ndarray,
+        segment_angles: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Turn board positions into scores.
+
+        Args:
+            calibration: Board calibration with the ring ratios
+            ratio: Distance from the bull as a proportion of the board radius, used for the bull
+            ring_ratio: Distance used for the other rings
+            segment_angles: Angle in degrees such that segment i of SEGMENT_ORDER spans [18 i, 18 (i + 1))
+
+        Returns:
+            Tuple of (segments, ring codes, points) uint8 arrays
+        """
+        segments = SEGMENT_ORDER[np.floor(np.mod(segment_angles, 360) / 18).astype(np.int64) % 20]
+
+        rings = np.select(
+            [
+                ring_ratio <= calibration.inner_bull_ratio,
+                ring_ratio <= calibration.outer_bull_ratio,
+                (ring_ratio >= calibration.double_inner_ratio) & (ring_ratio <= calibration.double_outer_ratio),
+                (ring_ratio >= calibration.triple_inner_ratio) & (ring_ratio <= calibration.triple_outer_ratio),
+                ring_ratio > calibration.double_outer_ratio,
+            ],
+            [RING_INNER_BULL, RING_OUTER_BULL, RING_DOUBLE, RING_TRIPLE, RING_MISS],
+            RING_SINGLE
+        ).astype(np.uint8)
+        multipliers = np.select([rings == RING_DOUBLE, rings == RING_TRIPLE, rings == RING_MISS], [2, 3, 0], 1)
+        points = segments * multipliers
+
+        bull = ratio <= calibration.outer_bull_ratio
+        inner_bull = ratio <= calibration.inner_bull_ratio
+        segments = np.where(bull, BULL_SEGMENT, np.where(rings == RING_MISS, 0, segments))
+        rings = np.where(bull, np.where(inner_bull, RING_INNER_BULL, RING_OUTER_BULL), rings)
+        points = np.where(bull, np.where(inner_bull, 50, 25), points)
+
+        return segments.astype(np.uint8), rings.astype(np.uint8), points.astype(np.uint8)
+
+    @classmethod
+    def get_raster(cls) -> ScoringRaster:
+        """
+        Get the raster for the current calibration and homography, rebuilding it if either changed.
+
+        Returns:
+            ScoringRaster for the current calibration
+        """
+        calibration = CalibrationService.get_calibration()
+        homography = HomographyService.get_matrix()
+        version = HomographyService.get_version() if homography is not None else None
+        with cls._lock:
+            raster = cls._raster
+            if raster is None or raster.calibration != calibration or raster.homography_version != version:
+                cls._raster = cls.build_raster(calibration, homography, version)
+                cls._builds += 1
+            return cls._raster
+
+    @staticmethod
+    def estimate_tips(
+        centers: np.ndarray,
+        sizes: np.ndarray,
+        angles: np.ndarray,
+        board_center: Tuple[float, float],
+        detection_offset: Tuple[float, float]
+    ) -> np.ndarray:
+        """
+        Estimate the tip positions of detected darts.
+
+        The detection offsets are subtracted from the box centres, then the tip is placed
+        half the box height along the dart axis, on the end that points to the board centre.
+
+        Args:
+            centers: Array of shape (N, 2) with box centres in frame coordinates
+            sizes: Array of shape (N, 2) with box widths and heights
+            angles: Array of shape (N,) with box angles in degrees
+            board_center: Frame position of the bull
+            detection_offset: Offset (x, y) from the detected to the actual dart position
+
+        Returns:
+            Array of shape (N, 2) with tip positions in frame coordinates
+        """
+        corrected = centers - np.array(detection_offset)
+
+        # The long axis of the dart is the box height, so the box angle is rotated by -90 degrees
+        axis_angles = np.radians(angles - 90)
+        directions = np.stack([np.cos(axis_angles), np.sin(axis_angles)], axis=1)
+
+        to_center = np.array(board_center) - corrected
+        signs = np.where(np.einsum("ij,ij->i", directions, to_center) > 0, 1.0, -1.0)
+        return corrected + (signs * sizes[:, 1] / 2)[:, None] * directions
+
+    @classmethod
+    def score(cls, centers: np.ndarray, sizes: np.ndarray, angles: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score detected darts.
+
+        Args:
+            centers: Array of shape (N, 2) with box centres in frame coordinates
+            sizes: Array of shape (N, 2) with box widths and heights
+            angles: Array of shape (N,) with box angles in degrees
+
+        Returns:
+            Dict of arrays of shape (N,) or (N, 2): tips, segments, rings (codes into RING_NAMES) and points
+        """
+        raster = cls.get_raster()
+        tips = cls.estimate_tips(centers, sizes, angles, raster.center, raster.detection_offset)
+        segments, rings, points = raster.lookup(tips)
+        return {"tips": tips, "segments": segments, "rings": rings, "points": points}
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get scoring raster statistics.
+
+        Returns:
+            Dict with the geometry in use, the raster size and the number of times it was built
+        """
+        raster = cls._raster
+        return {
+            "geometry": None if raster is None else "circle" if raster.homography_version is None else "homography",
+            "raster_width": raster.segments.shape[1] if raster is not None else 0,
+            "raster_height": raster.segments.shape[0] if raster is not None else 0,
+            "builds": cls._builds,
+        }
@@ -0,0 +1,388 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+from urllib.parse import quote
+
+import numpy as np
+from PIL import Image
+
+from models.detection import DetectionResponse
+from models.events import FrameEvent
+from services.calibration_service import CalibrationService
+from services.camera_service import CameraService
+from services.change_detector import CHANGE_DETECTION_MARGIN
+from services.event_broadcaster import EventBroadcaster
+from services.frame_buffer import FrameBuffer
+from services.inference_scheduler import InferenceScheduler
+from services.metrics import Metrics
+from services.model_registry import ModelRegistry
+from services.prediction_service import DetectionError, PredictionService
+
+# Motion gate states
+STATE_STILL = "still"        # Nothing moved since the last detection
+STATE_MOTION = "motion"      # Frames are changing, e.g. a dart is in flight or a hand is at the board
+STATE_SETTLING = "settling"  # Motion stopped, waiting for enough still frames
+
+# JPEG quality of the stream frames stored in the feed
+FRAME_JPEG_QUALITY = 95
+
+
+class StreamIngestService:
+    """
+    Reads the camera stream continuously and runs detection when a throw has landed.
+
+    A reader thread decodes the RTSP or FLV stream of the camera (or a video file
+    standing in for it) and keeps only the latest frame. Every frame goes through a
+    cheap motion gate on a small grayscale thumbnail of the board region: once frames
+    have changed and then stayed still for a few frames, the settled frame is handed
+    to a detection thread, which runs it on the inference thread pool. Frames that
+    arrive while a detection is running replace the pending frame, so detection
+    never falls behind the stream.
+
+    Decoding uses OpenCV, which is installed with ultralytics.
+    """
+
+    _lock = threading.Lock()
+    _stop_event = threading.Event()
+    _detect_event = threading.Event()
+    _reader: Optional[threading.Thread] = None
+    _detector: Optional[threading.Thread] = None
+    _source: Optional[str] = None
+
+    # Latest frame and motion gate state
+    _frame: Optional[np.ndarray] = None
+    _frame_number: int = 0
+    _frame_time: Optional[float] = None
+    _previous_thumbnail: Optional[np.ndarray] = None
+    _state: str = STATE_MOTION  # Detect the first settled frame after starting
+    _still_frames: int = 0
+    _pending: Optional[tuple] = None
+
+    # Latest detection
+    _response: Optional[DetectionResponse] = None
+    _response_frame: Optional[int] = None
+    _response_time: Optional[float] = None
+
+    # Metrics
+    _frames_read: int = 0
+    _fps: Optional[float] = None
+    _motion_events: int = 0
+    _detections: int = 0
+    _dropped: int = 0
+    _reconnects: int = 0
+    _last_latency_ms: Optional[float] = None
+    _error: Optional[str] = None
+
+    @staticmethod
+    def get_stream_config() -> Dict[str, Any]:
+        """
+        Get stream ingestion configuration from environment variables.
+
+        Without STREAM_URL the stream URL is built from the camera configuration for the
+        selected protocol. STREAM_URL may also be the path of a local video file.
+
+        Returns:
+            Dict with whether ingestion starts with the server, the stream URL, the motion
+            thumbnail size, the gray level difference of a changed cell, the changed area that
+            counts as motion, the still frames required before detection, whether video files
+            loop and the reconnect delay in seconds
+        """
+        url = os.environ.get("STREAM_URL", "")
+        if not url and os.environ.get("CAMERA_IP") and os.environ.get("CAMERA_PASSWORD"):
+            ip = os.environ["CAMERA_IP"]
+            password = quote(os.environ["CAMERA_PASSWORD"], safe="")
+            if os.environ.get("STREAM_PROTOCOL", "rtsp").lower() == "flv":
+                url = f"http://{ip}/flv?port=1935&app=bcs&stream=channel0_main.bcs&user=admin&password={password}"
+            else:
+                url = f"rtsp://admin:{password}@{ip}:554/h264Preview_01_main"
+
+        return {
+            "enabled": os.environ.get("STREAM_ENABLED", "false").lower() in ("1", "true", "yes"),
+            "url": url,
+            "motion_size": max(16, int(os.environ.get("STREAM_MOTION_SIZE", "64"))),
+            "pixel_threshold": float(os.environ.get("STREAM_MOTION_PIXEL_THRESHOLD", "15")),
+            "area_threshold": float(os.environ.get("STREAM_MOTION_AREA_THRESHOLD", "0.002")),
+            "still_frames": max(1, int(os.environ.get("STREAM_STILL_FRAMES", "3"))),
+            "loop": os.environ.get("STREAM_LOOP", "true").lower() in ("1", "true", "yes"),
+            "reconnect_delay": max(0.1, float(os.environ.get("STREAM_RECONNECT_DELAY", "2"))),
+        }
+
+    @classmethod
+    def start(cls, source: Optional[str] = None) -> bool:
+        """
+        Start the reader and detection threads.
+
+        Args:
+            source: Stream URL or video file, None to use the configured URL
+
+        Returns:
+            bool: True if ingestion started, False if it was already running
+
+        Raises:
+            ValueError: If no stream source is configured
+        """
+        source = source or cls.get_stream_config()["url"]
+        if not source:
+            raise ValueError("No stream source. Set STREAM_URL or CAMERA_IP and CAMERA_PASSWORD.")
+
+        with cls._lock:
+            if cls._reader is not None and cls._reader.is_alive():
+                return False
+            cls._stop_event.clear()
+            cls._detect_event.clear()
+            cls._source = source
+            cls._frame = None
+            cls._previous_thumbnail = None
+            cls._state = STATE_MOTION
+            cls._still_frames = 0
+            cls._pending = None
+            cls._error = None
+            cls._reader = threading.Thread(target=cls._read_loop, args=(source,), name="stream-reader", daemon=True)
+            cls._detector = threading.Thread(target=cls._detect_loop, name="stream-detector", daemon=True)
+            cls._reader.start()
+            cls._detector.start()
+        return True
+
+    @classmethod
+    def stop(cls) -> None:
+        """Stop ingestion, waiting for the threads to finish."""
+        cls._stop_event.set()
+        cls._detect_event.set()
+        for thread in (cls._reader, cls._detector):
+            if thread is not None:
+                thread.join(timeout=10)
+        with cls._lock:
+            cls._reader = None
+            cls._detector = None
+
+    @classmethod
+    def is_running(cls) -> bool:
+        """Check whether the reader thread is running."""
+        return cls._reader is not None and cls._reader.is_alive()
+
+    @classmethod
+    def _read_loop(cls, source: str) -> None:
+        """Decode frames until stopped, reconnecting when the stream drops."""
+        try:
+            import cv2
+        except ImportError as e:
+            # OpenCV is not part of the ONNX image's requirements
+            cls._error = f"Stream ingestion requires OpenCV: {str(e)}"
+            print(f"Stream ingestion error: {cls._error}")
+            return
+
+        config = cls.get_stream_config()
+        is_file = os.path.isfile(source)
+
+        while not cls._stop_event.is_set():
+            capture = cv2.VideoCapture(source)
+            if not capture.isOpened():
+                cls._error = f"Could not open stream {source if is_file else 'from the camera'}"
+                print(f"Stream ingestion error: {cls._error}")
+                cls._reconnects += 1
+                cls._stop_event.wait(config["reconnect_delay"])
+                continue
+
+            # Files are read at their own frame rate so they behave like a live stream
+            frame_interval = 1 / (capture.get(cv2.CAP_PROP_FPS) or 25) if is_file else 0.0
+            next_frame_at = time.perf_counter()
+            try:
+                while not cls._stop_event.is_set():
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    cls._on_frame(frame, config)
+
+                    if frame_interval:
+                        next_frame_at += frame_interval
+                        cls._stop_event.wait(max(0.0, next_frame_at - time.perf_counter()))
+            except Exception as e:
+                cls._error = f"{type(e).__name__} - {str(e)}"
+                print(f"Stream ingestion error: {cls._error}")
+            finally:
+                capture.release()
+
+            if is_file and not config["loop"]:
+                break
+            if not is_file:
+                cls._reconnects += 1
+                cls._stop_event.wait(config["reconnect_delay"])
+
+    @classmethod
+    def _on_frame(cls, frame: np.ndarray, config: Dict[str, Any]) -> None:
+        """Store a decoded frame and advance the motion gate."""
+        now = time.time()
+        thumbnail = cls._motion_thumbnail(frame, config["motion_size"])
+
+        with cls._lock:
+            if cls._frame_time is not None and now > cls._frame_time:
+                rate = 1 / (now - cls._frame_time)
+                cls._fps = rate if cls._fps is None else cls._fps + 0.1 * (rate - cls._fps)
+            cls._frame = frame
+            cls._frame_number += 1
+            cls._frame_time = now
+            cls._frames_read += 1
+
+            previous, cls._previous_thumbnail = cls._previous_thumbnail, thumbnail
+            if previous is None or previous.shape != thumbnail.shape:
+                return
+
+            changed = np.count_nonzero(np.abs(thumbnail - previous) > config["pixel_threshold"])
+            if changed / thumbnail.size >= config["area_threshold"]:
+                if cls._state == STATE_STILL:
+                    cls._motion_events += 1
+                cls._state = STATE_MOTION
+                cls._still_frames = 0
+                return
+
+            if cls._state == STATE_STILL:
+                return
+            cls._state = STATE_SETTLING
+            cls._still_frames += 1
+            if cls._still_frames < config["still_frames"]:
+                return
+
+            # The board has settled, hand the frame to the detection thread
+            if cls._pending is not None:
+                cls._dropped += 1
+            cls._pending = (frame, cls._frame_number, now)
+            cls._state = STATE_STILL
+            cls._still_frames = 0
+        cls._detect_event.set()
+
+    @staticmethod
+    def _motion_thumbnail(frame: np.ndarray, size: int) -> np.ndarray:
+        """Reduce the board region of a BGR frame to a small grayscale thumbnail."""
+        import cv2
+
+        height, width = frame.shape[:2]
+        box = CalibrationService.get_board_box((width, height), CHANGE_DETECTION_MARGIN) or (0, 0, width, height)
+        region = frame[box[1]:box[3], box[0]:box[2]]
+        small = cv2.resize(region, (size, size), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    @classmethod
+    def _detect_loop(cls) -> None:
+        """Run detection on settled frames until stopped."""
+        while True:
+            cls._detect_event.wait()
+            if cls._stop_event.is_set():
+                return
+            with cls._lock:
+                pending, cls._pending = cls._pending, None
+                cls._detect_event.clear()
+            if pending is None:
+                continue
+
+            frame, frame_number, settled_at = pending
+            model = ModelRegistry.get_model()
+            if model is None:
+                continue
+
+            try:
+                import cv2
+
+                # The frame is already decoded, so it is passed on as an image instead of a JPEG
+                image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                result = InferenceScheduler.submit(PredictionService.detect_darts, model, image).result()
+            except Exception as e:
+                result = DetectionError(error=f"{type(e).__name__} - {str(e)}")
+
+            cls._store_result(result, frame_number, settled_at, frame)
+
+    @classmethod
+    def _store_result(
+        cls,
+        result: Union[DetectionResponse, DetectionError],
+        frame_number: int,
+        settled_at: float,
+        frame: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Keep the latest successful detection and broadcast it with its frame.
+
+        The frame is only encoded for the feed once its detection is known, so the
+        encode does not add to the detection latency.
+        """
+        if isinstance(result, dict):
+            cls._error = result["error"]
+            print(f"Stream detection error: {result['error']}")
+            return
+
+        with cls._lock:
+            cls._response = result
+            cls._response_frame = frame_number
+            cls._response_time = time.time()
+            cls._detections += 1
+            cls._last_latency_ms = (cls._response_time - settled_at) * 1000
+
+        if frame is None:
+            return
+        try:
+            import cv2
+
+            start = time.perf_counter()
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, FRAME_JPEG_QUALITY])
+            if not ok:
+                raise OSError("Could not encode frame")
+            Metrics.observe_since("stream_encode", start)
+            record = FrameBuffer.add(CameraService.FEED_DIR, encoded.tobytes())
+        except OSError as e:
+            print(f"Error storing stream frame: {type(e).__name__}: {str(e)}")
+            return
+        EventBroadcaster.publish_threadsafe("detection", FrameEvent(
+            source="stream",
+            filename=record.filename,
+            image_url=f"/camera/images/{record.filename}",
+            preview_url=f"/camera/images/{record.filename}/preview",
+            captured_at=settled_at,
+            detection=result
+        ).model_dump(mode="json"), key=record.filename)
+
+    @classmethod
+    def get_latest_frame(cls) -> Optional[np.ndarray]:
+        """
+        Get the latest decoded frame.
+
+        Returns:
+            BGR frame array, or None if no frame has been read
+        """
+        return cls._frame
+
+    @classmethod
+    def get_latest_detection(cls) -> Optional[DetectionResponse]:
+        """
+        Get the detection of the last settled frame.
+
+        Returns:
+            DetectionResponse, or None if no frame has been detected yet
+        """
+        return cls._response
+
+    @classmethod
+    def get_status(cls) -> Dict[str, Any]:
+        """
+        Get the ingestion state and statistics.
+
+        Returns:
+            Dict with the running state, motion gate state, frame and detection counters,
+            the latency from a settled frame to its detection and the last error
+        """
+        with cls._lock:
+            return {
+                "running": cls.is_running(),
+                "state": cls._state,
+                "frames_read": cls._frames_read,
+                "frame_number": cls._frame_number,
+                "fps": cls._fps,
+                "motion_events": cls._motion_events,
+                "detections": cls._detections,
+                "dropped": cls._dropped,
+                "reconnects": cls._reconnects,
+                "last_frame_at": cls._frame_time,
+                "last_detection_at": cls._response_time,
+                "last_detection_frame": cls._response_frame,
+                "last_latency_ms": cls._last_latency_ms,
+                "error": cls._error,
+            }
@@ -0,0 +1 @@
+# Tools package initialization
\ No newline at end of file
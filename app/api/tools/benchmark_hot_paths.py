@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark the prediction and scoring hot paths without the model weights.
+
+Run from the api directory:
+    python -m tools.benchmark_hot_paths [--darts 3] [--anchors 20000] [--output report.json]
+
+The model is replaced by a stub with the `predict` interface of the ONNX engine. It runs
+the engine's real letterbox preprocessing and NMS post-processing on a synthetic OBB output
+tensor instead of a forward pass, so everything around the network is measured on a
+CPU-only machine. The tensor has `--anchors` anchors, of which `--darts` darts are found,
+each backed by `--candidates` overlapping boxes that NMS has to suppress.
+
+Benchmarks:
+    decode        JPEG decoding of a frame at the model input scale
+    nms           Decoding and NMS of the raw stub output
+    postprocess   Building the response from model results, including scoring
+    scoring       Scoring the darts against the calibrated board
+    detect_darts  PredictionService.detect_darts end to end with the stub model
+
+detect_darts runs with the configuration in BENCHMARK_CONFIG, set when the benchmark starts
+and recorded in the report, whatever the environment of the caller.
+
+The checked-in playground frames are used unless `--frames` is given. Inputs are generated
+from a fixed seed and the garbage collector is paused while timing, so runs on the same
+machine are comparable. `--save-baseline` stores the report as the baseline. Later runs
+are compared with it, and the exit code is 1 when the median latency of a benchmark grew
+by more than `--tolerance`. Baselines only mean something on the machine that recorded
+them, so record one on the deploy machine.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from services.calibration_service import CalibrationService
+from services.dart_tracker import DartTracker
+from services.image_decoder import ImageDecoder
+from services.onnx_engine import OnnxEngine, OnnxResult
+from services.prediction_service import CONFIDENCE_THRESHOLD, IMG_SIZE, PredictionService
+from services.scoring_service import ScoringService
+from tools.quantize_onnx import find_frames
+
+DEFAULT_FRAME_DIRS = ["../../playground"]
+DEFAULT_BASELINE = "tools/benchmark_baseline.json"
+
+# Configuration detect_darts runs with, so timings do not depend on the caller's environment.
+# Detections run on every frame instead of being reused for repeated frames, only the fast
+# tier answers, and the board checks and tracking that only matter on a live camera are off.
+BENCHMARK_CONFIG = {
+    "CHANGE_DETECTION_ENABLED": "false",
+    "BOARD_LOCATOR_ENABLED": "false",
+    "HOMOGRAPHY_CHECK_ENABLED": "false",
+    "TRACKING_ENABLED": "false",
+    "INFERENCE_BUDGET_MS": "0",
+    "METRICS_ENABLED": "true",
+    "ROI_CROP_ENABLED": "false",
+    "ROI_MARGIN": "0.75",
+    "ROI_IMG_SIZE": "0",
+    "DECODE_DRAFT_ENABLED": "true",
+}
+
+
+class StubModel:
+    """
+    Stand-in for a loaded model that returns a synthetic OBB output.
+
+    The output tensor is generated once per input size from a fixed seed. Darts are
+    placed around the centre of the input, and each is surrounded by jittered
+    candidate boxes with lower scores. The remaining anchors score below the
+    confidence threshold.
+    """
+
+    model_name = "Stub OBB model (benchmark)"
+
+    def __init__(self, darts: int, anchors: int, candidates: int, classes: int, seed: int):
+        self.darts = darts
+        self.anchors = max(anchors, darts * candidates)
+        self.candidates = candidates
+        self.classes = classes
+        self.seed = seed
+        self._outputs: Dict[int, np.ndarray] = {}
+
+    def output(self, image_size: int) -> np.ndarray:
+        """
+        Get the raw output for an input size.
+
+        Returns:
+            Array of shape (4 + classes + 1, anchors) laid out like the exported model's output
+        """
+        if image_size not in self._outputs:
+            rng = np.random.default_rng(self.seed)
+            rows = np.zeros((self.anchors, 4 + self.classes + 1), dtype=np.float32)
+            rows[:, 0:2] = rng.uniform(0, image_size, (self.anchors, 2))
+            rows[:, 2:4] = rng.uniform(2, image_size * 0.02, (self.anchors, 2))
+            rows[:, 4:-1] = rng.uniform(0, CONFIDENCE_THRESHOLD / 2, (self.anchors, self.classes))
+            rows[:, -1] = rng.uniform(0, np.pi / 2, self.anchors)
+
+            for dart in range(self.darts):
+                center = image_size / 2 + rng.uniform(-0.15, 0.15, 2) * image_size
+                size = np.array([0.05, 0.012]) * image_size
+                angle = rng.uniform(0, np.pi / 2)
+                block = slice(dart * self.candidates, (dart + 1) * self.candidates)
+                rows[block, 0:2] = center + rng.normal(0, 0.002 * image_size, (self.candidates, 2))
+                rows[block, 2:4] = size * rng.uniform(0.9, 1.1, (self.candidates, 2))
+                rows[block, 4] = rng.uniform(0.3, 0.9, self.candidates)
+                rows[block, -1] = angle + rng.normal(0, 0.02, self.candidates)
+
+            self._outputs[image_size] = rows.T.copy()
+        return self._outputs[image_size]
+
+    def predict(
+        self,
+        source: Union[Image.Image, List[Image.Image]],
+        conf: float = 0.25,
+        iou: float = 0.7,
+        imgsz: int = 640,
+        max_det: int = 300,
+        augment: bool = False,
+        verbose: bool = False,
+    ) -> List[OnnxResult]:
+        """Run the engine's preprocessing and post-processing around the synthetic output."""
+        results = []
+        for image in source if isinstance(source, list) else [source]:
+            start = time.perf_counter()
+            _, ratio, pad = OnnxEngine._letterbox(image, (imgsz, imgsz))
+            preprocess_end = time.perf_counter()
+            data = OnnxEngine._postprocess(self.output(imgsz), conf, iou, max_det, ratio, pad, image.size)
+            postprocess_end = time.perf_counter()
+            results.append(OnnxResult(data, {
+                "preprocess": (preprocess_end - start) * 1000,
+                "inference": 0.0,
+                "postprocess": (postprocess_end - preprocess_end) * 1000,
+            }))
+        return results
+
+
+def time_benchmark(func: Callable[[int], Any], warmup: int, repeat: int) -> Dict[str, float]:
+    """
+    Time a function, passing it the iteration number.
+
+    Returns:
+        Dict with the minimum, median, 95th percentile and mean time in milliseconds
+    """
+    for i in range(warmup):
+        func(i)
+
+    gc.collect()
+    gc.disable()
+    try:
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            func(i)
+            times.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+
+    times.sort()
+    return {
+        "min_ms": times[0],
+        "p50_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        "mean_ms": statistics.fmean(times),
+        "runs": repeat,
+    }
+
+
+def run_benchmarks(frames: List[bytes], model: StubModel, warmup: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Run every benchmark on the frames, cycling through them across iterations.
+
+    Returns:
+        Timings per benchmark name
+    """
+    frame_count = len(frames)
+
+    def decode(i: int) -> None:
+        PredictionService._prepare_image(ImageDecoder.open(frames[i % frame_count]))
+
+    # Inputs of the post-processing benchmarks, prepared like detect_darts does
+    prepared = []
+    for image_bytes in frames:
+        img = ImageDecoder.open(image_bytes)
+        original_size = img.size
+        img, transform, image_size = PredictionService._prepare_image(img)
+        results = model.predict(img, conf=CONFIDENCE_THRESHOLD, iou=0.1, imgsz=image_size, max_det=100)
+        _, ratio, pad = OnnxEngine._letterbox(img, (image_size, image_size))
+        prepared.append((img, original_size, transform, image_size, results, ratio, pad))
+
+    def nms(i: int) -> None:
+        img, _, _, image_size, _, ratio, pad = prepared[i % frame_count]
+        OnnxEngine._postprocess(model.output(image_size), CONFIDENCE_THRESHOLD, 0.1, 100, ratio, pad, img.size)
+
+    def postprocess(i: int) -> None:
+        _, original_size, transform, image_size, results, _, _ = prepared[i % frame_count]
+        PredictionService._build_response(model, results, original_size, image_size, transform, "fast")
+
+    rng = np.random.default_rng(model.seed)
+    calibration = CalibrationService.get_calibration()
+    center = np.array([calibration.center_x, calibration.center_y])
+    darts = max(1, model.darts)
+    centers = center + rng.normal(0, 150, (darts, 2))
+    sizes = np.tile([180.0, 40.0], (darts, 1))
+    angles = rng.uniform(0, 180, darts)
+
+    def scoring(i: int) -> None:
+        ScoringService.score(centers, sizes, angles)
+
+    def detect_darts(i: int) -> None:
+        result = PredictionService.detect_darts(model, frames[i % frame_count])
+        if isinstance(result, dict):
+            raise RuntimeError(result["error"])
+
+    DartTracker.reset()
+    benchmarks = {
+        "decode": decode,
+        "nms": nms,
+        "postprocess": postprocess,
+        "scoring": scoring,
+        "detect_darts": detect_darts,
+    }
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = time_benchmark(func, warmup, repeat)
+        print(f"{name:<14}{results[name]['p50_ms']:>10.2f} ms p50{results[name]['p95_ms']:>10.2f} ms p95")
+    return results
+
+
+def describe_environment() -> Dict[str, Any]:
+    """Machine and library versions the timings depend on"""
+    import PIL
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_delta_ms: float
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Compare the median times with a baseline report.
+
+    A benchmark regressed when its median grew by more than `tolerance` and by more
+    than `min_delta_ms`, so timer noise on sub-millisecond benchmarks is not flagged.
+
+    Returns:
+        Tuple of (comparison per benchmark, names of the benchmarks that regressed)
+    """
+    comparison = {}
+    regressions = []
+    for name, timings in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        change = timings["p50_ms"] / reference["p50_ms"] - 1 if reference["p50_ms"] > 0 else 0.0
+        regressed = change > tolerance and timings["p50_ms"] - reference["p50_ms"] > min_delta_ms
+        comparison[name] = {
+            "baseline_p50_ms": reference["p50_ms"],
+            "p50_ms": timings["p50_ms"],
+            "change": change,
+            "regression": regressed,
+        }
+        if regressed:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    """Read a baseline report, or return None if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the prediction and scoring hot paths with a stub model")
+    parser.add_argument("--frames", action="append",
+                        help="Directory with benchmark frames (repeatable, default: the playground captures)")
+    parser.add_argument("--num-frames", type=int, default=10, help="Maximum number of frames")
+    parser.add_argument("--darts", type=int, default=3, help="Darts in the stub model output")
+    parser.add_argument("--anchors", type=int, default=20000, help="Anchors in the stub model output")
+    parser.add_argument("--candidates", type=int, default=20, help="Overlapping candidate boxes per dart before NMS")
+    parser.add_argument("--classes", type=int, default=1, help="Classes in the stub model output")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic inputs")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed iterations per benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed iterations per benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline report to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed growth of the median time relative to the baseline before it counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1,
+                        help="Growth of the median time in milliseconds below which it never counts as a regression")
+    parser.add_argument("--roi", action="store_true", help="Crop frames to the calibrated board before inference")
+    parser.add_argument("--no-draft", action="store_true", help="Decode JPEGs at full size instead of in draft mode")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    config = dict(BENCHMARK_CONFIG)
+    config["ROI_CROP_ENABLED"] = "true" if args.roi else "false"
+    config["DECODE_DRAFT_ENABLED"] = "false" if args.no_draft else "true"
+    # Before anything reads it, metrics read their setting once
+    os.environ.update(config)
+
+    paths = find_frames(args.frames or DEFAULT_FRAME_DIRS, args.num_frames)
+    if not paths:
+        parser.error("No frames found, pass a directory with --frames")
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(f.read())
+
+    model = StubModel(args.darts, args.anchors, args.candidates, args.classes, args.seed)
+    print(f"Benchmarking on {len(frames)} frames from {os.path.dirname(paths[0])}, "
+          f"{model.darts} darts in {model.anchors} anchors, {args.repeat} runs")
+    results = run_benchmarks(frames, model, args.warmup, args.repeat)
+
+    report: Dict[str, Any] = {
+        "created_at": time.time(),
+        "environment": describe_environment(),
+        "settings": {
+            "frames": len(frames),
+            "darts": model.darts,
+            "anchors": model.anchors,
+            "candidates": model.candidates,
+            "classes": model.classes,
+            "seed": model.seed,
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+            "img_size": IMG_SIZE,
+            "config": config,
+        },
+        "results": results,
+    }
+
+    regressions: List[str] = []
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline is not None:
+        if baseline.get("settings") != report["settings"]:
+            print("Warning: the baseline was recorded with different settings")
+        if baseline.get("environment") != report["environment"]:
+            print("Warning: the baseline was recorded on a different machine or library versions")
+        comparison, regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        report["baseline"] = args.baseline
+        report["comparison"] = comparison
+        report["regressions"] = regressions
+
+        print(f"{'':<14}{'baseline':>12}{'current':>12}{'change':>10}")
+        for name, entry in comparison.items():
+            flag = "  REGRESSION" if entry["regression"] else ""
+            print(f"{name:<14}{entry['baseline_p50_ms']:>10.2f}ms{entry['p50_ms']:>10.2f}ms{entry['change']:>+10.1%}{flag}")
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}" if regressions else "No regressions")
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to record one")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Compare the INT8 quantized model with the float ONNX model.
+
+Run from the api directory after `python -m tools.quantize_onnx`:
+    python -m tools.benchmark_quantized [--float-model model/best.onnx] [--int8-model model/best.int8.onnx]
+
+Each model runs in its own process on the same frames, preprocessed like `PredictionService`
+does. The report contains latency percentiles, peak memory and the precision and recall of
+the quantized detections, using the float model's detections as reference. The exit code is 1
+when the quantized model does not meet the acceptance thresholds.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from services.image_decoder import ImageDecoder
+from services.obb_utils import probiou
+from services.onnx_engine import OnnxEngine
+from services.prediction_service import PredictionService
+from tools.quantize_onnx import DEFAULT_FRAME_DIRS, find_frames
+
+
+def read_rss_kb(field: str) -> int:
+    """
+    Read a memory field (VmRSS or VmHWM) of the current process in kB.
+
+    Falls back to the peak RSS reported by getrusage where /proc is not available.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_model(model_path: str, frames: List[str], runs: int, threads: int) -> Dict[str, Any]:
+    """
+    Load a model and run it on every frame, timing preprocessing plus inference.
+
+    Runs in a child process so that memory figures belong to this model only.
+
+    Returns:
+        Dict with per-frame latencies, inference times, peak memory and the detections of the last run
+    """
+    if threads > 0:
+        os.environ["ONNX_INTRA_OP_THREADS"] = str(threads)
+
+    frame_bytes = []
+    for path in frames:
+        with open(path, "rb") as f:
+            frame_bytes.append(f.read())
+
+    baseline_kb = read_rss_kb("VmRSS")
+    model = OnnxEngine(model_path)
+    # Warm up on the first frame so graph initialization is not timed
+    img, _, image_size = PredictionService._prepare_image(ImageDecoder.open(frame_bytes[0]))
+    PredictionService._predict(model, img, image_size)
+
+    latencies, inference_times, detections = [], [], []
+    for run in range(runs):
+        for image_bytes in frame_bytes:
+            start = time.perf_counter()
+            img, _, image_size = PredictionService._prepare_image(ImageDecoder.open(image_bytes))
+            result = PredictionService._predict(model, img, image_size)[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            inference_times.append(result.speed["inference"])
+            if run == runs - 1:
+                detections.append(result.obb.data.tolist())
+
+    return {
+        "latencies_ms": latencies,
+        "inference_ms": inference_times,
+        "peak_memory_mb": (read_rss_kb("VmHWM") - baseline_kb) / 1024,
+        "model_size_mb": os.path.getsize(model_path) / 1e6,
+        "detections": detections,
+    }
+
+
+def match_detections(reference: np.ndarray, candidate: np.ndarray, iou_threshold: float) -> int:
+    """
+    Count candidate detections that match a reference detection of the same class.
+
+    Candidates are matched greedily in order of confidence, each reference at most once.
+
+    Args:
+        reference: Array of shape (N, 7) with [x, y, w, h, angle, confidence, class_id]
+        candidate: Array of shape (M, 7) in the same layout
+        iou_threshold: Minimum probabilistic IoU for a match
+
+    Returns:
+        Number of true positives
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0
+
+    ious = probiou(candidate[:, :5], reference[:, :5])
+    ious[candidate[:, 6][:, None] != reference[:, 6][None, :]] = 0
+    matched = np.zeros(len(reference), dtype=bool)
+    true_positives = 0
+    for i in np.argsort(-candidate[:, 5], kind="stable"):
+        available = np.where(matched, 0, ious[i])
+        best = int(available.argmax())
+        if available[best] >= iou_threshold:
+            matched[best] = True
+            true_positives += 1
+    return true_positives
+
+
+def summarize(stats: Dict[str, Any]) -> Dict[str, float]:
+    """Reduce the raw timings of a model to the reported figures."""
+    latencies = sorted(stats["latencies_ms"])
+    return {
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p95_ms": latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))],
+        "inference_mean_ms": statistics.fmean(stats["inference_ms"]),
+        "peak_memory_mb": stats["peak_memory_mb"],
+        "model_size_mb": stats["model_size_mb"],
+    }
+
+
+def compare(
+    float_stats: Dict[str, Any],
+    int8_stats: Dict[str, Any],
+    iou_threshold: float
+) -> Tuple[float, float, int, int]:
+    """
+    Compute precision and recall of the quantized detections against the float detections.
+
+    Returns:
+        Tuple of (precision, recall, float detection count, quantized detection count)
+    """
+    true_positives = reference_count = candidate_count = 0
+    for reference, candidate in zip(float_stats["detections"], int8_stats["detections"]):
+        reference = np.asarray(reference, dtype=np.float64).reshape(-1, 7)
+        candidate = np.asarray(candidate, dtype=np.float64).reshape(-1, 7)
+        true_positives += match_detections(reference, candidate, iou_threshold)
+        reference_count += len(reference)
+        candidate_count += len(candidate)
+
+    precision = true_positives / candidate_count if candidate_count else 1.0
+    recall = true_positives / reference_count if reference_count else 1.0
+    return precision, recall, reference_count, candidate_count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the INT8 model against the float ONNX model")
+    parser.add_argument("--float-model", default="model/best.onnx", help="Path to the float ONNX model")
+    parser.add_argument("--int8-model", default="model/best.int8.onnx", help="Path to the quantized ONNX model")
+    parser.add_argument("--frames", action="append",
+                        help="Directory with benchmark frames (repeatable, default: training dataset, then playground)")
+    parser.add_argument("--num-frames", type=int, default=50, help="Maximum number of frames")
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes over the frames")
+    parser.add_argument("--threads", type=int, default=1, help="ONNX Runtime intra-op threads (0 = runtime default)")
+    parser.add_argument("--iou", type=float, default=0.5, help="Minimum probabilistic IoU for matching detections")
+    parser.add_argument("--min-precision", type=float, default=0.95, help="Acceptance threshold for precision")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Acceptance threshold for recall")
+    parser.add_argument("--min-speedup", type=float, default=1.2, help="Acceptance threshold for the p50 latency speed-up")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    frames = find_frames(args.frames or DEFAULT_FRAME_DIRS, args.num_frames)
+    if not frames:
+        parser.error("No frames found, pass a directory with --frames")
+    print(f"Benchmarking on {len(frames)} frames from {os.path.dirname(frames[0])}, {args.runs} runs")
+
+    # A fresh process per model keeps the memory figures separate
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        float_stats = pool.apply(run_model, (args.float_model, frames, args.runs, args.threads))
+        int8_stats = pool.apply(run_model, (args.int8_model, frames, args.runs, args.threads))
+
+    precision, recall, float_count, int8_count = compare(float_stats, int8_stats, args.iou)
+    float_summary = summarize(float_stats)
+    int8_summary = summarize(int8_stats)
+    speedup = float_summary["latency_p50_ms"] / int8_summary["latency_p50_ms"]
+    accepted = precision >= args.min_precision and recall >= args.min_recall and speedup >= args.min_speedup
+
+    report = {
+        "frames": len(frames),
+        "runs": args.runs,
+        "threads": args.threads,
+        "float": float_summary,
+        "int8": int8_summary,
+        "speedup": speedup,
+        "float_detections": float_count,
+        "int8_detections": int8_count,
+        "precision": precision,
+        "recall": recall,
+        "accepted": accepted,
+    }
+
+    print(f"{'':<22}{'float':>12}{'int8':>12}")
+    for key in float_summary:
+        print(f"{key:<22}{float_summary[key]:>12.1f}{int8_summary[key]:>12.1f}")
+    print(f"Speed-up (p50): {speedup:.2f}x")
+    print(f"Detections: {float_count} float, {int8_count} int8")
+    print(f"Precision: {precision:.3f}  Recall: {recall:.3f}  (IoU >= {args.iou})")
+    print("ACCEPTED" if accepted else "REJECTED")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    raise SystemExit(0 if accepted else 1)
+
+
+if __name__ == "__main__":
+    main()
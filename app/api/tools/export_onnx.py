@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Export the PyTorch dart detection model to ONNX for the ONNX Runtime engine.
+
+Run from the api directory:
+    python -m tools.export_onnx [--weights model/best.pt] [--imgsz 2176] [--dynamic]
+
+Requires ultralytics and torch, so run it on a development machine rather than in the
+slim ONNX image. The exported model is written next to the weights (model/best.onnx).
+"""
+
+import argparse
+
+from services.prediction_service import IMG_SIZE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the dart detection model to ONNX")
+    parser.add_argument("--weights", default="model/best.pt", help="Path to the PyTorch weights")
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE, help="Input image size of the exported model")
+    parser.add_argument("--dynamic", action="store_true", help="Export with a dynamic input size (needed for ROI cropping)")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    model = YOLO(args.weights)
+    output_path = model.export(format="onnx", imgsz=args.imgsz, opset=args.opset, simplify=True, dynamic=args.dynamic)
+    print(f"Exported ONNX model to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Quantize the exported ONNX dart detection model to INT8.
+
+Run from the api directory after `python -m tools.export_onnx`:
+    python -m tools.quantize_onnx [--model model/best.onnx] [--output model/best.int8.onnx] [--mode static]
+
+Static quantization calibrates the activation ranges on real frames, preprocessed exactly
+like `PredictionService` does at inference time (including ROI cropping when enabled).
+Frames are taken from the training dataset and fall back to the playground captures when
+the dataset images are not available. Dynamic quantization only quantizes the weights
+and needs no calibration frames.
+
+Requires the onnx package in addition to onnxruntime. The quantized model is used with
+INFERENCE_ENGINE=onnx_int8. Compare it with the float model using
+`python -m tools.benchmark_quantized` before adopting it.
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from services.image_decoder import ImageDecoder
+from services.onnx_engine import OnnxEngine
+from services.prediction_service import PredictionService
+
+# Directories searched for frames, in order of preference
+DEFAULT_FRAME_DIRS = [
+    "../../training/phaseTwoFullDataset/dart_dataset_v2/train/images",
+    "../../training/phaseOneSmallDataset/dart_dataset_v1/train/images",
+    "../../playground",
+]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# Prefix of the YOLO11 OBB head nodes in exported models
+HEAD_NODE_PREFIX = "/model.23/"
+
+
+def find_frames(directories: Sequence[str], limit: int) -> List[str]:
+    """
+    Find frames in the first directory that contains any.
+
+    Args:
+        directories: Directories to search, in order of preference
+        limit: Maximum number of frames to return, spread evenly over the directory
+
+    Returns:
+        List of image paths, empty if none of the directories contains frames
+    """
+    for directory in directories:
+        paths = sorted(
+            path for path in glob.glob(os.path.join(directory, "*"))
+            if path.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if paths:
+            step = max(1, len(paths) // limit)
+            return paths[::step][:limit]
+    return []
+
+
+def prepare_input(path: str, engine: OnnxEngine) -> np.ndarray:
+    """
+    Preprocess a frame into the model input tensor the prediction service would produce.
+
+    Args:
+        path: Path to the frame
+        engine: Engine whose input size and letterboxing are used
+
+    Returns:
+        NCHW float32 tensor
+    """
+    with open(path, "rb") as f:
+        img, _, image_size = PredictionService._prepare_image(ImageDecoder.open(f.read()))
+    tensor, _, _ = engine._letterbox(img, engine.input_size or (image_size, image_size))
+    return tensor
+
+
+class FrameCalibrationReader:
+    """Feeds preprocessed frames to the ONNX Runtime calibrator"""
+
+    def __init__(self, paths: List[str], engine: OnnxEngine):
+        self.input_name = engine.input_name
+        self._paths = paths
+        self._engine = engine
+        self._inputs: Iterator[np.ndarray] = iter(())
+        self.rewind()
+
+    def get_next(self) -> Optional[dict]:
+        tensor = next(self._inputs, None)
+        return None if tensor is None else {self.input_name: tensor}
+
+    def rewind(self) -> None:
+        """Start again from the first frame."""
+        self._inputs = (prepare_input(path, self._engine) for path in self._paths)
+
+
+def head_decode_nodes(model_path: str) -> List[str]:
+    """
+    List the non-convolution nodes of the detection head.
+
+    These decode box coordinates, angles and class scores, whose value ranges differ too
+    much to share one INT8 scale, so they are kept in float.
+
+    Args:
+        model_path: Path to the float ONNX model
+
+    Returns:
+        Node names to exclude from quantization
+    """
+    import onnx
+
+    model = onnx.load(model_path, load_external_data=False)
+    return [
+        node.name for node in model.graph.node
+        if node.name.startswith(HEAD_NODE_PREFIX) and node.op_type != "Conv"
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quantize the ONNX dart detection model to INT8")
+    parser.add_argument("--model", default="model/best.onnx", help="Path to the float ONNX model")
+    parser.add_argument("--output", default="model/best.int8.onnx", help="Path of the quantized model")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static",
+                        help="Static calibrates activations on frames, dynamic only quantizes weights")
+    parser.add_argument("--frames", action="append",
+                        help="Directory with calibration frames (repeatable, default: training dataset, then playground)")
+    parser.add_argument("--num-frames", type=int, default=64, help="Maximum number of calibration frames")
+    parser.add_argument("--method", choices=["minmax", "entropy", "percentile"], default="minmax",
+                        help="Calibration method for static quantization")
+    parser.add_argument("--per-channel", action="store_true", help="Quantize weights per output channel")
+    parser.add_argument("--quantize-head", action="store_true",
+                        help="Also quantize the box and score decoding of the detection head")
+    args = parser.parse_args()
+
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    nodes_to_exclude = [] if args.quantize_head else head_decode_nodes(args.model)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Shape inference and graph fusion before quantization give better scales
+        preprocessed_path = os.path.join(tmp_dir, "preprocessed.onnx")
+        try:
+            quant_pre_process(args.model, preprocessed_path, skip_symbolic_shape=True)
+        except Exception as e:
+            print(f"Pre-processing failed, quantizing the model as exported: {type(e).__name__} - {str(e)}")
+            preprocessed_path = args.model
+
+        if args.mode == "dynamic":
+            quantize_dynamic(
+                preprocessed_path,
+                args.output,
+                weight_type=QuantType.QInt8,
+                per_channel=args.per_channel,
+                nodes_to_exclude=nodes_to_exclude,
+            )
+        else:
+            frames = find_frames(args.frames or DEFAULT_FRAME_DIRS, args.num_frames)
+            if not frames:
+                parser.error("No calibration frames found, pass a directory with --frames")
+            print(f"Calibrating on {len(frames)} frames from {os.path.dirname(frames[0])}")
+
+            engine = OnnxEngine(args.model)
+            quantize_static(
+                preprocessed_path,
+                args.output,
+                FrameCalibrationReader(frames, engine),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=args.per_channel,
+                nodes_to_exclude=nodes_to_exclude,
+                calibrate_method={
+                    "minmax": CalibrationMethod.MinMax,
+                    "entropy": CalibrationMethod.Entropy,
+                    "percentile": CalibrationMethod.Percentile,
+                }[args.method],
+            )
+
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"Wrote {args.mode} INT8 model to {args.output} ({size_mb:.1f} MB, {len(nodes_to_exclude)} head nodes kept in float)")
+
+
+if __name__ == "__main__":
+    main()
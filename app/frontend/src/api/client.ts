@@ -1,6 +1,9 @@
 import axios, { AxiosInstance, AxiosRequestConfig } from 'axios';
 import { 
   DetectionResponse,
+  CaptureDetectionResponse,
+  FrameEvent,
+  PreviewOptions,
   CameraImageResponse,
   DeleteImagesResponse
 } from './types';
@@ -51,6 +54,12 @@ class ApiClient {
     return response.data;
   }
 
+  // Capture from the camera and detect in one request, without downloading and re-uploading the image
+  async captureAndPredict(): Promise<CaptureDetectionResponse> {
+    const response = await this.client.post<CaptureDetectionResponse>('/camera/predict');
+    return response.data;
+  }
+
   // Camera images
   async getLatestImage(): Promise<Blob> {
     const response = await this.client.get<Blob>('/camera/images/latest', {
@@ -59,6 +68,17 @@ class ApiClient {
     return response.data;
   }
 
+  // URL of a resized preview of a feed image, the latest one if no file name is given. Served with an
+  // ETag, so the browser revalidates it with a 304 instead of downloading the image again.
+  getPreviewUrl(filename: string = 'latest', options: PreviewOptions = {}): string {
+    const params = new URLSearchParams();
+    Object.entries(options).forEach(([key, value]) => {
+      if (value !== undefined) params.set(key, String(value));
+    });
+    const query = params.toString();
+    return `${this.client.defaults.baseURL}/camera/images/${encodeURIComponent(filename)}/preview${query ? `?${query}` : ''}`;
+  }
+
   async captureImage(): Promise<CameraImageResponse> {
     const response = await this.client.post<CameraImageResponse>('/camera/images');
     return response.data;
@@ -68,6 +88,15 @@ class ApiClient {
     const response = await this.client.delete<DeleteImagesResponse>('/camera/images');
     return response.data;
   }
+
+  // Detections of every new frame, pushed by the server. Returns a function that closes the subscription.
+  subscribeDetections(onEvent: (event: FrameEvent) => void): () => void {
+    const source = new EventSource(`${this.client.defaults.baseURL}/events`);
+    source.addEventListener('detection', (message) => {
+      onEvent(JSON.parse((message as MessageEvent).data) as FrameEvent);
+    });
+    return () => source.close();
+  }
 }
 
 const apiClient = new ApiClient();
@@ -25,6 +25,13 @@ export interface BoundingBox {
   y2: number;
 }
 
+export interface DartScore {
+  segment: number;
+  ring: 'single' | 'double' | 'triple' | 'outer-bull' | 'inner-bull' | 'miss';
+  points: number;
+  tip: Point;
+}
+
 export interface DartDetection {
   x_center: number;
   y_center: number;
@@ -36,6 +43,14 @@ export interface DartDetection {
   detection_index: number;
   corners: number[][];
   bbox: BoundingBox;
+  score?: DartScore | null;
+  dart_id?: number | null;
+}
+
+export interface TrackEvent {
+  type: 'new' | 'removed';
+  dart_id: number;
+  detection: DartDetection;
 }
 
 export interface ModelInfo {
@@ -48,6 +63,37 @@ export interface DetectionResponse {
   detections: DartDetection[];
   model_info: ModelInfo;
   darts_count: number;
+  inference_skipped?: boolean;
+  skip_reason?: string | null;
+  inference_tier?: string | null;
+  events?: TrackEvent[];
+}
+
+export interface StageTimings {
+  capture_ms: number;
+  inference_ms: number;
+  total_ms: number;
+}
+
+export interface CaptureDetectionResponse extends DetectionResponse {
+  filename: string;
+  timings: StageTimings;
+}
+
+export interface FrameEvent {
+  source: 'camera' | 'stream';
+  filename: string;
+  image_url: string;
+  preview_url: string;
+  captured_at: number;
+  detection: DetectionResponse;
+}
+
+export interface PreviewOptions {
+  width?: number;
+  roi?: boolean;
+  format?: 'jpeg' | 'webp';
+  quality?: number;
 }
 
 export interface DetectionError {